@@ -0,0 +1,61 @@
+"""
+Standalone micro-benchmarks for the backend.
+
+Run from apps/user-profile-backend, e.g. ``python -m benchmarks.middleware``.
+They are not collected by the test runner.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    """Configures Django for a benchmark script (call before importing models)."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "integra_core.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def scratch_database():
+    """
+    Runs the block against a freshly migrated throwaway database (the same one
+    the test runner would create), leaving the configured database untouched.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def time_calls(func, repeat, warmup=50):
+    """Calls ``func`` ``repeat`` times and returns per-call timings in microseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+def summarize(samples):
+    """Mean / p50 / p95 / p99 of a list of microsecond timings."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        "mean_us": round(statistics.fmean(ordered), 1),
+        "p50_us": round(pct(0.50), 1),
+        "p95_us": round(pct(0.95), 1),
+        "p99_us": round(pct(0.99), 1),
+    }
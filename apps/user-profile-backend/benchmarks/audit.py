@@ -0,0 +1,50 @@
+"""
+Extra PATCH latency of the profile audit trail: buffered writer vs a synchronous
+insert per change, plus the cost of the batched flush.
+
+    python -m benchmarks.audit --changes 5000
+"""
+import argparse
+import time
+
+from benchmarks import scratch_database, setup_django, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--changes", type=int, default=3000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from users.audit import ProfileAuditWriter
+    from users.models import ProfileChange
+
+    with scratch_database():
+        user = get_user_model().objects.create_user(username="bench", email="bench@example.com")
+        changes = {"bio": ["old", "new"]}
+
+        sync = summarize(time_calls(
+            lambda: ProfileChange.objects.create(user=user, changed_by=user, changes=changes),
+            args.changes,
+        ))
+
+        writer = ProfileAuditWriter(batch_size=args.batch_size, flush_interval=0)
+        buffered = summarize(time_calls(
+            lambda: writer.record(user.pk, changes, changed_by_id=user.pk),
+            args.changes,
+        ))
+        pending = writer.pending()
+        started = time.perf_counter()
+        writer.flush()
+        flush_ms = (time.perf_counter() - started) * 1000
+
+    print("synchronous insert : " + "  ".join(f"{k}={v}" for k, v in sync.items()))
+    print("buffered record    : " + "  ".join(f"{k}={v}" for k, v in buffered.items()))
+    print(f"flush of {pending} rows (bulk_create, batch {args.batch_size}): {flush_ms:.1f} ms "
+          f"({flush_ms * 1000 / max(pending, 1):.1f} us/row, off the request path)")
+
+
+if __name__ == "__main__":
+    main()
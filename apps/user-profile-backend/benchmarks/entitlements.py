@@ -0,0 +1,107 @@
+"""
+FundAccessIndex at scale: build time, memory and lookup latency for
+advisor -> FUND_CODE checks, plus an incremental refresh.
+
+    python -m benchmarks.entitlements                       # 100k advisors x 10k funds, in memory
+    python -m benchmarks.entitlements --db --advisors 5000  # also bulk_load + refresh through the DB
+
+Most advisors hold a handful of funds (sets); ``--dense-share`` of them hold
+hundreds (bitmaps).
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from benchmarks import scratch_database, setup_django, summarize, time_calls
+
+
+def generate(advisors, funds, dense_share, rng):
+    codes = [f"F{n:05d}" for n in range(funds)]
+    for n in range(advisors):
+        held = rng.randint(200, 800) if rng.random() < dense_share else rng.randint(1, 20)
+        for code in rng.sample(codes, held):
+            yield f"ADV{n:06d}", code, True
+
+
+def report(label, samples):
+    print(f"{label:<34}: " + "  ".join(f"{k}={v}" for k, v in summarize(samples).items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--advisors", type=int, default=100_000)
+    parser.add_argument("--funds", type=int, default=10_000)
+    parser.add_argument("--dense-share", type=float, default=0.02)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=100, help="Funds per check_many call.")
+    parser.add_argument("--db", action="store_true", help="Also time bulk_load and refresh on a scratch DB.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from users import entitlements
+    from users.entitlements import FundAccessIndex
+
+    rng = random.Random(args.seed)
+    rows = list(generate(args.advisors, args.funds, args.dense_share, rng))
+    print(f"{args.advisors} advisors x {args.funds} funds: {len(rows)} grants")
+
+    index = FundAccessIndex()
+    tracemalloc.start()
+    started = time.perf_counter()
+    index.load(rows)
+    build_s = time.perf_counter() - started
+    index_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+    dense = sum(type(funds) is int for funds in index._state.advisors.values())
+    print(f"build: {build_s:.2f}s, ~{index_mb:.0f} MB, {dense} bitmap advisors")
+
+    advisor_ids = [f"ADV{rng.randrange(args.advisors):06d}" for _ in range(1024)]
+    fund_codes = [f"F{rng.randrange(args.funds):05d}" for _ in range(1024)]
+    dense_ids = [a for a, funds in index._state.advisors.items() if type(funds) is int][:1024] or advisor_ids
+    batch = fund_codes[:args.batch]
+
+    def cycle(items):
+        position = 0
+
+        def next_item():
+            nonlocal position
+            position = (position + 1) % len(items)
+            return items[position]
+
+        return next_item
+
+    advisor, dense_advisor, fund = cycle(advisor_ids), cycle(dense_ids), cycle(fund_codes)
+    report("can_access (any advisor)", time_calls(lambda: index.can_access(advisor(), fund()), args.lookups))
+    report("can_access (bitmap advisor)", time_calls(lambda: index.can_access(dense_advisor(), fund()), args.lookups))
+    report(f"check_many ({args.batch} funds)", time_calls(
+        lambda: index.check_many(advisor(), batch), max(args.lookups // 100, 100)
+    ))
+
+    changes = [(rng.choice(advisor_ids), rng.choice(fund_codes), rng.random() < 0.5) for _ in range(1000)]
+    started = time.perf_counter()
+    index.apply(changes)
+    print(f"apply 1000 changed rows: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    if args.db:
+        with scratch_database():
+            pairs = [(advisor_id, code) for advisor_id, code, _active in rows]
+            started = time.perf_counter()
+            entitlements.bulk_load(pairs)
+            print(f"bulk_load {len(pairs)} grants: {time.perf_counter() - started:.1f}s")
+
+            db_index = FundAccessIndex()
+            started = time.perf_counter()
+            db_index.refresh()
+            print(f"full refresh from DB: {time.perf_counter() - started:.1f}s")
+
+            for advisor_id, code, _active in changes[:100]:
+                entitlements.revoke(advisor_id, [code])
+            started = time.perf_counter()
+            db_index.refresh()
+            print(f"incremental refresh (100 revocations): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Firm normalization: index size and firm-filter query time of the legacy
+``firm_name`` string index vs the integer ``firm_id`` FK index.
+
+    python -m benchmarks.firms --advisors 200000 --firms 2000
+
+The legacy index is recreated on the scratch database for the comparison.
+Index sizes are reported on SQLite (dbstat) and PostgreSQL.
+"""
+import argparse
+import random
+
+from benchmarks import scratch_database, setup_django, summarize, time_calls
+
+LEGACY_INDEX = "bench_users_user_firm_name"
+
+
+def index_size_kb(connection, name):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            try:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [name])
+            except Exception:  # SQLite built without dbstat
+                return None
+        elif connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_relation_size(%s::regclass)", [name])
+        else:
+            return None
+        size = cursor.fetchone()[0]
+    return size / 1024 if size is not None else None
+
+
+def fk_index_name(connection, table, column):
+    constraints = connection.introspection.get_constraints(connection.cursor(), table)
+    return next(
+        name for name, info in constraints.items()
+        if info["index"] and info["columns"] == [column] and not info["primary_key"]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--advisors", type=int, default=100_000)
+    parser.add_argument("--firms", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from users.models import Firm
+
+    User = get_user_model()
+    rng = random.Random(args.seed)
+
+    with scratch_database():
+        Firm.objects.bulk_create(
+            Firm(name=f"Example Wealth Partners & Associates Pty Ltd {n:05d}") for n in range(args.firms)
+        )
+        firms = list(Firm.objects.all())
+        for start in range(0, args.advisors, 5000):
+            batch = []
+            for n in range(start, min(start + 5000, args.advisors)):
+                firm = rng.choice(firms)
+                batch.append(User(username=f"adv{n}", email=f"adv{n}@example.com", firm=firm, firm_name=firm.name))
+            User.objects.bulk_create(batch)
+
+        table = User._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE INDEX {LEGACY_INDEX} ON {table} (firm_name)")
+            if connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+        fk_index = fk_index_name(connection, table, "firm_id")
+
+        sample = [rng.choice(firms) for _ in range(64)]
+        position = 0
+
+        def next_firm():
+            nonlocal position
+            position = (position + 1) % len(sample)
+            return sample[position]
+
+        by_name = summarize(time_calls(
+            lambda: list(User.objects.filter(firm_name=next_firm().name).values_list("pk", flat=True)),
+            args.queries, warmup=20,
+        ))
+        by_fk = summarize(time_calls(
+            lambda: list(User.objects.filter(firm_id=next_firm().pk).values_list("pk", flat=True)),
+            args.queries, warmup=20,
+        ))
+
+        legacy_kb, fk_kb = index_size_kb(connection, LEGACY_INDEX), index_size_kb(connection, fk_index)
+
+    print(f"{args.advisors} advisors in {args.firms} firms ({connection.vendor})")
+    if legacy_kb is not None:
+        print(f"index size: firm_name {legacy_kb:,.0f} KB -> firm_id {fk_kb:,.0f} KB")
+    print("filter by firm_name : " + "  ".join(f"{k}={v}" for k, v in by_name.items()))
+    print("filter by firm_id   : " + "  ".join(f"{k}={v}" for k, v in by_fk.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of one log call on the request thread: a synchronous StreamHandler vs the
+queued JSON handler (integra_core/logs.py), both writing to a file.
+
+The queued handler's number is what a request pays: the record is prepared
+and put on the queue, and the writer thread does the formatting and I/O.
+Records dropped because the writer fell behind are reported too.
+``--write-delay-ms`` adds a pause to every write, like a slow disk or a
+blocked stdout pipe: the synchronous handler pays it on every record, while
+the queued one pays it once per batch, off the request thread.
+
+    python -m benchmarks.log_handlers --records 20000
+    python -m benchmarks.log_handlers --write-delay-ms 1
+    python -m benchmarks.log_handlers --queue-size 1000   # show drops under overload
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks import setup_django, summarize, time_calls
+
+
+class SlowFile:
+    """File whose writes take at least ``delay`` seconds."""
+
+    def __init__(self, path, delay):
+        self.file = open(path, "a", encoding="utf-8")
+        self.delay = delay
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--write-delay-ms", type=float, default=0, help="Extra latency of every write.")
+    args = parser.parse_args()
+
+    setup_django()
+    from integra_core.logs import JsonFormatter, QueueHandler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        delay = args.write_delay_ms / 1000
+        streams = [SlowFile(os.path.join(tmp, f"{name}.log"), delay) for name in ("sync", "queued")]
+        sync_handler = logging.StreamHandler(streams[0])
+        sync_handler.setFormatter(JsonFormatter())
+        queued_handler = QueueHandler(maxsize=args.queue_size, batch_size=args.batch_size, stream=streams[1])
+        queued_handler.setFormatter(JsonFormatter())
+
+        results = {}
+        for name, handler in {"sync": sync_handler, "queued": queued_handler}.items():
+            logger = logging.getLogger(f"benchmarks.log_handlers.{name}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(handler)
+
+            def call(logger=logger):
+                logger.info("profile updated for %s", "advisor-42", extra={"fields": ["bio"], "duration_ms": 3.2})
+
+            results[name] = summarize(time_calls(call, args.records))
+            handler.close()
+        for stream in streams:
+            stream.close()
+
+        for name, stats in results.items():
+            print(f"{name:>6}: " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+        saving = results["sync"]["mean_us"] - results["queued"]["mean_us"]
+        print(f"saving: {saving:.1f} us/record on the request thread; dropped: {queued_handler.dropped}")
+
+
+if __name__ == "__main__":
+    main()
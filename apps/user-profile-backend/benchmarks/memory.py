@@ -0,0 +1,94 @@
+"""
+Per-request allocation peaks of the main endpoints, checked against MEMORY_BUDGETS.
+
+Requests go through the full WSGI handler with MEMORY_TRACKING on, against a
+scratch database seeded with one firm of ``--advisors`` advisors. Each
+endpoint is warmed up with one unmeasured request (lazy imports), and the
+cache is cleared so the measured requests include the first, uncached one. The script
+exits with status 1 when any endpoint's worst request exceeds its budget, so CI
+can run it as a regression gate.
+
+    python -m benchmarks.memory --requests 200
+    python -m benchmarks.memory --advisors 5000 --top 10   # also print the top allocators
+"""
+import argparse
+import logging
+import sys
+
+from benchmarks import scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint.")
+    parser.add_argument("--advisors", type=int, default=1000, help="Advisors in the seeded firm.")
+    parser.add_argument("--top", type=int, default=0, help="Print this many top allocators at the end.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory, override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from integra_core.memory import memory_tracker
+    from users.models import Firm
+
+    User = get_user_model()
+    factory = RequestFactory(SERVER_NAME="localhost", HTTP_HOST="localhost")
+
+    with scratch_database(), override_settings(MEMORY_TRACKING=True, MEMORY_SNAPSHOT_INTERVAL=float("inf")):
+        firm = Firm.objects.create(name="Benchmark Wealth")
+        User.objects.bulk_create(
+            User(username=f"mem{n}", email=f"mem{n}@example.com", firm=firm, role=f"Role {n % 7}")
+            for n in range(args.advisors)
+        )
+        advisor = User.objects.create_user(
+            username="advisor", email="advisor@example.com", firm=firm, bio="**Bench** advisor", is_staff=True
+        )
+        bearer = f"Bearer {AccessToken.for_user(advisor)}"
+        handler = WSGIHandler()  # middleware (and tracemalloc) start here
+        logging.getLogger("integra.access").setLevel(logging.WARNING)
+
+        endpoints = {
+            "user_profile": "/api/user/profile/",
+            "user_profile (fields)": "/api/user/profile/?fields=first_name,bio_html",
+            "session_bootstrap": "/api/bootstrap/",
+            "firm_stats": "/api/firms/stats/",
+        }
+        over_budget = []
+        for label, path in endpoints.items():
+            # The first request imports lazily loaded modules; keep that out of the numbers.
+            handler.get_response(factory.get(path, HTTP_AUTHORIZATION=bearer))
+            cache.clear()
+            memory_tracker.reset()
+            for _ in range(args.requests):
+                response = handler.get_response(factory.get(path, HTTP_AUTHORIZATION=bearer))
+                if response.status_code != 200:
+                    sys.exit(f"{label}: HTTP {response.status_code}")
+            [(route, stats)] = memory_tracker.report()["routes"].items()
+            line = (
+                f"{label:>22}: peak max {stats['peak_max_bytes'] / 1024:8.1f} KiB  "
+                f"mean {stats['peak_mean_bytes'] / 1024:8.1f} KiB"
+            )
+            budget = memory_tracker.budgets.get(route)
+            if budget is not None:
+                within = stats["peak_max_bytes"] <= budget
+                line += f"  budget {budget / 1024:.0f} KiB  {'OK' if within else 'OVER BUDGET'}"
+                if not within:
+                    over_budget.append(label)
+            print(line)
+
+        if args.top:
+            snapshot = memory_tracker.take_snapshot()
+            print("\nTop allocators:")
+            for stat in snapshot["top"][: args.top]:
+                print(f"  {stat['size_bytes'] / 1024:8.1f} KiB  {stat['count']:6d}  {stat['location']}")
+
+    if over_budget:
+        sys.exit(f"Over budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Per-request cost of the full vs lean middleware chain for bearer-token /api/ calls.
+
+Both handlers serve the same request (a bearer token the JWT layer rejects, so
+no database is involved); the only difference is whether the route dispatcher
+is allowed to pick the lean chain.
+
+    python -m benchmarks.middleware --requests 5000
+"""
+import argparse
+
+from benchmarks import setup_django, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--path", default="/api/user/profile/")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory, override_settings
+
+    factory = RequestFactory(SERVER_NAME="localhost", HTTP_HOST="localhost")
+
+    def make_handler(prefixes):
+        with override_settings(LEAN_MIDDLEWARE_PATH_PREFIXES=prefixes):
+            handler = WSGIHandler()  # middleware is instantiated here
+        return handler
+
+    handlers = {"full": make_handler(()), "lean": make_handler(("/api/",))}
+    results = {}
+    for name, handler in handlers.items():
+        def call(handler=handler):
+            request = factory.get(args.path, HTTP_AUTHORIZATION="Bearer not.a.token")
+            handler.get_response(request)
+
+        results[name] = summarize(time_calls(call, args.requests))
+
+    for name, stats in results.items():
+        print(f"{name:>5}: " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+    saving = results["full"]["mean_us"] - results["lean"]["mean_us"]
+    print(f"saving: {saving:.1f} us/request ({saving / results['full']['mean_us']:.1%} of the full chain)")
+
+
+if __name__ == "__main__":
+    main()
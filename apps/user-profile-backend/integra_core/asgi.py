@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+/healthz and /readyz are answered by the probe wrapper before Django sees the
+request (integra_core/probes.py).
 """
 
 import os
@@ -14,3 +17,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'integra_core.settings')
 
 application = get_asgi_application()
+
+from integra_core.probes import ProbeASGIMiddleware  # noqa: E402 (needs configured settings)
+
+application = ProbeASGIMiddleware(application)
@@ -0,0 +1,295 @@
+"""
+Structured, non-blocking logging.
+
+Request threads never write log output themselves. ``QueueHandler`` puts the
+record on a bounded in-memory queue, and one background thread (a batching
+``QueueListener``) formats the records as JSON lines and writes them in
+batches: one ``write`` and one ``flush`` per batch instead of per record.
+
+- The queue holds at most ``maxsize`` records. When the writer falls behind,
+  new records are dropped (never waited on) and counted. The writer then logs
+  one ``log records dropped`` warning with the count.
+- Records carry the current request's ``request_id`` and ``user_id`` (see
+  RequestLogMiddleware in integra_core/middleware.py). Both are read in the
+  request thread, because the writer thread has no request context.
+- Arguments are merged into the message and tracebacks rendered before a
+  record is queued, so the writer never touches objects the request may still
+  be changing. JSON encoding happens on the writer thread. A request passed as
+  an ``extra=`` field is logged as its method and path, without the query
+  string.
+
+The writer starts on first use and restarts in forked children (gunicorn
+``--preload``). At interpreter exit the queue is drained.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.http import HttpRequest
+from django.utils.functional import empty
+
+# {"request_id": ..., "request": HttpRequest} for the request being handled
+request_context = contextvars.ContextVar("request_context", default=None)
+
+# LogRecord attributes that are not ``extra=`` fields
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+# ``extra=`` values queued as they are; anything else is queued as str(value)
+_PLAIN_TYPES = (str, int, float, bool, type(None), dict, list, tuple)
+
+
+def current_user_id(request):
+    """
+    The authenticated user's id, if authentication already ran. A lazy
+    ``request.user`` that nothing has evaluated yet is left alone (no query).
+    """
+    user = request.__dict__.get("user")
+    if user is None or getattr(user, "_wrapped", None) is empty:
+        return None
+    return getattr(user, "pk", None)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Adds ``request_id`` and ``user_id`` of the current request (None outside
+    requests). Django logs 4xx/5xx responses (``django.request``) after the
+    middleware chain has returned and reset the context; those come from the
+    ``request`` the record carries.
+    """
+
+    def filter(self, record):
+        context = request_context.get()
+        if context is not None:
+            request_id, request = context["request_id"], context["request"]
+        else:
+            request = getattr(record, "request", None)
+            request_id = getattr(request, "request_id", None)
+        if request_id is None:
+            record.request_id = getattr(record, "request_id", None)
+            record.user_id = getattr(record, "user_id", None)
+        else:
+            record.request_id = request_id
+            if getattr(record, "user_id", None) is None:
+                record.user_id = current_user_id(request)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context and ``extra=`` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler that can write a whole batch of records with one write and flush."""
+
+    def handle_batch(self, records):
+        lines = []
+        for record in records:
+            if not self.filter(record):
+                continue
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        with self.lock:
+            try:
+                self.stream.write("".join(lines))
+                self.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+
+class BatchFileHandler(logging.handlers.WatchedFileHandler, BatchStreamHandler):
+    """Batched writes to a file; reopens it after external rotation (logrotate)."""
+
+    def handle_batch(self, records):
+        if self.stream is not None:
+            self.reopenIfNeeded()
+        elif records:
+            self.stream = self._open()
+        super().handle_batch(records)
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    Drains up to ``batch_size`` records at a time and hands them to each
+    handler's ``handle_batch`` (``handle`` per record for other handlers).
+    """
+
+    def __init__(self, queue, *handlers, batch_size=500, on_batch=None):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        # Called with the batch before it is handled (drop reports)
+        self.on_batch = on_batch
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            record = q.get()
+            batch = []
+            stopping = record is self._sentinel
+            if not stopping:
+                batch.append(record)
+            while len(batch) < self.batch_size and not stopping:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    batch.append(record)
+            if self.on_batch is not None:
+                self.on_batch(batch)
+            if batch:
+                self.handle_batch(batch)
+            if stopping:
+                return
+
+    def handle_batch(self, records):
+        for handler in self.handlers:
+            accepted = [record for record in records if record.levelno >= handler.level]
+            if not accepted:
+                continue
+            if hasattr(handler, "handle_batch"):
+                handler.handle_batch(accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Attach this (not the output handler) to loggers. Output goes to
+    ``filename`` when set, else to ``stream``, formatted by this handler's
+    formatter on the writer thread.
+
+    ``maxsize`` bounds the queue; ``batch_size`` caps records per write.
+    ``dropped`` counts records lost to a full queue since startup.
+    """
+
+    def __init__(self, maxsize=10_000, batch_size=500, stream=None, filename=None):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        if filename:
+            self.target = BatchFileHandler(filename, encoding="utf-8", delay=True)
+        else:
+            self.target = BatchStreamHandler(stream or sys.stderr)
+        self.addFilter(RequestContextFilter())
+        self.dropped = 0
+        self._reported_drops = 0
+        self._drop_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self.listener = None
+        self._pid = None
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the writer thread, in the target handler.
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Freezes the record for the queue without formatting the whole line here."""
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not isinstance(value, _PLAIN_TYPES):
+                if isinstance(value, HttpRequest):
+                    # Django's ``request`` extra. Not str(): that includes the
+                    # query string, which can carry a token (``?access_token=``).
+                    value = f"{value.method} {value.path}"
+                setattr(record, key, str(value))
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def start(self):
+        """Starts the writer thread (again, after a fork: the parent's thread doesn't survive it)."""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is None:
+                atexit.register(self.stop)
+            else:
+                self.queue = queue.Queue(self.maxsize)
+            self.listener = BatchingQueueListener(
+                self.queue, self.target, batch_size=self.batch_size, on_batch=self._report_drops
+            )
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Writes out everything queued and stops the writer thread."""
+        with self._start_lock:
+            if self.listener is not None and self._pid == os.getpid():
+                try:
+                    self.queue.put(self.listener._sentinel, timeout=1)
+                except queue.Full:
+                    pass
+                else:
+                    self.listener._thread.join(timeout=5)
+                self.listener._thread = None
+            self.listener, self._pid = None, None
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
+
+    def _report_drops(self, batch):
+        with self._drop_lock:
+            dropped = self.dropped - self._reported_drops
+            self._reported_drops = self.dropped
+        if dropped:
+            record = logging.makeLogRecord({
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": "log records dropped: queue full",
+                "dropped": dropped,
+                "dropped_total": self._reported_drops,
+                "created": time.time(),
+                "request_id": None,
+                "user_id": None,
+            })
+            batch.append(record)
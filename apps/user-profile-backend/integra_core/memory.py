@@ -0,0 +1,211 @@
+"""
+Opt-in memory instrumentation (MEMORY_TRACKING = True).
+
+With tracking on, MemoryMiddleware starts ``tracemalloc`` and records each
+request's peak traced allocation (bytes above what was allocated when the
+request started) per URL name. At most every MEMORY_SNAPSHOT_INTERVAL seconds,
+the end of a request also takes a process-wide snapshot. The snapshot keeps
+the top allocating source lines and their growth since the previous snapshot,
+which is where a slow RSS creep shows up. ``memory_tracker.report()`` returns
+all of it together with the process RSS. The admin diagnostics endpoint
+(users/diagnostics.py) serves that report.
+
+tracemalloc is process-wide and slows allocation-heavy code down noticeably.
+Keep tracking for staging, load tests and short production investigations. One
+request at a time is measured (a non-blocking lock, like request profiling).
+Allocations by other threads during that request still count towards its
+peak, so read per-route peaks from single-threaded workers or as upper bounds.
+"""
+import threading
+import time
+import tracemalloc
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rss_bytes():
+    """``(current, peak)`` resident set size of this process in bytes (None where unknown)."""
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes.
+        peak = peak * 1024 if peak < 1 << 32 else peak
+    return current, peak
+
+
+class RouteMemoryStats:
+    __slots__ = ("requests", "peak_max", "peak_total", "peak_last")
+
+    def __init__(self):
+        self.requests = 0
+        self.peak_max = 0
+        self.peak_total = 0
+        self.peak_last = 0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "peak_max_bytes": self.peak_max,
+            "peak_mean_bytes": self.peak_total // self.requests if self.requests else 0,
+            "peak_last_bytes": self.peak_last,
+        }
+
+
+class MemoryTracker:
+    def __init__(self, frames=1, snapshot_interval=300.0, top=25, budgets=None):
+        # Stack depth stored per allocation (more frames: better attribution, more overhead)
+        self.frames = frames
+        self.snapshot_interval = snapshot_interval
+        self.top = top
+        # URL name -> allowed peak bytes per request
+        self.budgets = budgets or {}
+        self.routes = {}
+        self.snapshot = None
+        self._previous_snapshot = None
+        self._snapshot_at = 0.0
+        self._measuring = threading.Lock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            frames=getattr(settings, "MEMORY_TRACEMALLOC_FRAMES", 1),
+            snapshot_interval=getattr(settings, "MEMORY_SNAPSHOT_INTERVAL", 300.0),
+            top=getattr(settings, "MEMORY_SNAPSHOT_TOP", 25),
+            budgets=getattr(settings, "MEMORY_BUDGETS", {}),
+        )
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def measure(self, func, *args):
+        """
+        Calls ``func(*args)`` and returns ``(result, peak bytes allocated)``.
+        The peak is None when tracing is off or another call is being measured.
+        """
+        if not tracemalloc.is_tracing() or not self._measuring.acquire(blocking=False):
+            return func(*args), None
+        try:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = func(*args)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            self._measuring.release()
+        return result, peak
+
+    def record(self, route, peak):
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteMemoryStats()
+            stats.requests += 1
+            stats.peak_total += peak
+            stats.peak_max = max(stats.peak_max, peak)
+            stats.peak_last = peak
+
+    def maybe_snapshot(self):
+        with self._lock:
+            if time.monotonic() - self._snapshot_at < self.snapshot_interval:
+                return
+            self._snapshot_at = time.monotonic()
+        self.take_snapshot()
+
+    def take_snapshot(self):
+        """Records the top allocators now and how each grew since the previous snapshot."""
+        if not tracemalloc.is_tracing():
+            return None
+        with self._lock:
+            self._snapshot_at = time.monotonic()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        top = [
+            {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[: self.top]
+        ]
+        growth = []
+        if self._previous_snapshot is not None:
+            growth = [
+                {"location": str(stat.traceback), "size_diff_bytes": stat.size_diff, "size_bytes": stat.size}
+                for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[: self.top]
+                if stat.size_diff > 0
+            ]
+        traced, _peak = tracemalloc.get_traced_memory()
+        self._previous_snapshot = snapshot
+        self.snapshot = {"taken_at": time.time(), "traced_bytes": traced, "top": top, "growth": growth}
+        return self.snapshot
+
+    def over_budget(self):
+        """URL names whose worst request exceeded their MEMORY_BUDGETS entry."""
+        with self._lock:
+            return {
+                route: {"budget_bytes": budget, "peak_max_bytes": self.routes[route].peak_max}
+                for route, budget in self.budgets.items()
+                if route in self.routes and self.routes[route].peak_max > budget
+            }
+
+    def report(self):
+        rss, rss_peak = rss_bytes()
+        with self._lock:
+            routes = {route: stats.as_dict() for route, stats in sorted(self.routes.items())}
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "rss_bytes": rss,
+            "rss_peak_bytes": rss_peak,
+            "traced_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+            "routes": routes,
+            "budgets": self.budgets,
+            "over_budget": self.over_budget(),
+            "snapshot": self.snapshot,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+            self.snapshot = self._previous_snapshot = None
+            self._snapshot_at = 0.0
+
+
+memory_tracker = MemoryTracker.from_settings()
+
+
+class MemoryMiddleware:
+    """
+    Records per-request peak allocations per URL name when MEMORY_TRACKING is
+    on (removed from the chain otherwise). Async requests pass through.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "MEMORY_TRACKING", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        memory_tracker.start()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        response, peak = memory_tracker.measure(self.get_response, request)
+        if peak is not None:
+            match = getattr(request, "resolver_match", None)
+            memory_tracker.record(match.url_name if match and match.url_name else "unresolved", peak)
+        memory_tracker.maybe_snapshot()
+        return response
@@ -0,0 +1,330 @@
+"""
+Project-level middleware.
+
+Route-aware dispatch: stateless bearer-token calls under /api/ do not need the
+session, CSRF, auth-session or messages layers. RouteDispatchMiddleware tags
+each request with the chain it should run, and the ``full_chain_only``
+wrappers below step aside for requests tagged as lean. Everything else
+(/admin/, cookie-authenticated or anonymous browsing) runs the full chain.
+
+The wrappers subclass Django's own classes so the admin system checks, which
+look for those middleware in settings.MIDDLEWARE, keep passing.
+
+Compression: CompressionMiddleware gzip/brotli-encodes large text responses
+(brotli only when the optional ``brotli`` package is installed).
+
+Logging: RequestLogMiddleware tags log records with a request id and writes
+one structured access log line per request (see integra_core/logs.py).
+"""
+import logging
+import re
+import time
+import uuid
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.middleware import csrf
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .logs import current_user_id, request_context
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Request attribute set by RouteDispatchMiddleware
+LEAN_CHAIN_ATTR = "lean_middleware"
+
+
+def is_lean_request(request):
+    """True when the request was dispatched to the minimal /api/ chain."""
+    return getattr(request, LEAN_CHAIN_ATTR, False)
+
+
+class RouteDispatchMiddleware:
+    """
+    Chooses the middleware chain per request.
+
+    Lean chain: path under settings.LEAN_MIDDLEWARE_PATH_PREFIXES *and* an
+    ``Authorization: Bearer`` header. Must sit before any ``full_chain_only``
+    middleware in settings.MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(getattr(settings, "LEAN_MIDDLEWARE_PATH_PREFIXES", ("/api/",)))
+
+    def __call__(self, request):
+        setattr(
+            request,
+            LEAN_CHAIN_ATTR,
+            bool(self.prefixes)
+            and request.path_info.startswith(self.prefixes)
+            and request.META.get("HTTP_AUTHORIZATION", "").startswith("Bearer "),
+        )
+        return self.get_response(request)
+
+
+def full_chain_only(middleware_class):
+    """
+    Returns a subclass of ``middleware_class`` that is a pass-through on lean
+    requests. Works for sync and async handlers: on the lean path we simply
+    hand back whatever the next layer returns (a response or a coroutine).
+    """
+
+    class FullChainOnly(middleware_class):
+        def __call__(self, request):
+            if is_lean_request(request):
+                return self.get_response(request)
+            return super().__call__(request)
+
+    if hasattr(middleware_class, "process_view"):
+        def process_view(self, request, view_func, view_args, view_kwargs):
+            if is_lean_request(request):
+                return None
+            return middleware_class.process_view(self, request, view_func, view_args, view_kwargs)
+
+        FullChainOnly.process_view = process_view
+
+    FullChainOnly.__name__ = FullChainOnly.__qualname__ = middleware_class.__name__
+    FullChainOnly.__module__ = __name__
+    FullChainOnly.__doc__ = f"{middleware_class.__name__}, skipped for lean /api/ requests."
+    return FullChainOnly
+
+
+SessionMiddleware = full_chain_only(sessions_middleware.SessionMiddleware)
+CsrfViewMiddleware = full_chain_only(csrf.CsrfViewMiddleware)
+AuthenticationMiddleware = full_chain_only(auth_middleware.AuthenticationMiddleware)
+MessageMiddleware = full_chain_only(messages_middleware.MessageMiddleware)
+
+
+# =========================================================================
+# Response compression
+# =========================================================================
+
+DEFAULT_COMPRESSION_LEVELS = {"br": 5, "gzip": 6}
+
+
+def parse_accept_encoding(header):
+    """Returns the set of codings with a non-zero q-value from Accept-Encoding."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def _compressor(encoding, level):
+    if encoding == "br":
+        return brotli.Compressor(quality=level)
+    return zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+
+
+def compress_bytes(encoding, data, level):
+    compressor = _compressor(encoding, level)
+    if encoding == "br":
+        return compressor.process(data) + compressor.finish()
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(encoding, chunks, level):
+    compressor = _compressor(encoding, level)
+    if encoding == "br":
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+async def acompress_stream(encoding, chunks, level):
+    compressor = _compressor(encoding, level)
+    if encoding == "br":
+        async for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        async for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    gzip/brotli response compression.
+
+    Settings:
+    - COMPRESSION_MIN_SIZE: bytes below which buffered responses are sent as-is.
+    - COMPRESSION_CONTENT_TYPES: media types (prefix match) eligible for compression.
+    - COMPRESSION_LEVELS: default level per coding, e.g. {"br": 5, "gzip": 6}.
+    - COMPRESSION_ROUTE_LEVELS: per URL name overrides, e.g. {"schema": {"gzip": 9}}.
+
+    Responses exposing ``compressed_variant(encoding)`` /
+    ``store_compressed_variant(encoding, payload)`` (users.cache.CachedPayloadResponse)
+    are served from, and populate, the cached compressed variant of their body.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.content_types = tuple(getattr(settings, "COMPRESSION_CONTENT_TYPES", ("application/json",)))
+        self.levels = {**DEFAULT_COMPRESSION_LEVELS, **getattr(settings, "COMPRESSION_LEVELS", {})}
+        self.route_levels = getattr(settings, "COMPRESSION_ROUTE_LEVELS", {})
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def choose_encoding(self, request):
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        for encoding in self.encodings:
+            if encoding in accepted:
+                return encoding
+        return None
+
+    def level_for(self, request, encoding):
+        match = getattr(request, "resolver_match", None)
+        overrides = self.route_levels.get(match.url_name, {}) if match else {}
+        return overrides.get(encoding, self.levels[encoding])
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if not content_type.startswith(self.content_types):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+        level = self.level_for(request, encoding)
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(encoding, response.streaming_content, level)
+            else:
+                response.streaming_content = compress_stream(encoding, response.streaming_content, level)
+            # Compressed size is unknown until the stream is consumed.
+            del response.headers["Content-Length"]
+        else:
+            compressed = None
+            if hasattr(response, "compressed_variant"):
+                compressed = response.compressed_variant(encoding)
+            if compressed is None:
+                compressed = compress_bytes(encoding, response.content, level)
+                if len(compressed) >= len(response.content):
+                    return response
+                if hasattr(response, "store_compressed_variant"):
+                    response.store_compressed_variant(encoding, compressed)
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # A strong ETag no longer matches the encoded bytes (RFC 9110 8.8.1).
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+# =========================================================================
+# Request logging
+# =========================================================================
+
+access_logger = logging.getLogger("integra.access")
+
+# Request ids accepted from an upstream proxy / load balancer (X-Request-ID)
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestLogMiddleware:
+    """
+    Binds a request id to everything logged while the request is handled and
+    writes one ``integra.access`` record per request with its timing.
+
+    The id comes from a well-formed ``X-Request-ID`` header, or is generated,
+    and is echoed in the response. Put this first in settings.MIDDLEWARE so
+    the timing covers the whole chain. For streaming responses ``duration_ms``
+    is the time to the first byte.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_context.reset(token)
+        return self.finish(request, response, started)
+
+    async def __acall__(self, request):
+        token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_context.reset(token)
+        return self.finish(request, response, started)
+
+    def start(self, request):
+        request_id = request.headers.get("X-Request-ID", "")
+        if not REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        return request_context.set({"request_id": request_id, "request": request}), time.perf_counter()
+
+    def finish(self, request, response, started):
+        response.headers["X-Request-ID"] = request.request_id
+        match = getattr(request, "resolver_match", None)
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "request_id": request.request_id,
+                "user_id": current_user_id(request),
+                "method": request.method,
+                "path": request.path,
+                "route": match.url_name if match else None,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "streaming": response.streaming,
+            },
+        )
+        return response
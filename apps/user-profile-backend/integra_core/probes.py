@@ -0,0 +1,183 @@
+"""
+Load balancer / orchestrator probes, answered in front of Django.
+
+``ProbeWSGIMiddleware`` and ``ProbeASGIMiddleware`` wrap the Django
+application (integra_core/wsgi.py, asgi.py) and answer two paths themselves,
+without URL resolution, middleware or any view code:
+
+- ``/healthz`` (liveness): a constant 200. It never touches the database, so
+  a database outage doesn't get healthy workers restarted.
+- ``/readyz`` (readiness): 200 when the database answers ``SELECT 1``, no
+  migrations are pending and the cache round-trips a value; 503 (with the
+  failing checks) otherwise.
+
+Readiness results are cached for PROBE_READY_CACHE_SECONDS and computed by one
+thread at a time. Probing at any frequency costs at most one set of checks per
+interval per process. Once the migration state has been seen up to date, it is
+not checked again (no migrations are applied under a running process). Every
+other path goes to Django untouched.
+"""
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+HEALTH_PATH = "/healthz"
+READY_PATH = "/readyz"
+PROBE_METHODS = frozenset({"GET", "HEAD"})
+
+_HEALTHY = b'{"status": "ok"}'
+_HEADERS = [("Content-Type", "application/json"), ("Cache-Control", "no-store")]
+
+
+class ReadinessChecker:
+    def __init__(self, cache_seconds=2.0, database="default", cache_alias="default"):
+        self.cache_seconds = cache_seconds
+        self.database = database
+        self.cache_alias = cache_alias
+        self._result = None
+        self._checked_at = None
+        self._migrated = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(cache_seconds=getattr(settings, "PROBE_READY_CACHE_SECONDS", 2.0))
+
+    def cached(self):
+        """The last result while it is fresh, else None."""
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.cache_seconds:
+            return self._result
+        return None
+
+    def check(self):
+        """``(ready, {check: detail})``, recomputed at most once per ``cache_seconds``."""
+        result = self.cached()
+        if result is not None:
+            return result
+        with self._lock:
+            # Another thread may have refreshed it while we waited.
+            result = self.cached()
+            if result is None:
+                checks = {
+                    "database": self._run(self.check_database),
+                    "migrations": self._run(self.check_migrations),
+                    "cache": self._run(self.check_cache),
+                }
+                result = (all(check["ok"] for check in checks.values()), checks)
+                self._result, self._checked_at = result, time.monotonic()
+        return result
+
+    def _run(self, check):
+        started = time.perf_counter()
+        try:
+            detail = check() or {}
+            ok = detail.pop("ok", True)
+        except Exception as exc:
+            ok, detail = False, {"error": f"{type(exc).__name__}: {exc}"}
+        return {"ok": ok, "ms": round((time.perf_counter() - started) * 1000, 2), **detail}
+
+    def check_database(self):
+        from django.db import connections
+
+        connection = connections[self.database]
+        # What a request's close_old_connections() would do: drop a connection
+        # broken by a database restart, honour CONN_MAX_AGE.
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+    def check_migrations(self):
+        if self._migrated:
+            return None
+        from django.db import connections
+        from django.db.migrations.executor import MigrationExecutor
+
+        executor = MigrationExecutor(connections[self.database])
+        pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if pending:
+            return {"ok": False, "pending": [f"{migration.app_label}.{migration.name}" for migration, _ in pending]}
+        self._migrated = True
+        return None
+
+    def check_cache(self):
+        from django.core.cache import caches
+
+        cache = caches[self.cache_alias]
+        token = str(time.monotonic_ns())
+        cache.set("probe:readyz", token, 30)
+        if cache.get("probe:readyz") != token:
+            return {"ok": False, "error": "value written to the cache was not read back"}
+        return None
+
+    def response(self):
+        """``(status code, JSON body)`` of the readiness probe."""
+        ready, checks = self.check()
+        body = json.dumps({"status": "ready" if ready else "unavailable", "checks": checks}).encode()
+        return (200 if ready else 503), body
+
+
+_readiness = None
+
+
+def readiness():
+    global _readiness
+    if _readiness is None:
+        _readiness = ReadinessChecker.from_settings()
+    return _readiness
+
+
+def _probe_path(path, method):
+    if method in PROBE_METHODS and path in (HEALTH_PATH, READY_PATH):
+        return path
+    return None
+
+
+class ProbeWSGIMiddleware:
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        path = _probe_path(environ.get("PATH_INFO", ""), environ.get("REQUEST_METHOD"))
+        if path is None:
+            return self.application(environ, start_response)
+        if path == HEALTH_PATH:
+            status, body = 200, _HEALTHY
+        else:
+            status, body = readiness().response()
+        start_response(
+            "200 OK" if status == 200 else "503 Service Unavailable",
+            [*_HEADERS, ("Content-Length", str(len(body)))],
+        )
+        return [] if environ["REQUEST_METHOD"] == "HEAD" else [body]
+
+
+class ProbeASGIMiddleware:
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        path = _probe_path(scope.get("path", ""), scope.get("method")) if scope["type"] == "http" else None
+        if path is None:
+            return await self.application(scope, receive, send)
+        if path == HEALTH_PATH:
+            status, body = 200, _HEALTHY
+        else:
+            checker = readiness()
+            cached = checker.cached()
+            if cached is None:
+                # Database and cache clients block: check off the event loop.
+                status, body = await sync_to_async(checker.response, thread_sensitive=False)()
+            else:
+                status, body = checker.response()
+        headers = [(name.lower().encode(), value.encode()) for name, value in _HEADERS]
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [*headers, (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
@@ -0,0 +1,165 @@
+"""
+On-demand cProfile of live requests.
+
+A request is profiled when it carries a valid ``X-Profile-Token`` header (minted
+by ``manage.py profiles_report --issue-token``, signed with SECRET_KEY, valid
+for PROFILING_TOKEN_MAX_AGE seconds), or at random with probability
+PROFILING_SAMPLE_RATE. Each profile is written to PROFILING_DIR as a pstats
+``.prof`` file, with a ``.json`` sidecar holding the route, status, timing and
+request id. Only the newest PROFILING_MAX_FILES profiles are kept.
+``manage.py profiles_report`` aggregates the hottest functions per URL name.
+
+At most one request per process is profiled at a time, guarded by a
+non-blocking lock. A request that can't get the lock runs unprofiled instead of
+waiting, so turning sampling up never queues requests behind the profiler.
+Async views (the change stream) are never profiled: cProfile follows one
+thread, not an event loop.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+
+from .logs import current_user_id
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = "X-Profile-Token"
+TOKEN_SALT = "integra_core.profiling"
+
+# One profile at a time per process
+_profiling = threading.Lock()
+
+
+def issue_token(issued_by):
+    """A signed token that turns on profiling for the requests carrying it."""
+    return signing.dumps({"by": issued_by}, salt=TOKEN_SALT, compress=True)
+
+
+def check_token(token, max_age):
+    """Who issued ``token``, or None when it is invalid or expired."""
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=max_age)["by"]
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+def profile_files(directory):
+    """``(prof_path, metadata)`` of every stored profile, oldest first."""
+    entries = []
+    for meta_path in Path(directory).glob("*.json"):
+        prof_path = meta_path.with_suffix(".prof")
+        try:
+            metadata = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            continue
+        if prof_path.exists():
+            entries.append((prof_path, metadata))
+    entries.sort(key=lambda entry: entry[1].get("created", 0))
+    return entries
+
+
+def rotate(directory, keep):
+    """Deletes all but the ``keep`` newest profiles (file names start with the UTC time)."""
+    names = sorted(path.stem for path in Path(directory).glob("*.prof"))
+    for name in names[: max(len(names) - keep, 0)]:
+        for suffix in (".prof", ".json"):
+            try:
+                (Path(directory) / f"{name}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    Put it right after RequestLogMiddleware: the profile then covers the rest
+    of the middleware chain and the view, and carries the request id.
+
+    Settings: PROFILING_DIR, PROFILING_SAMPLE_RATE (0-1), PROFILING_MAX_FILES,
+    PROFILING_TOKEN_MAX_AGE.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.directory = Path(getattr(settings, "PROFILING_DIR", settings.BASE_DIR / "profiles"))
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        self.max_files = getattr(settings, "PROFILING_MAX_FILES", 500)
+        self.token_max_age = getattr(settings, "PROFILING_TOKEN_MAX_AGE", 60 * 60)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        trigger = self.trigger(request)
+        if trigger is None or not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration_ms = (time.perf_counter() - started) * 1000
+        finally:
+            _profiling.release()
+
+        try:
+            profile_id = self.save(profiler, request, response, trigger, duration_ms)
+        except OSError:
+            logger.exception("Could not write request profile to %s", self.directory)
+        else:
+            if trigger != "sample":
+                response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    def trigger(self, request):
+        """Why this request should be profiled ("sample" or "token:<issuer>"), or None."""
+        token = request.headers.get(TOKEN_HEADER)
+        if token:
+            issued_by = check_token(token, self.token_max_age)
+            if issued_by is not None:
+                return f"token:{issued_by}"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def save(self, profiler, request, response, trigger, duration_ms):
+        match = getattr(request, "resolver_match", None)
+        route = match.url_name if match and match.url_name else "unresolved"
+        request_id = getattr(request, "request_id", None) or os.urandom(8).hex()
+        created = time.time()
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(created))}-{route}-{request_id}"
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        prof_path = self.directory / f"{profile_id}.prof"
+        profiler.dump_stats(prof_path)
+        metadata = {
+            "id": profile_id,
+            "created": created,
+            "route": route,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 2),
+            "trigger": trigger,
+            "request_id": request_id,
+            "user_id": current_user_id(request),
+            "pid": os.getpid(),
+        }
+        # The sidecar is written last: profiles_report ignores a .prof without one.
+        prof_path.with_suffix(".json").write_text(json.dumps(metadata))
+        rotate(self.directory, self.max_files)
+        return profile_id
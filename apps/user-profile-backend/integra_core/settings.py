@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,6 +42,11 @@ DEBUG = env_bool("DJANGO_DEBUG", False)
 # Restrict hosts by env; safe defaults for local dev
 ALLOWED_HOSTS = env_list("DJANGO_ALLOWED_HOSTS", ["localhost", "127.0.0.1"])
 
+# Runtime profile: "full" (default) serves the admin and API docs UI;
+# "api" boots only what the /api/ routes need (faster worker cold start).
+RUNTIME_PROFILE = os.getenv("DJANGO_RUNTIME_PROFILE", "full").lower()
+API_ONLY = RUNTIME_PROFILE == "api"
+
 
 # Application definition
 
@@ -60,20 +67,50 @@ INSTALLED_APPS = [
 
 ]
 
+# CORS and security headers always run. RouteDispatchMiddleware sends bearer-token
+# /api/ calls down a lean chain: the integra_core.middleware wrappers of the
+# session, CSRF, auth and messages middleware step aside for those requests.
 MIDDLEWARE = [
+    'integra_core.middleware.RequestLogMiddleware',
+    'integra_core.profiling.ProfilingMiddleware',
+    'integra_core.memory.MemoryMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'integra_core.middleware.CompressionMiddleware',
     
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'integra_core.middleware.RouteDispatchMiddleware',
+    'integra_core.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'integra_core.middleware.CsrfViewMiddleware',
+    'integra_core.middleware.AuthenticationMiddleware',
+    'integra_core.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
 
 ]
 
+# Path prefixes eligible for the lean middleware chain (bearer-token requests only)
+LEAN_MIDDLEWARE_PATH_PREFIXES = ("/api/",)
+
+# Apps and middleware only needed by the admin / browsable docs (skipped when API_ONLY)
+FULL_PROFILE_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'drf_spectacular',
+]
+FULL_PROFILE_MIDDLEWARE = [
+    'integra_core.middleware.SessionMiddleware',
+    'integra_core.middleware.CsrfViewMiddleware',
+    'integra_core.middleware.AuthenticationMiddleware',
+    'integra_core.middleware.MessageMiddleware',
+]
+
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in FULL_PROFILE_APPS]
+    MIDDLEWARE = [mw for mw in MIDDLEWARE if mw not in FULL_PROFILE_MIDDLEWARE]
+
 ROOT_URLCONF = 'integra_core.urls'
 
 TEMPLATES = [
@@ -91,6 +128,12 @@ TEMPLATES = [
     },
 ]
 
+if API_ONLY:
+    TEMPLATES[0]['OPTIONS']['context_processors'] = [
+        'django.template.context_processors.request',
+        'django.contrib.auth.context_processors.auth',
+    ]
+
 WSGI_APPLICATION = 'integra_core.wsgi.application'
 
 
@@ -163,6 +206,9 @@ CORS_ALLOWED_ORIGINS = env_list(
     ],
 )
 
+# Browsers must be allowed to send the idempotency header cross-origin (users/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+
 # 2. DRF Settings with JWT Auth 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -170,10 +216,18 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
+if API_ONLY:
+    # The browsable API needs templates/staticfiles; API-only nodes speak JSON.
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'rest_framework.renderers.JSONRenderer',
+    )
 
 # 3. assign the defined user model (Critical for B2B Logic!)
 AUTH_USER_MODEL = 'users.User'
 
+# Log in with username, email or advisor ID (users/backends.py)
+AUTHENTICATION_BACKENDS = ['users.backends.IdentifierBackend']
+
 # 4. Production-leaning security defaults (can be relaxed via DEBUG=True)
 SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
@@ -181,3 +235,153 @@ SECURE_HSTS_SECONDS = int(os.getenv("DJANGO_SECURE_HSTS_SECONDS", 0 if DEBUG els
 SECURE_HSTS_INCLUDE_SUBDOMAINS = not DEBUG and SECURE_HSTS_SECONDS > 0
 SECURE_HSTS_PRELOAD = not DEBUG and SECURE_HSTS_SECONDS > 0
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+
+# 5. Response caching & compression
+PROFILE_CACHE_TIMEOUT = int(os.getenv("DJANGO_PROFILE_CACHE_TIMEOUT", 60 * 5))
+SCHEMA_CACHE_TIMEOUT = int(os.getenv("DJANGO_SCHEMA_CACHE_TIMEOUT", 60 * 60))
+# Stampede protection (users/cache.py): rebuild lock lifetime in seconds, and how
+# eagerly hot entries refresh before expiry (XFetch beta; 0 disables early refresh)
+CACHE_LOCK_TIMEOUT = int(os.getenv("DJANGO_CACHE_LOCK_TIMEOUT", 10))
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("DJANGO_CACHE_EARLY_REFRESH_BETA", 1.0))
+
+COMPRESSION_MIN_SIZE = int(os.getenv("DJANGO_COMPRESSION_MIN_SIZE", 1024))
+# No text/html: admin pages reflect request input (?q=) next to advisor emails
+# and IDs, and compressing them without length padding invites BREACH.
+COMPRESSION_CONTENT_TYPES = (
+    "application/json",
+    "application/vnd.oai.openapi",  # also matches the +json variant
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+)
+# Default level per coding; brotli ("br") is used only if the brotli package is installed
+COMPRESSION_LEVELS = {"br": 5, "gzip": 6}
+# Per-route overrides keyed by URL name: the schema is cached, so compress it hard once
+COMPRESSION_ROUTE_LEVELS = {
+    "schema": {"br": 11, "gzip": 9},
+}
+
+# 6. Profile audit log (buffered writer, see users/audit.py)
+PROFILE_AUDIT_BATCH_SIZE = int(os.getenv("DJANGO_PROFILE_AUDIT_BATCH_SIZE", 200))
+PROFILE_AUDIT_FLUSH_INTERVAL = float(os.getenv("DJANGO_PROFILE_AUDIT_FLUSH_INTERVAL", 2.0))
+# Hard cap on buffered rows; rows past it are spilled to the NDJSON file or dropped
+PROFILE_AUDIT_MAX_PENDING = int(os.getenv("DJANGO_PROFILE_AUDIT_MAX_PENDING", 10_000))
+# Upper bound on how long a PATCH may wait when the buffer is full
+PROFILE_AUDIT_MAX_BLOCK_MS = int(os.getenv("DJANGO_PROFILE_AUDIT_MAX_BLOCK_MS", 50))
+# Optional NDJSON mirror of every flushed batch (e.g. for log shipping)
+PROFILE_AUDIT_NDJSON_PATH = os.getenv("DJANGO_PROFILE_AUDIT_NDJSON_PATH") or None
+
+# 7. Background tasks (users/tasks.py, run with `manage.py run_workers`)
+# Eager mode runs tasks inline instead of queueing them (tests / local dev)
+TASKS_EAGER = env_bool("DJANGO_TASKS_EAGER", False)
+TASKS_DEFAULT_MAX_ATTEMPTS = int(os.getenv("DJANGO_TASKS_MAX_ATTEMPTS", 5))
+TASKS_BACKOFF_BASE = float(os.getenv("DJANGO_TASKS_BACKOFF_BASE", 2.0))
+TASKS_BACKOFF_MAX = float(os.getenv("DJANGO_TASKS_BACKOFF_MAX", 600))
+# RUNNING tasks older than this are assumed orphaned by a dead worker and retried
+TASKS_VISIBILITY_TIMEOUT = int(os.getenv("DJANGO_TASKS_VISIBILITY_TIMEOUT", 300))
+
+# 8. Fund entitlements (users/entitlements.py)
+# How often each process checks the change counter and applies new grants/revocations
+ENTITLEMENTS_REFRESH_INTERVAL = float(os.getenv("DJANGO_ENTITLEMENTS_REFRESH_INTERVAL", 5.0))
+# Advisors holding at least this many funds are stored as a bitmap instead of a set
+ENTITLEMENTS_DENSE_THRESHOLD = int(os.getenv("DJANGO_ENTITLEMENTS_DENSE_THRESHOLD", 64))
+
+# 9. Admin changelists over large tables (users/paginators.py)
+# Filtered changelists count at most this many rows ("10000+" beyond it)
+ADMIN_COUNT_LIMIT = int(os.getenv("DJANGO_ADMIN_COUNT_LIMIT", 10_000))
+# Below this estimated size, unfiltered changelists are counted exactly
+ADMIN_EXACT_COUNT_THRESHOLD = int(os.getenv("DJANGO_ADMIN_EXACT_COUNT_THRESHOLD", 10_000))
+# Lifetime of cached counts and keyset page boundaries
+ADMIN_COUNT_CACHE_TIMEOUT = int(os.getenv("DJANGO_ADMIN_COUNT_CACHE_TIMEOUT", 300))
+# Bulk reassignment actions on more advisors than this are queued as a background task
+ADMIN_BULK_SYNC_LIMIT = int(os.getenv("DJANGO_ADMIN_BULK_SYNC_LIMIT", 5000))
+
+# 10. Profile change stream (users/events.py, GET /api/user/profile/stream/)
+# Cross-process broadcast backend; the default only reaches streams in the publishing process
+PROFILE_EVENTS_BROADCAST = os.getenv("DJANGO_PROFILE_EVENTS_BROADCAST", "users.events.LocalBroadcast")
+# Seconds of silence before a heartbeat comment (keeps proxies from closing idle streams)
+PROFILE_EVENTS_HEARTBEAT = float(os.getenv("DJANGO_PROFILE_EVENTS_HEARTBEAT", 15.0))
+# Events buffered per stream; a client further behind gets one "resync" event instead
+PROFILE_EVENTS_QUEUE_SIZE = int(os.getenv("DJANGO_PROFILE_EVENTS_QUEUE_SIZE", 16))
+PROFILE_EVENTS_MAX_STREAMS = int(os.getenv("DJANGO_PROFILE_EVENTS_MAX_STREAMS", 10_000))
+PROFILE_EVENTS_MAX_STREAMS_PER_USER = int(os.getenv("DJANGO_PROFILE_EVENTS_MAX_STREAMS_PER_USER", 10))
+
+# 11. Transactional outbox (users/outbox.py, delivered by `manage.py dispatch_outbox`)
+# Sinks get every batch, Django-style {"BACKEND": ..., "OPTIONS": {...}}; e.g. the CRM
+# webhook: {"BACKEND": "users.outbox.HttpSink", "OPTIONS": {"url": "https://crm/hooks/advisors"}}
+OUTBOX_SINKS = [
+    {
+        "BACKEND": "users.outbox.FileSink",
+        "OPTIONS": {"path": os.getenv("DJANGO_OUTBOX_FILE", str(BASE_DIR / "outbox.ndjson"))},
+    },
+]
+OUTBOX_BATCH_SIZE = int(os.getenv("DJANGO_OUTBOX_BATCH_SIZE", 500))
+# Claimed events not delivered within this many seconds (dead dispatcher) are claimed again
+OUTBOX_VISIBILITY_TIMEOUT = int(os.getenv("DJANGO_OUTBOX_VISIBILITY_TIMEOUT", 60))
+# Failed deliveries before an event becomes a dead letter (admin: requeue after fixing the cause)
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("DJANGO_OUTBOX_MAX_ATTEMPTS", 10))
+
+# 12. Idempotent writes (users/idempotency.py, `Idempotency-Key` request header)
+# How long a write's response is kept for replaying retries with the same key
+IDEMPOTENCY_KEY_TTL = int(os.getenv("DJANGO_IDEMPOTENCY_KEY_TTL", 60 * 60 * 24))
+# Longest a concurrent duplicate waits for the first attempt before answering 409
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("DJANGO_IDEMPOTENCY_LOCK_TIMEOUT", 10))
+
+# 13. Logging (integra_core/logs.py): JSON lines, written by a background thread
+LOG_LEVEL = os.getenv("DJANGO_LOG_LEVEL", "INFO").upper()
+# Per-request access lines (integra.access); set to WARNING to silence them
+ACCESS_LOG_LEVEL = os.getenv("DJANGO_ACCESS_LOG_LEVEL", "INFO").upper()
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "integra_core.logs.JsonFormatter"},
+    },
+    "handlers": {
+        "queue": {
+            "class": "integra_core.logs.QueueHandler",
+            "formatter": "json",
+            # Records beyond this many waiting are dropped and counted, never waited on
+            "maxsize": int(os.getenv("DJANGO_LOG_QUEUE_SIZE", 10_000)),
+            # Most records per write/flush
+            "batch_size": int(os.getenv("DJANGO_LOG_BATCH_SIZE", 500)),
+            # stderr unless set; the file is reopened after logrotate moves it
+            "filename": os.getenv("DJANGO_LOG_FILE") or None,
+        },
+    },
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        # Django's defaults would print to the console as well
+        "django": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "integra.access": {"level": ACCESS_LOG_LEVEL},
+    },
+}
+
+# 14. Request profiling (integra_core/profiling.py, report with `manage.py profiles_report`)
+# Fraction of requests profiled at random (0 disables sampling; signed tokens still work)
+PROFILING_SAMPLE_RATE = float(os.getenv("DJANGO_PROFILING_SAMPLE_RATE", 0))
+PROFILING_DIR = Path(os.getenv("DJANGO_PROFILING_DIR", BASE_DIR / "profiles"))
+# Newest profiles kept on disk (each is a .prof plus a .json sidecar)
+PROFILING_MAX_FILES = int(os.getenv("DJANGO_PROFILING_MAX_FILES", 500))
+# Lifetime of X-Profile-Token values minted by `profiles_report --issue-token`
+PROFILING_TOKEN_MAX_AGE = int(os.getenv("DJANGO_PROFILING_TOKEN_MAX_AGE", 60 * 60))
+
+# 15. Memory instrumentation (integra_core/memory.py, GET /api/diagnostics/memory/)
+# tracemalloc per-request peaks and allocator snapshots; slows workers, keep it off by default
+MEMORY_TRACKING = env_bool("DJANGO_MEMORY_TRACKING", False)
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv("DJANGO_MEMORY_TRACEMALLOC_FRAMES", 1))
+# Seconds between top-allocator snapshots (taken at the end of a request)
+MEMORY_SNAPSHOT_INTERVAL = float(os.getenv("DJANGO_MEMORY_SNAPSHOT_INTERVAL", 300))
+MEMORY_SNAPSHOT_TOP = 25
+# Allowed peak bytes allocated by one request, per URL name (checked by the
+# diagnostics endpoint and `python -m benchmarks.memory`)
+MEMORY_BUDGETS = {
+    "user_profile": 256 * 1024,
+    "session_bootstrap": 256 * 1024,
+    "firm_stats": 1024 * 1024,
+}
+
+# 16. Health probes (integra_core/probes.py: /healthz, /readyz in front of Django)
+# Readiness results are reused for this long, however often the probes hit a worker
+PROBE_READY_CACHE_SECONDS = float(os.getenv("DJANGO_PROBE_READY_CACHE_SECONDS", 2.0))
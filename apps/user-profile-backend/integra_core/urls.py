@@ -5,8 +5,11 @@ This file defines the top-level routing for the entire application, serving thre
 1. Handles the root URL ('/') by redirecting users to the API documentation.
 2. Sets up the default Django administrative interface ('/admin/').
 3. Includes all application-level API endpoints defined in users.urls under the '/api/' prefix.
+
+The admin is only mounted (and imported) when it is installed, so API-only
+workers (DJANGO_RUNTIME_PROFILE=api) never pay for django.contrib.admin.
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 from django.views.generic.base import RedirectView 
 
@@ -19,14 +22,20 @@ urlpatterns = [
     # This solves the 404 error when users visit http://127.0.0.1:8000/
     path(
         '', 
-        RedirectView.as_view(url='/api/schema/swagger-ui/', permanent=True), 
+        RedirectView.as_view(
+            url='/api/schema/swagger-ui/' if apps.is_installed('drf_spectacular') else '/api/schema/',
+            permanent=True,
+        ), 
         name='root_redirect'
     ), 
     
-    # 2. Django Admin Interface
-    path('admin/', admin.site.urls),
-    
-    # 3. API Entry Point: Includes all application-specific API routes (from users/urls.py).
+    # 2. API Entry Point: Includes all application-specific API routes (from users/urls.py).
     # All endpoints are now accessible under the /api/ prefix (e.g., /api/auth/login/).
     path('api/', include('users.urls')), 
-]
\ No newline at end of file
+]
+
+# 3. Django Admin Interface (full runtime profile only)
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
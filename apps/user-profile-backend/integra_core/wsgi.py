@@ -5,6 +5,9 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
+
+/healthz and /readyz are answered by the probe wrapper before Django sees the
+request (integra_core/probes.py).
 """
 
 import os
@@ -14,3 +17,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'integra_core.settings')
 
 application = get_wsgi_application()
+
+from integra_core.probes import ProbeWSGIMiddleware  # noqa: E402 (needs configured settings)
+
+application = ProbeWSGIMiddleware(application)
@@ -1,27 +1,228 @@
-from django.contrib import admin
+import json
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from . import outbox
+from .bulk import reassign_advisors
+from .entitlements import revoke
+from .events import publish_profile_change
+from .paginators import LargeTablePaginator
+from .serializers import UserProfileSerializer
+from .tasks import enqueue
+from .models import AdvisorFundAccess, BackgroundTask, Firm, OutboxEvent, ProfileChange, User
 
 # === Custom Admin for B2B Advisor User ===
 
+class ReassignActionForm(ActionForm):
+    """Extra inputs next to the action dropdown for the bulk reassignment actions."""
+    firm = forms.ModelChoiceField(queryset=Firm.objects.all(), required=False)
+    role = forms.CharField(max_length=100, required=False)
+
+
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     # Fieldsets for editing an EXISTING user
     fieldsets = UserAdmin.fieldsets + (
         # New section for B2B Advisor specific fields
-        ('B2B Advisor Info', {'fields': ('advisor_id', 'firm_name', 'role', 'bio', 'avatar_url')}),
+        ('B2B Advisor Info', {'fields': ('advisor_id', 'firm', 'role', 'bio', 'avatar_url')}),
     )
 
     # Fieldsets for CREATING a NEW user
     add_fieldsets = UserAdmin.add_fieldsets + (
         # We need to explicitly define the fields here as well
         ('B2B Advisor Info', {
-            'fields': ('advisor_id', 'firm_name', 'role', 'bio', 'avatar_url', 'email'),
+            'fields': ('advisor_id', 'firm', 'role', 'bio', 'avatar_url', 'email'),
         }),
     )
 
-    # Optional: Display advisor_id and firm_name directly in the list view
-    list_display = UserAdmin.list_display + ('advisor_id', 'firm_name', 'role')
+    # Optional: Display advisor_id and firm directly in the list view
+    list_display = UserAdmin.list_display + ('advisor_id', 'firm', 'role')
+    list_select_related = ('firm',)
+    autocomplete_fields = ('firm',)
+    # Filter on the indexed firm_id FK rather than the legacy firm_name string.
+    list_filter = UserAdmin.list_filter + ('firm',)
+
+    # Large-table changelist: estimated/bounded counts, keyset pages, no second
+    # unfiltered COUNT(*) for the "N total" link (users/paginators.py).
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+    # Bulk reassignment (firm mergers): chunked UPDATEs instead of per-row saves.
+    action_form = ReassignActionForm
+    actions = ['move_to_firm', 'set_role']
+
+    # Heavy columns the changelist never displays.
+    changelist_deferred_fields = ('password', 'bio', 'avatar_url', 'firm_name')
+
+    # Form fields of the public profile, and the profile field each one feeds
+    profile_form_fields = {
+        **{name: name for name in UserProfileSerializer.Meta.fields},
+        'firm': 'firm_name',
+    }
+
+    def save_model(self, request, obj, form, change):
+        """
+        An edit to profile fields bumps ``profile_version``, adds an outbox
+        event and is published to the advisor's open change streams after
+        commit, like a portal PATCH (users/views.py).
+        """
+        changed = [name for name in form.changed_data if name in self.profile_form_fields] if change else []
+        if not changed:
+            return super().save_model(request, obj, form, change)
+        obj.profile_version = F('profile_version') + 1
+        super().save_model(request, obj, form, change)
+        obj.refresh_from_db(fields=['profile_version'])
+
+        user_id, version = obj.pk, obj.profile_version
+        changes = {
+            name: [form.initial.get(name), getattr(obj, obj._meta.get_field(name).attname)] for name in changed
+        }
+        outbox.emit(user_id, "profile.updated", {
+            "version": version,
+            "changes": json.loads(json.dumps(changes, cls=DjangoJSONEncoder)),  # e.g. date_joined
+            "changed_by": request.user.pk,
+            "source": "admin",
+        })
+        profile = json.loads(obj.profile_snapshot)
+        public = {self.profile_form_fields[name] for name in changed}
+        if 'bio' in public:
+            public.add('bio_html')
+        fields = {name: profile[name] for name in public}
+        transaction.on_commit(lambda: publish_profile_change(user_id, version, fields))
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match is not None and match.url_name == f"{self.opts.app_label}_{self.opts.model_name}_changelist":
+            queryset = queryset.defer(*self.changelist_deferred_fields)
+        return queryset
+
+    def _action_form(self, request):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        return form
+
+    @admin.action(description="Move selected advisors to firm")
+    def move_to_firm(self, request, queryset):
+        form = self._action_form(request)
+        if not form.is_valid() or form.cleaned_data['firm'] is None:
+            self.message_user(request, "Choose a firm to move the advisors to.", messages.WARNING)
+            return
+        self._reassign(request, queryset, firm=form.cleaned_data['firm'])
+
+    @admin.action(description="Set role of selected advisors")
+    def set_role(self, request, queryset):
+        form = self._action_form(request)
+        if not form.is_valid() or not form.cleaned_data['role'].strip():
+            self.message_user(request, "Enter the role to assign.", messages.WARNING)
+            return
+        self._reassign(request, queryset, role=form.cleaned_data['role'].strip())
+
+    def _reassign(self, request, queryset, firm=None, role=None):
+        # Large selections (e.g. "select all" on a firm filter) run on a worker.
+        user_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        if len(user_ids) > getattr(settings, 'ADMIN_BULK_SYNC_LIMIT', 5000):
+            enqueue('users.reassign_advisors', {
+                'user_ids': user_ids,
+                'firm_id': firm.pk if firm else None,
+                'role': role,
+                'changed_by_id': request.user.pk,
+            })
+            self.message_user(request, f"Reassignment of {len(user_ids)} advisors queued; progress is logged by the task worker.")
+            return
+        changed = reassign_advisors(
+            queryset.model.objects.filter(pk__in=user_ids),
+            firm=firm,
+            role=role,
+            changed_by=request.user,
+            source="admin-bulk",
+        )
+        self.message_user(request, f"{changed} of {len(user_ids)} advisor(s) updated.")
+
+
+@admin.register(Firm)
+class FirmAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name',)
 
 # Note: The code is now clean, and the fields are logically grouped 
-# in the Django Admin interface.
\ No newline at end of file
+# in the Django Admin interface.
+
+
+# === Read-only audit trail of profile edits ===
+
+@admin.register(ProfileChange)
+class ProfileChangeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'changed_by', 'source', 'created_at')
+    list_filter = ('source',)
+    search_fields = ('user__username', 'user__advisor_id')
+    list_select_related = ('user', 'changed_by')
+    readonly_fields = ('user', 'changed_by', 'source', 'changes', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# === Background task queue (inspect failures, requeue) ===
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error', 'created_at', 'locked_at')
+    actions = ['requeue']
+
+    @admin.action(description="Requeue selected tasks now")
+    def requeue(self, request, queryset):
+        updated = queryset.update(status=BackgroundTask.Status.PENDING, run_at=timezone.now(), attempts=0, locked_at=None)
+        self.message_user(request, f"{updated} task(s) requeued.")
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'user', 'attempts', 'available_at', 'claimed_by', 'dead_at', 'created_at')
+    # "dead_at: Not empty" lists the dead letters
+    list_filter = ('topic', ('dead_at', admin.EmptyFieldListFilter))
+    readonly_fields = (
+        'user', 'topic', 'payload', 'created_at', 'attempts', 'claimed_by', 'locked_at', 'last_error', 'dead_at',
+    )
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected events now")
+    def retry_now(self, request, queryset):
+        # Dead letters are requeued with a fresh attempt budget.
+        updated = queryset.update(available_at=timezone.now(), claimed_by=None, locked_at=None, dead_at=None, attempts=0)
+        self.message_user(request, f"{updated} event(s) due for delivery.")
+
+
+# === Fund entitlements (revoked, never deleted, so index refreshes see it) ===
+
+@admin.register(AdvisorFundAccess)
+class AdvisorFundAccessAdmin(admin.ModelAdmin):
+    list_display = ('advisor_id', 'fund_code', 'is_active', 'version', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('advisor_id', 'fund_code')
+    readonly_fields = ('version', 'updated_at')
+    actions = ['revoke_access']
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Revoke selected fund access")
+    def revoke_access(self, request, queryset):
+        grants = queryset.filter(is_active=True).values_list('advisor_id', 'fund_code')
+        by_advisor = {}
+        for advisor_id, fund_code in grants:
+            by_advisor.setdefault(advisor_id, []).append(fund_code)
+        for advisor_id, fund_codes in by_advisor.items():
+            revoke(advisor_id, fund_codes)
+        self.message_user(request, f"{sum(map(len, by_advisor.values()))} grant(s) revoked.")
@@ -0,0 +1,221 @@
+"""
+Buffered, batched audit log of profile changes.
+
+Request threads only append to an in-memory buffer; a daemon thread flushes it
+with ``bulk_create`` when it reaches ``batch_size`` rows or every
+``flush_interval`` seconds, and mirrors each batch to an optional NDJSON file.
+The buffer is flushed at interpreter exit (atexit runs on a normal worker
+shutdown, including gunicorn's SIGTERM handling).
+
+The extra cost on the PATCH path is one lock acquisition plus a list append.
+Only when the flusher falls behind by ``max_pending`` rows does ``record`` wait,
+and never longer than ``max_block_ms``. ``max_pending`` is a hard bound, also
+while failed flushes keep their rows for retry (e.g. a database outage). Rows
+past it are appended to the NDJSON file marked ``"spilled": true`` (for
+replay) when one is configured and dropped otherwise. They are counted in
+``stats`` and reported by the flusher's log, the way the JSON log queue reports
+its drops (integra_core/logs.py).
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ProfileChange
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileAuditWriter:
+    def __init__(self, batch_size=200, flush_interval=2.0, max_pending=10_000, max_block_ms=50, ndjson_path=None):
+        self.batch_size = batch_size
+        # 0 disables the background thread (flush() must then be called explicitly)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_block_ms = max_block_ms
+        self.ndjson_path = ndjson_path
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self._reported_overflow = (0, 0)
+        self.stats = {
+            "recorded": 0,
+            "written": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "overflows": 0,
+            "spilled": 0,
+            "dropped": 0,
+            "record_us_total": 0.0,
+            "record_us_max": 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            batch_size=getattr(settings, "PROFILE_AUDIT_BATCH_SIZE", 200),
+            flush_interval=getattr(settings, "PROFILE_AUDIT_FLUSH_INTERVAL", 2.0),
+            max_pending=getattr(settings, "PROFILE_AUDIT_MAX_PENDING", 10_000),
+            max_block_ms=getattr(settings, "PROFILE_AUDIT_MAX_BLOCK_MS", 50),
+            ndjson_path=getattr(settings, "PROFILE_AUDIT_NDJSON_PATH", None),
+        )
+
+    # --- Request path ---
+
+    def record(self, user_id, changes, changed_by_id=None, source="portal"):
+        """Buffers one change set; never touches the database."""
+        started = time.perf_counter()
+        row = ProfileChange(
+            user_id=user_id,
+            changed_by_id=changed_by_id,
+            changes=changes,
+            source=source,
+            created_at=timezone.now(),
+        )
+        overflow = False
+        with self._lock:
+            if len(self._pending) >= self.max_pending and self._thread is not None:
+                self._wakeup.set()
+                self._drained.wait(self.max_block_ms / 1000)
+            if len(self._pending) >= self.max_pending:
+                self.stats["overflows"] += 1
+                overflow = True
+            else:
+                self._pending.append(row)
+            pending = len(self._pending)
+            elapsed_us = (time.perf_counter() - started) * 1_000_000
+            self.stats["recorded"] += 1
+            self.stats["record_us_total"] += elapsed_us
+            self.stats["record_us_max"] = max(self.stats["record_us_max"], elapsed_us)
+
+        if overflow:
+            self._spill([row])
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_flusher()
+
+    # --- Flushing ---
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Writes everything buffered so far. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                ProfileChange.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception:
+                self.stats["failed_flushes"] += 1
+                with self._lock:
+                    # Keep the rows for the next attempt, oldest first, up to max_pending.
+                    self._pending[:0] = batch
+                    overflow = self._pending[self.max_pending:]
+                    del self._pending[self.max_pending:]
+                self._spill(overflow)
+                raise
+            finally:
+                with self._lock:
+                    self._drained.notify_all()
+            self._write_ndjson(batch)
+            self.stats["flushes"] += 1
+            self.stats["written"] += len(batch)
+            return len(batch)
+
+    def _spill(self, rows):
+        """Rows over ``max_pending``: to the NDJSON file if there is one, else dropped."""
+        if not rows:
+            return
+        if self.ndjson_path:
+            try:
+                self._write_ndjson(rows, spilled=True)
+            except OSError:
+                pass
+            else:
+                with self._lock:
+                    self.stats["spilled"] += len(rows)
+                return
+        with self._lock:
+            self.stats["dropped"] += len(rows)
+
+    def _report_overflow(self):
+        with self._lock:
+            spilled, dropped = self.stats["spilled"], self.stats["dropped"]
+        reported_spilled, reported_dropped = self._reported_overflow
+        if spilled > reported_spilled or dropped > reported_dropped:
+            self._reported_overflow = (spilled, dropped)
+            logger.warning(
+                "Profile audit buffer full (max_pending=%s): %s rows spilled to %s, %s dropped since last report",
+                self.max_pending, spilled - reported_spilled, self.ndjson_path, dropped - reported_dropped,
+            )
+
+    def _write_ndjson(self, batch, spilled=False):
+        if not self.ndjson_path:
+            return
+        lines = [
+            json.dumps(
+                {
+                    "user_id": row.user_id,
+                    "changed_by_id": row.changed_by_id,
+                    "source": row.source,
+                    "changes": row.changes,
+                    "created_at": row.created_at,
+                    **({"spilled": True} if spilled else {}),
+                },
+                cls=DjangoJSONEncoder,
+            )
+            for row in batch
+        ]
+        with open(self.ndjson_path, "a", encoding="utf-8") as sink:
+            sink.write("\n".join(lines) + "\n")
+
+    def _ensure_flusher(self):
+        if self._thread is not None or not self.flush_interval or self._stopping:
+            return
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Profile audit flush failed; rows kept for retry")
+            finally:
+                self._report_overflow()
+                # This thread owns its DB connection; honour CONN_MAX_AGE.
+                close_old_connections()
+
+    def close(self):
+        """Stops the background thread and flushes whatever is left."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Profile audit flush at shutdown failed; %s rows lost", self.pending())
+
+
+profile_audit = ProfileAuditWriter.from_settings()
@@ -0,0 +1,32 @@
+"""
+Login by username, email or advisor ID (AUTHENTICATION_BACKENDS).
+
+The identifier is resolved with one indexed query
+(``AdvisorManager.get_by_identifier``). Unknown identifiers still pay for one
+password hash, so response times don't reveal which identifiers exist.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import BaseBackend, ModelBackend
+
+UserModel = get_user_model()
+
+
+class IdentifierBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, identifier=None, **kwargs):
+        if identifier is None:
+            identifier = username if username is not None else kwargs.get(UserModel.USERNAME_FIELD)
+        if identifier is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_identifier(identifier)
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    # ModelBackend's async variant looks users up by username only.
+    aauthenticate = BaseBackend.aauthenticate
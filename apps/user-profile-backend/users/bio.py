@@ -0,0 +1,95 @@
+"""
+Limited-Markdown rendering of ``User.bio`` into sanitized HTML.
+
+The HTML is rendered when the bio is saved and stored in ``User.bio_html``, so
+reads never render or sanitize anything. Rows rendered by an older
+``BIO_RENDERER_VERSION`` are re-rendered in memory when read
+(``UserProfileSerializer``) and stored with the row's next profile snapshot
+(users/snapshots.py) or in bulk by ``manage.py rerender_bios``. Bump the
+version whenever the rules below change.
+
+Supported syntax: paragraphs (blank line), line breaks, ``- item`` / ``* item``
+lists, ``**bold**``, ``*italic*`` / ``_italic_``, ```code``` and
+``[label](https://...)`` links (http, https and mailto only).
+
+Safety comes from the order of operations: the whole text is HTML-escaped
+first, and only the fixed tags above are added afterwards. Link targets are
+checked after unescaping and escaped again for the attribute. No user-supplied
+markup ever survives. Code spans and then links are split off before
+emphasis, so ``*`` and ``_`` inside them (``https://ex.com/a**b**c``) stay
+literal; a link label still takes emphasis.
+
+This module doesn't import Django, so process pools can use it directly.
+"""
+import html
+import re
+from urllib.parse import urlsplit
+
+BIO_RENDERER_VERSION = 2
+
+ALLOWED_LINK_SCHEMES = frozenset({"http", "https", "mailto"})
+
+_CODE = re.compile(r"`([^`\n]+)`")
+_LINK = re.compile(r"\[([^\]\n]+)\]\(([^()\s]+)\)")
+_BOLD = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*")
+_ITALIC = re.compile(r"(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)")
+_LIST_ITEM = re.compile(r"^[-*]\s+")
+
+
+def _emphasis(text):
+    text = _BOLD.sub(r"<strong>\1</strong>", text)
+    return _ITALIC.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+
+
+def _link(match):
+    label, target = _emphasis(match.group(1)), html.unescape(match.group(2))
+    scheme = urlsplit(target).scheme.lower()
+    if scheme not in ALLOWED_LINK_SCHEMES:
+        return label
+    href = html.escape(target, quote=True)
+    return f'<a href="{href}" rel="nofollow noopener noreferrer">{label}</a>'
+
+
+def _links_and_emphasis(text):
+    parts = []
+    position = 0
+    for match in _LINK.finditer(text):
+        parts.append(_emphasis(text[position:match.start()]))
+        parts.append(_link(match))
+        position = match.end()
+    parts.append(_emphasis(text[position:]))
+    return "".join(parts)
+
+
+def render_inline(text):
+    """Escapes ``text`` and applies the inline rules; code spans are left literal."""
+    escaped = html.escape(text, quote=True)
+    parts = []
+    position = 0
+    for match in _CODE.finditer(escaped):
+        parts.append(_links_and_emphasis(escaped[position:match.start()]))
+        parts.append(f"<code>{match.group(1)}</code>")
+        position = match.end()
+    parts.append(_links_and_emphasis(escaped[position:]))
+    return "".join(parts)
+
+
+def render_bio(text):
+    """Renders a bio to sanitized HTML ("" for an empty bio)."""
+    blocks = re.split(r"\n\s*\n", (text or "").replace("\r\n", "\n").replace("\r", "\n").strip())
+    rendered = []
+    for block in blocks:
+        lines = [line.strip() for line in block.split("\n") if line.strip()]
+        if not lines:
+            continue
+        if all(_LIST_ITEM.match(line) for line in lines):
+            items = "".join(f"<li>{render_inline(_LIST_ITEM.sub('', line))}</li>" for line in lines)
+            rendered.append(f"<ul>{items}</ul>")
+        else:
+            rendered.append(f"<p>{'<br>'.join(render_inline(line) for line in lines)}</p>")
+    return "".join(rendered)
+
+
+def render_many(rows):
+    """``[(pk, bio), ...]`` -> ``[(pk, html), ...]``; the process-pool unit of work."""
+    return [(pk, render_bio(bio)) for pk, bio in rows]
@@ -0,0 +1,148 @@
+"""
+Bulk firm/role reassignment (firm mergers, re-titling), used by the admin
+actions and ``manage.py reassign_advisors``, and the advisor rewrite that
+follows a firm rename (``sync_firm_advisors``, run as a task).
+
+Advisors are walked in primary-key chunks. Each chunk is one short transaction:
+a single ``UPDATE ... WHERE id IN (...)`` that also bumps ``profile_version``
+(FirmRoleStat is kept in step by AdvisorQuerySet), the chunk's profile snapshots
+re-rendered (users/snapshots.py), one audit ``bulk_create``, one outbox
+``bulk_create`` for downstream systems (users/outbox.py), and one
+``cache.delete_many`` for exactly the chunk's profile entries. After commit the
+chunk's changes are published to the advisors' open change streams
+(users/events.py). No per-row save() rewrites the full row, and no lock is held
+across the whole selection.
+"""
+import time
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from . import outbox
+from .cache import invalidate_profile_caches
+from .events import publish_profile_changes
+from .models import ProfileChange
+from .snapshots import refresh_snapshots
+
+BULK_CHUNK_SIZE = 1000
+
+
+def reassign_advisors(queryset, *, firm=None, role=None, changed_by=None, source="bulk",
+                      chunk_size=BULK_CHUNK_SIZE, progress=None):
+    """
+    Moves every advisor in ``queryset`` to ``firm`` and/or sets ``role``.
+
+    ``progress(done, total, elapsed_seconds)`` is called after each chunk.
+    Returns the number of advisors that actually changed.
+    """
+    if firm is None and role is None:
+        raise ValueError("Nothing to reassign: pass firm and/or role.")
+    values = {}
+    if firm is not None:
+        values.update(firm=firm, firm_name=firm.name)  # legacy column mirrors the FK
+    if role is not None:
+        values["role"] = role
+
+    User = get_user_model()
+    total = queryset.count()
+    started = time.monotonic()
+    last_pk, done, changed = None, 0, 0
+    while True:
+        chunk = queryset.order_by("pk")
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list("pk", "firm_id", "role")[:chunk_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        done += len(rows)
+
+        audit = []
+        for pk, firm_id, old_role in rows:
+            changes = {}
+            if firm is not None and firm_id != firm.pk:
+                changes["firm"] = [firm_id, firm.pk]
+            if role is not None and old_role != role:
+                changes["role"] = [old_role, role]
+            if changes:
+                audit.append(ProfileChange(user_id=pk, changed_by=changed_by, changes=changes, source=source))
+
+        if audit:
+            ids = [change.user_id for change in audit]
+            with transaction.atomic():
+                User.objects.filter(pk__in=ids).update(**values, profile_version=F("profile_version") + 1)
+                versions = dict(User.objects.filter(pk__in=ids).values_list("pk", "profile_version"))
+                refresh_snapshots(User.objects.filter(pk__in=ids))
+                ProfileChange.objects.bulk_create(audit)
+                outbox.emit_many(
+                    (change.user_id, "profile.updated", {
+                        "version": versions[change.user_id],
+                        "changes": change.changes,
+                        "changed_by": change.changed_by_id,
+                        "source": source,
+                    })
+                    for change in audit
+                )
+                invalidate_profile_caches(ids)
+                transaction.on_commit(partial(publish_profile_changes, [
+                    (change.user_id, versions[change.user_id], _public_fields(change.changes, firm, role))
+                    for change in audit
+                ]))
+            changed += len(ids)
+
+        if progress is not None:
+            progress(done, total, time.monotonic() - started)
+    return changed
+
+
+def _public_fields(changes, firm, role):
+    """The profile fields (as the API names them) and new values of one advisor's ``changes``."""
+    fields = {}
+    if "firm" in changes:
+        fields["firm_name"] = firm.name
+    if "role" in changes:
+        fields["role"] = role
+    return fields
+
+
+def sync_firm_advisors(firm, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Follows a rename of ``firm``: mirrors the name into its advisors' legacy
+    ``firm_name`` column, bumps their ``profile_version`` and re-renders their
+    profile snapshots. Each primary-key chunk is one short transaction that
+    adds the chunk's outbox events and evicts its cached profiles; the change
+    is published to open streams after commit. Advisors whose column already
+    holds the name are skipped, so a rerun changes nothing. Returns the number
+    of advisors rewritten.
+    """
+    User = get_user_model()
+    advisors = User.objects.filter(firm=firm).exclude(firm_name=firm.name).order_by("pk")
+    last_pk, done = 0, 0
+    while True:
+        rows = list(advisors.filter(pk__gt=last_pk).values_list("pk", "firm_name")[:chunk_size])
+        if not rows:
+            return done
+        last_pk = rows[-1][0]
+        ids = [pk for pk, _old in rows]
+        with transaction.atomic():
+            # Advisors moved to another firm since the read are left alone.
+            still_here = User.objects.filter(pk__in=ids, firm=firm)
+            still_here.update(firm_name=firm.name, profile_version=F("profile_version") + 1)
+            versions = dict(still_here.values_list("pk", "profile_version"))
+            refresh_snapshots(still_here, chunk_size=chunk_size)
+            outbox.emit_many(
+                (pk, "profile.updated", {
+                    "version": versions[pk],
+                    "changes": {"firm_name": [old, firm.name]},
+                    "changed_by": None,
+                    "source": "firm-rename",
+                })
+                for pk, old in rows if pk in versions
+            )
+            invalidate_profile_caches(ids)
+            transaction.on_commit(partial(publish_profile_changes, [
+                (pk, version, {"firm_name": firm.name}) for pk, version in versions.items()
+            ]))
+        done += len(versions)
@@ -0,0 +1,253 @@
+"""
+Cache-aside helpers for rendered API payloads (user profile and OpenAPI schema).
+
+A cache entry holds the serialized data plus the rendered JSON body, so a hit
+skips both serialization and rendering. Compressed variants of that body are
+stored under their own keys, tagged with the entry's etag, so the compression
+middleware can reuse them instead of recompressing on every request. Tagging by
+etag means a variant can never outlive (or resurrect) the entry it belongs to.
+
+``get_or_build`` protects expensive entries against stampedes: concurrent misses
+in one process wait on a per-key lock (single flight), processes coordinate
+through a short-lived ``cache.add`` lock, and hot keys are refreshed early with
+probability rising towards expiry (XFetch), so they rarely expire under load.
+
+Sparse fieldsets (``?fields=``) are cached as variants of the full entry,
+tagged with its etag the same way.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+PROFILE_CACHE_TIMEOUT = getattr(settings, "PROFILE_CACHE_TIMEOUT", 60 * 5)
+SCHEMA_CACHE_TIMEOUT = getattr(settings, "SCHEMA_CACHE_TIMEOUT", 60 * 60)
+CACHE_LOCK_TIMEOUT = getattr(settings, "CACHE_LOCK_TIMEOUT", 10)
+CACHE_EARLY_REFRESH_BETA = getattr(settings, "CACHE_EARLY_REFRESH_BETA", 1.0)
+
+
+def profile_cache_key(user_id):
+    return f"user_profile:{user_id}"
+
+
+def schema_cache_key(renderer_format, version=None, lang=None):
+    return f"api_schema:{renderer_format}:{version or '-'}:{lang or '-'}"
+
+
+def build_entry(data, body=None, body_format=None):
+    """
+    Creates a cache entry. When ``body`` is omitted the data is rendered with
+    DRF's JSONRenderer, which is what the profile endpoint serves by default.
+    """
+    if body is None:
+        body, body_format = JSONRenderer().render(data), "json"
+    return {
+        "data": dict(data),
+        "body": body,
+        "format": body_format,
+        "etag": uuid.uuid4().hex,
+        "built_at": time.time(),
+    }
+
+
+# --- Stampede protection ---
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _single_flight(key):
+    """Serializes callers for ``key`` within this process."""
+    with _local_locks_guard:
+        lock, waiters = _local_locks.get(key, (None, 0))
+        lock = lock or threading.Lock()
+        _local_locks[key] = (lock, waiters + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _local_locks_guard:
+            lock, waiters = _local_locks[key]
+            if waiters == 1:
+                del _local_locks[key]
+            else:
+                _local_locks[key] = (lock, waiters - 1)
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def _acquire_lock(key):
+    token = uuid.uuid4().hex
+    return token if cache.add(_lock_key(key), token, CACHE_LOCK_TIMEOUT) else None
+
+
+def _release_lock(key, token):
+    # Not atomic, but the lock expires on its own anyway.
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def _wait_for_entry(key, poll_interval=0.05):
+    """Waits for another process to populate ``key``, for as long as its lock lives."""
+    deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        entry = cache.get(key)
+        if entry is not None or cache.get(_lock_key(key)) is None:
+            return entry
+        time.sleep(poll_interval)
+    return None
+
+
+def should_refresh_early(entry, timeout, beta=None):
+    """
+    XFetch: refresh before expiry with a probability that grows as expiry nears
+    and with how long the entry took to build (``delta``).
+    """
+    beta = CACHE_EARLY_REFRESH_BETA if beta is None else beta
+    delta = entry.get("delta")
+    if not delta or not beta or "built_at" not in entry:
+        return False
+    expires_at = entry["built_at"] + timeout
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _build_and_store(key, builder, timeout):
+    started = time.perf_counter()
+    entry = builder()
+    entry["delta"] = time.perf_counter() - started
+    cache.set(key, entry, timeout=timeout)
+    return entry
+
+
+def get_or_build(key, builder, timeout, beta=None):
+    """
+    Returns the entry cached under ``key``, calling ``builder()`` (which returns
+    a ``build_entry`` dict) to populate it. Under concurrency the builder runs
+    once per key rather than once per caller.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        if not should_refresh_early(entry, timeout, beta):
+            return entry
+        # Early refresh: one caller rebuilds, everyone else keeps the still-valid entry.
+        token = _acquire_lock(key)
+        if token is None:
+            return entry
+        try:
+            return _build_and_store(key, builder, timeout)
+        finally:
+            _release_lock(key, token)
+
+    with _single_flight(key):
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        token = _acquire_lock(key)
+        if token is None:
+            entry = _wait_for_entry(key)
+            if entry is not None:
+                return entry
+            # The other builder died or is too slow; build it ourselves.
+        try:
+            return _build_and_store(key, builder, timeout)
+        finally:
+            if token is not None:
+                _release_lock(key, token)
+
+
+# --- Sparse fieldsets ---
+
+def fieldset_cache_key(key, etag, fields):
+    return f"{key}:{etag}:fields:{','.join(fields)}"
+
+
+def get_fieldset_entry(key, entry, fields, timeout):
+    """
+    Returns ``(variant key, entry)`` for the ``fields`` subset of the full
+    ``entry``, cached next to it. Like compressed variants, a fieldset variant
+    is tagged with the full entry's etag: evicting the full entry (any profile
+    write) orphans every variant, and variants never overwrite the full entry.
+    """
+    variant_key = fieldset_cache_key(key, entry["etag"], fields)
+    variant = cache.get(variant_key)
+    if variant is None:
+        variant = build_entry({name: entry["data"][name] for name in fields})
+        cache.set(variant_key, variant, timeout=timeout)
+    return variant_key, variant
+
+
+def invalidate_profile_cache(user_id):
+    """
+    Evicts a cached profile now and again once the surrounding transaction
+    commits, so a concurrent read cannot re-cache the pre-commit row.
+    """
+    key = profile_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_profile_caches(user_ids):
+    """``invalidate_profile_cache`` for many users, with one delete_many per pass."""
+    keys = [profile_cache_key(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedPayloadResponse(Response):
+    """
+    DRF Response served from a cache entry.
+
+    When the negotiated renderer matches the entry's body format the cached
+    bytes are returned as-is; otherwise (e.g. the browsable API) the data is
+    rendered normally. Exposes ``compressed_variant`` / ``store_compressed_variant``
+    for integra_core.middleware.CompressionMiddleware.
+    """
+
+    def __init__(self, entry, cache_key, timeout, **kwargs):
+        super().__init__(entry["data"], **kwargs)
+        self.cache_entry = entry
+        self.cache_key = cache_key
+        self.cache_timeout = timeout
+        self.serves_cached_body = False
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, "accepted_renderer", None)
+        media_type = getattr(self, "accepted_media_type", "") or ""
+        entry = self.cache_entry
+        # Media type parameters (e.g. "; indent=4") change the rendering.
+        if renderer is None or entry["body"] is None or entry["format"] != renderer.format or ";" in media_type:
+            return super().rendered_content
+
+        content_type = self.content_type
+        if content_type is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f"{content_type}; charset={renderer.charset}"
+        self["Content-Type"] = content_type
+        self.serves_cached_body = True
+        return entry["body"]
+
+    def _variant_key(self, encoding):
+        return f"{self.cache_key}:{self.cache_entry['etag']}:{encoding}"
+
+    def compressed_variant(self, encoding):
+        if not self.serves_cached_body:
+            return None
+        return cache.get(self._variant_key(encoding))
+
+    def store_compressed_variant(self, encoding, payload):
+        if self.serves_cached_body:
+            cache.set(self._variant_key(encoding), payload, self.cache_timeout)
@@ -0,0 +1,79 @@
+"""
+Process diagnostics for staff: memory per endpoint (integra_core/memory.py),
+cache contents and the sizes of this app's in-process structures.
+
+Served by GET /api/diagnostics/memory/ (admin users only). Every number is for
+the worker process that answers, so compare several calls (or workers) before
+drawing conclusions.
+"""
+import logging
+
+from django.core.cache import caches
+
+from integra_core.logs import QueueHandler
+from integra_core.memory import memory_tracker
+
+from . import cache as profile_cache
+from .audit import profile_audit
+from .entitlements import fund_access
+from .events import profile_events
+
+
+def cache_usage(alias="default"):
+    """
+    Entries and stored bytes per key prefix (``user_profile``, ``api_schema``,
+    ...). Only local-memory caches can be inspected; other backends report
+    their class name only.
+    """
+    backend = caches[alias]
+    store = getattr(backend, "_cache", None)
+    lock = getattr(backend, "_lock", None)
+    if not isinstance(store, dict) or lock is None:
+        return {"backend": type(backend).__name__, "entries": None}
+    with lock:
+        items = [(key, len(value)) for key, value in store.items()]
+    by_prefix = {}
+    for key, size in items:
+        # Keys are stored as ":<version>:<key>"
+        prefix = key.split(":", 2)[-1].split(":", 1)[0]
+        group = by_prefix.setdefault(prefix, {"entries": 0, "bytes": 0})
+        group["entries"] += 1
+        group["bytes"] += size
+    return {
+        "backend": type(backend).__name__,
+        "entries": len(items),
+        "max_entries": getattr(backend, "_max_entries", None),
+        "bytes": sum(size for _key, size in items),
+        "by_prefix": dict(sorted(by_prefix.items())),
+    }
+
+
+def inprocess_sizes():
+    """Item counts of the long-lived per-process structures."""
+    state = fund_access._state
+    log_queues = [
+        {"queued": handler.queue.qsize(), "maxsize": handler.maxsize, "dropped": handler.dropped}
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, QueueHandler)
+    ]
+    return {
+        "fund_access": {
+            "advisors": len(state.advisors),
+            "dense_advisors": sum(isinstance(funds, int) for funds in list(state.advisors.values())),
+            "funds": len(state.fund_codes),
+        },
+        "profile_streams": {"streams": profile_events.stream_count, "users": len(profile_events._subscribers)},
+        "profile_audit_pending": profile_audit.pending(),
+        "cache_single_flight_locks": len(profile_cache._local_locks),
+        "log_queues": log_queues,
+    }
+
+
+def memory_report(snapshot=False):
+    if snapshot:
+        memory_tracker.take_snapshot()
+    return {
+        **memory_tracker.report(),
+        "caches": {"default": cache_usage()},
+        "structures": inprocess_sizes(),
+    }
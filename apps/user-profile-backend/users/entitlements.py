@@ -0,0 +1,271 @@
+"""
+Advisor -> FUND_CODE entitlements.
+
+The source of truth is the AdvisorFundAccess table. Each process also keeps a
+FundAccessIndex in memory, so the check "can advisor X see fund Y" never
+touches the database:
+
+- each advisor maps to either a frozenset of fund codes or, once they hold
+  ``dense_threshold`` funds or more, an int bitmap over per-process fund slots.
+  That keeps sparse advisors small and makes dense lookups a single bit test.
+- the index records the EntitlementCounter value it was built at. A refresh
+  reads only the rows written since then (``version > seen``). Revocations are
+  soft (``is_active=False``), so they show up in that delta as well.
+
+Writes go through ``bulk_load`` / ``grant`` / ``revoke`` (or
+``AdvisorFundAccess.save``). Each of these stamps its rows with a fresh
+counter value.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import AdvisorFundAccess, EntitlementCounter
+
+_COUNTER_PK = 1
+
+
+# =========================================================================
+# Writes
+# =========================================================================
+
+def next_version():
+    """
+    Reserves the next counter value. Must run inside the writing transaction:
+    the counter row stays locked until commit, which orders the versions.
+    """
+    updated = EntitlementCounter.objects.filter(pk=_COUNTER_PK).update(value=F("value") + 1)
+    if not updated:
+        EntitlementCounter.objects.get_or_create(pk=_COUNTER_PK)
+        EntitlementCounter.objects.filter(pk=_COUNTER_PK).update(value=F("value") + 1)
+    return EntitlementCounter.objects.values_list("value", flat=True).get(pk=_COUNTER_PK)
+
+
+def current_version():
+    return EntitlementCounter.objects.filter(pk=_COUNTER_PK).values_list("value", flat=True).first() or 0
+
+
+def bulk_load(pairs, *, replace=False, batch_size=5000):
+    """
+    Upserts ``(advisor_id, fund_code)`` grants in one transaction and returns the
+    version stamped on them. With ``replace=True`` every other active grant of
+    the advisors in ``pairs`` is revoked (a full feed for those advisors).
+    """
+    pairs = {(advisor_id.strip(), fund_code.strip()) for advisor_id, fund_code in pairs}
+    with transaction.atomic():
+        version = next_version()
+        AdvisorFundAccess.objects.bulk_create(
+            [
+                AdvisorFundAccess(advisor_id=advisor_id, fund_code=fund_code, is_active=True, version=version)
+                for advisor_id, fund_code in pairs
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["advisor_id", "fund_code"],
+            update_fields=["is_active", "version", "updated_at"],
+        )
+        if replace:
+            advisors = sorted({advisor_id for advisor_id, _fund_code in pairs})
+            for start in range(0, len(advisors), batch_size):
+                AdvisorFundAccess.objects.filter(
+                    advisor_id__in=advisors[start:start + batch_size], is_active=True, version__lt=version
+                ).update(is_active=False, version=version)
+    return version
+
+
+def grant(advisor_id, fund_codes):
+    return bulk_load((advisor_id, fund_code) for fund_code in fund_codes)
+
+
+def revoke(advisor_id, fund_codes=None):
+    """Revokes the given funds, or every fund of the advisor when ``fund_codes`` is None."""
+    with transaction.atomic():
+        version = next_version()
+        rows = AdvisorFundAccess.objects.filter(advisor_id=advisor_id, is_active=True)
+        if fund_codes is not None:
+            rows = rows.filter(fund_code__in=list(fund_codes))
+        rows.update(is_active=False, version=version)
+    return version
+
+
+# =========================================================================
+# In-memory index
+# =========================================================================
+
+class _Snapshot:
+    """Everything a lookup reads, swapped as one reference on a full reload."""
+
+    __slots__ = ("advisors", "fund_slots", "fund_codes")
+
+    def __init__(self):
+        self.advisors = {}    # advisor_id -> frozenset[str] | int bitmap
+        self.fund_slots = {}  # fund_code -> bit position (append-only)
+        self.fund_codes = []  # bit position -> fund_code
+
+
+class FundAccessIndex:
+    def __init__(self, refresh_interval=5.0, dense_threshold=64):
+        # Seconds between change-counter checks in refresh_if_stale()
+        self.refresh_interval = refresh_interval
+        self.dense_threshold = dense_threshold
+        self.version = None
+        self._state = _Snapshot()
+        self._refresh_lock = threading.Lock()
+        self._checked_at = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            refresh_interval=getattr(settings, "ENTITLEMENTS_REFRESH_INTERVAL", 5.0),
+            dense_threshold=getattr(settings, "ENTITLEMENTS_DENSE_THRESHOLD", 64),
+        )
+
+    # --- Lookups (no locks, no DB) ---
+
+    def can_access(self, advisor_id, fund_code):
+        state = self._state
+        funds = state.advisors.get(advisor_id)
+        if funds is None:
+            return False
+        if type(funds) is int:
+            slot = state.fund_slots.get(fund_code)
+            return slot is not None and (funds >> slot) & 1 == 1
+        return fund_code in funds
+
+    def check_many(self, advisor_id, fund_codes):
+        """Returns ``{fund_code: bool}`` for every requested code."""
+        state = self._state
+        funds = state.advisors.get(advisor_id)
+        if funds is None:
+            return dict.fromkeys(fund_codes, False)
+        if type(funds) is int:
+            slots = state.fund_slots
+            return {
+                code: (slot := slots.get(code)) is not None and (funds >> slot) & 1 == 1
+                for code in fund_codes
+            }
+        return {code: code in funds for code in fund_codes}
+
+    def funds_for(self, advisor_id):
+        """Sorted tuple of the advisor's fund codes."""
+        state = self._state
+        return tuple(sorted(self._unpack(state, state.advisors.get(advisor_id))))
+
+    def __len__(self):
+        return len(self._state.advisors)
+
+    # --- Building ---
+
+    def _unpack(self, state, funds):
+        if funds is None:
+            return set()
+        if type(funds) is not int:
+            return set(funds)
+        codes = set()
+        while funds:
+            low = funds & -funds
+            codes.add(state.fund_codes[low.bit_length() - 1])
+            funds ^= low
+        return codes
+
+    def _pack(self, state, codes):
+        if len(codes) < self.dense_threshold:
+            return frozenset(codes)
+        bitmap = 0
+        for code in codes:
+            slot = state.fund_slots.get(code)
+            if slot is None:
+                slot = len(state.fund_codes)
+                state.fund_codes.append(code)
+                state.fund_slots[code] = slot
+            bitmap |= 1 << slot
+        return bitmap
+
+    def _apply(self, state, rows):
+        """Applies ``(advisor_id, fund_code, is_active)`` rows to ``state``."""
+        touched = {}
+        for advisor_id, fund_code, is_active in rows:
+            codes = touched.get(advisor_id)
+            if codes is None:
+                codes = touched[advisor_id] = self._unpack(state, state.advisors.get(advisor_id))
+            if is_active:
+                codes.add(fund_code)
+            else:
+                codes.discard(fund_code)
+        for advisor_id, codes in touched.items():
+            if codes:
+                state.advisors[advisor_id] = self._pack(state, codes)
+            else:
+                state.advisors.pop(advisor_id, None)
+        return len(touched)
+
+    def load(self, rows, version=None):
+        """Replaces the whole index with ``(advisor_id, fund_code, is_active)`` rows."""
+        state = _Snapshot()
+        self._apply(state, rows)
+        self._state = state
+        self.version = version
+
+    def apply(self, rows, version=None):
+        """Applies changed rows in place; returns the number of advisors touched."""
+        touched = self._apply(self._state, rows)
+        if version is not None:
+            self.version = version
+        return touched
+
+    # --- Refreshing from the database ---
+
+    def refresh(self, full=False):
+        """Catches up with the table; a full load the first time (or on request)."""
+        with self._refresh_lock:
+            self._refresh(full)
+
+    def refresh_if_stale(self):
+        """Refreshes at most every ``refresh_interval`` seconds; never waits on another refresh."""
+        if self.version is None:
+            self.refresh()  # nothing to answer from yet
+            return
+        if time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                self._refresh(full=False)
+            finally:
+                self._refresh_lock.release()
+
+    def _refresh(self, full):
+        # Read the counter first: rows committed meanwhile are re-applied next
+        # time, which is harmless, but none can be skipped.
+        version = current_version()
+        if full or self.version is None:
+            rows = (
+                AdvisorFundAccess.objects.filter(is_active=True)
+                .values_list("advisor_id", "fund_code", "is_active")
+                .iterator(chunk_size=10_000)
+            )
+            self.load(rows, version)
+        elif version != self.version:
+            rows = (
+                AdvisorFundAccess.objects.filter(version__gt=self.version)
+                .order_by("version")
+                .values_list("advisor_id", "fund_code", "is_active")
+                .iterator(chunk_size=10_000)
+            )
+            self.apply(rows, version)
+        self._checked_at = time.monotonic()
+
+
+fund_access = FundAccessIndex.from_settings()
+
+
+def can_access(advisor_id, fund_code):
+    fund_access.refresh_if_stale()
+    return fund_access.can_access(advisor_id, fund_code)
+
+
+def check_many(advisor_id, fund_codes):
+    fund_access.refresh_if_stale()
+    return fund_access.check_many(advisor_id, fund_codes)
@@ -0,0 +1,227 @@
+"""
+Profile change events for GET /api/user/profile/stream/ (server-sent events).
+
+Profile writers publish an event after the update commits: the portal PATCH
+(UserProfileView), admin edits, bulk reassignment and firm renames. The
+broadcast backend (``PROFILE_EVENTS_BROADCAST``) carries it to the
+ProfileEventHub of every worker process, and each hub fans it out to that
+user's open streams in its own process.
+
+- ``LocalBroadcast`` (the default) delivers only within the publishing
+  process. That is enough for a single worker, for local dev and for tests.
+  With several workers, plug in a backend that crosses processes (e.g. Redis
+  pub/sub): ``publish()`` sends to the shared channel, and ``start(deliver)``
+  starts a listener that calls ``deliver(user_id, event)`` for every message.
+- Each stream owns a small asyncio queue. The hub only puts to it, through
+  ``loop.call_soon_threadsafe`` from the publishing thread, so a publisher
+  never waits on a client. When a queue is full, the client has fallen behind.
+  Its backlog is then replaced by a single ``resync`` event telling it to
+  refetch the profile, instead of growing without bound.
+- An idle stream is one coroutine parked on ``queue.get()`` with a heartbeat
+  timeout, a few KB each, so thousands per worker are fine. ``max_streams``
+  caps the total anyway.
+
+Streams need an ASGI server (e.g. ``uvicorn integra_core.asgi:application``).
+Under WSGI every open stream would hold a worker thread.
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+HEARTBEAT = b": ping\n\n"
+
+
+class StreamLimitExceeded(Exception):
+    pass
+
+
+# =========================================================================
+# Broadcast backends
+# =========================================================================
+
+class BaseBroadcast:
+    """Carries events between processes; every process runs its own hub."""
+
+    def start(self, deliver):
+        """Called once per process, before the first publish or subscribe."""
+        self.deliver = deliver
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+
+class LocalBroadcast(BaseBroadcast):
+    """In-process stand-in: delivers straight to this process's hub."""
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+
+# =========================================================================
+# In-process hub
+# =========================================================================
+
+def format_event(event):
+    """Encodes an event dict as one SSE message."""
+    lines = []
+    if event.get("version") is not None:
+        lines.append(f"id: {event['version']}")
+    lines.append(f"event: {event['type']}")
+    lines.append("data: " + json.dumps(event, cls=DjangoJSONEncoder, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscription:
+    __slots__ = ("hub", "user_id", "loop", "queue")
+
+    def __init__(self, hub, user_id, loop, queue_size):
+        self.hub = hub
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(queue_size)
+
+    def offer(self, event):
+        """Runs on the stream's event loop."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync", "user_id": self.user_id}
+            self.hub.stats["resyncs"] += 1
+        self.queue.put_nowait(event)
+
+
+class ProfileEventHub:
+    def __init__(self, broadcast=None, queue_size=16, heartbeat_interval=15.0,
+                 max_streams=10_000, max_streams_per_user=10):
+        self.broadcast = broadcast if broadcast is not None else LocalBroadcast()
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self.max_streams = max_streams
+        self.max_streams_per_user = max_streams_per_user
+
+        self._subscribers = {}  # user_id -> set[Subscription]
+        self._count = 0
+        self._lock = threading.Lock()
+        self._started = False
+        self.stats = {"published": 0, "delivered": 0, "resyncs": 0, "rejected": 0}
+
+    @classmethod
+    def from_settings(cls):
+        backend = getattr(settings, "PROFILE_EVENTS_BROADCAST", "users.events.LocalBroadcast")
+        return cls(
+            broadcast=import_string(backend)(),
+            queue_size=getattr(settings, "PROFILE_EVENTS_QUEUE_SIZE", 16),
+            heartbeat_interval=getattr(settings, "PROFILE_EVENTS_HEARTBEAT", 15.0),
+            max_streams=getattr(settings, "PROFILE_EVENTS_MAX_STREAMS", 10_000),
+            max_streams_per_user=getattr(settings, "PROFILE_EVENTS_MAX_STREAMS_PER_USER", 10),
+        )
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if not self._started:
+                self.broadcast.start(self.deliver)
+                self._started = True
+
+    @property
+    def stream_count(self):
+        return self._count
+
+    # --- Publishing (any thread) ---
+
+    def publish(self, user_id, event):
+        self._ensure_started()
+        self.stats["published"] += 1
+        self.broadcast.publish(user_id, event)
+
+    def deliver(self, user_id, event):
+        """Fans an event out to this process's streams of ``user_id``; never blocks."""
+        with self._lock:
+            subscriptions = tuple(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:  # loop closed; the stream is going away
+                continue
+            self.stats["delivered"] += 1
+
+    # --- Subscribing (on the event loop) ---
+
+    def has_capacity(self, user_id):
+        with self._lock:
+            return (
+                self._count < self.max_streams
+                and len(self._subscribers.get(user_id, ())) < self.max_streams_per_user
+            )
+
+    def subscribe(self, user_id):
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            mine = self._subscribers.get(user_id, ())
+            if self._count >= self.max_streams or len(mine) >= self.max_streams_per_user:
+                self.stats["rejected"] += 1
+                raise StreamLimitExceeded(user_id)
+            subscription = Subscription(self, user_id, loop, self.queue_size)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            mine = self._subscribers.get(subscription.user_id)
+            if mine is None or subscription not in mine:
+                return
+            mine.discard(subscription)
+            if not mine:
+                del self._subscribers[subscription.user_id]
+            self._count -= 1
+
+    async def stream(self, user_id, preamble=None):
+        """
+        Yields SSE bytes for one client of ``user_id``: the events returned by
+        the ``preamble`` coroutine function, then every delivered event, with a
+        heartbeat comment after each idle ``heartbeat_interval``.
+
+        Subscribing happens on the first iteration and unsubscribing when the
+        client goes away, so a response that is never sent holds no slot.
+        ``preamble`` runs after subscribing: state it reads can't miss an event.
+        """
+        try:
+            subscription = self.subscribe(user_id)
+        except StreamLimitExceeded:
+            return  # filled up since has_capacity(); EventSource reconnects later
+        try:
+            for event in (await preamble()) if preamble is not None else ():
+                yield format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+profile_events = ProfileEventHub.from_settings()
+
+
+def publish_profile_change(user_id, version, fields):
+    """Publishes ``{field: new value}`` for a committed update at profile ``version``."""
+    profile_events.publish(
+        user_id,
+        {"type": "profile.updated", "user_id": user_id, "version": version, "fields": fields},
+    )
+
+
+def publish_profile_changes(changes):
+    """``publish_profile_change`` for each ``(user_id, version, fields)`` of a bulk write."""
+    for user_id, version, fields in changes:
+        publish_profile_change(user_id, version, fields)
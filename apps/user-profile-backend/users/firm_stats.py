@@ -0,0 +1,155 @@
+"""
+Incremental maintenance of FirmRoleStat (advisor counts per firm, role and
+active flag), so dashboards never GROUP BY over users_user.
+
+Every path that changes a counted field applies a delta in the same
+transaction:
+
+- ``User.save()`` / ``delete()``: the signal handlers in users/signals.py compare
+  the row's (firm, role, is_active) key with the snapshot taken when it was
+  loaded (``User.from_db``).
+- ``AdvisorQuerySet.update()``: rows are grouped by key before the update, and
+  the new keys are derived from the constant values being set. For expression
+  values the affected firms are recounted instead.
+- ``AdvisorQuerySet.bulk_create()``: the new rows are counted.
+
+Raw SQL and concurrent bulk updates of the same rows can still drift the
+counts; ``manage.py rebuild_firm_stats`` reconciles them.
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import FirmRoleStat, User
+
+STAT_FIELDS = frozenset({"firm", "firm_id", "role", "is_active"})
+
+_MISSING = object()
+
+
+def stat_key(user):
+    return (user.firm_id, user.role, user.is_active)
+
+
+def apply_deltas(deltas):
+    """Adds ``{(firm_id, role, is_active): delta}`` to the summary rows."""
+    for (firm_id, role, is_active), delta in deltas.items():
+        if firm_id is None or not delta:
+            continue
+        rows = FirmRoleStat.objects.filter(firm_id=firm_id, role=role, is_active=is_active)
+        if rows.update(count=F("count") + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                FirmRoleStat.objects.create(firm_id=firm_id, role=role, is_active=is_active, count=delta)
+        except IntegrityError:
+            # Created concurrently; add to it instead.
+            rows.update(count=F("count") + delta)
+
+
+def _counts(users):
+    return {
+        (row["firm_id"], row["role"], row["is_active"]): row["n"]
+        for row in users.values("firm_id", "role", "is_active").annotate(n=Count("pk")).order_by()
+    }
+
+
+def recount_firms(firm_ids):
+    """Recomputes the summary rows of ``firm_ids`` from users_user."""
+    firm_ids = {firm_id for firm_id in firm_ids if firm_id is not None}
+    if not firm_ids:
+        return
+    with transaction.atomic():
+        FirmRoleStat.objects.filter(firm_id__in=firm_ids).delete()
+        FirmRoleStat.objects.bulk_create(
+            FirmRoleStat(firm_id=firm_id, role=role, is_active=is_active, count=count)
+            for (firm_id, role, is_active), count in _counts(User.objects.filter(firm_id__in=firm_ids)).items()
+        )
+
+
+def rebuild():
+    """
+    Recomputes the whole summary. Returns the number of (firm, role, is_active)
+    keys whose stored count was wrong, missing or stale.
+    """
+    with transaction.atomic():
+        actual = {key: count for key, count in _counts(User.objects.filter(firm__isnull=False)).items()}
+        stored = {
+            (row.firm_id, row.role, row.is_active): row.count
+            for row in FirmRoleStat.objects.filter(count__gt=0)
+        }
+        drift = sum(1 for key in actual.keys() | stored.keys() if actual.get(key) != stored.get(key))
+        FirmRoleStat.objects.all().delete()
+        FirmRoleStat.objects.bulk_create(
+            FirmRoleStat(firm_id=firm_id, role=role, is_active=is_active, count=count)
+            for (firm_id, role, is_active), count in actual.items()
+        )
+    return drift
+
+
+# --- Per-row writes (wired up in users/signals.py) ---
+
+def capture_previous_key(user, update_fields):
+    """pre_save: makes sure the pre-update key is known before the row changes."""
+    if user._state.adding or hasattr(user, "_stat_key"):
+        return
+    if update_fields is not None and not STAT_FIELDS.intersection(update_fields):
+        return
+    # Not loaded from the DB with the counted fields (e.g. a deferred queryset).
+    user._stat_key = User.objects.filter(pk=user.pk).values_list("firm_id", "role", "is_active").first()
+
+
+def user_saved(user, created, update_fields):
+    if update_fields is not None and not STAT_FIELDS.intersection(update_fields):
+        return
+    new = stat_key(user)
+    old = None if created else getattr(user, "_stat_key", _MISSING)
+    if old is not _MISSING and old != new:
+        deltas = Counter({new: 1})
+        if old is not None:
+            deltas[old] -= 1
+        apply_deltas(deltas)
+    user._stat_key = new
+
+
+def user_deleted(user):
+    key = getattr(user, "_stat_key", None) or stat_key(user)
+    apply_deltas({key: -1})
+
+
+# --- Bulk writes (called from AdvisorQuerySet) ---
+
+@contextmanager
+def track_bulk_update(queryset, values):
+    """Wraps ``queryset.update(**values)`` and applies the resulting deltas."""
+    if any(hasattr(value, "resolve_expression") for value in values.values()):
+        pks = list(queryset.values_list("pk", flat=True))
+        firms_before = set(queryset.values_list("firm_id", flat=True).distinct())
+        yield
+        firms_after = set(User.objects.filter(pk__in=pks).values_list("firm_id", flat=True).distinct())
+        recount_firms(firms_before | firms_after)
+        return
+
+    before = _counts(queryset)
+    yield
+    firm = values.get("firm_id", values.get("firm", _MISSING))
+    if firm is not _MISSING and firm is not None and not isinstance(firm, int):
+        firm = firm.pk
+    deltas = Counter()
+    for (firm_id, role, is_active), count in before.items():
+        new = (
+            firm_id if firm is _MISSING else firm,
+            values.get("role", role),
+            values.get("is_active", is_active),
+        )
+        deltas[(firm_id, role, is_active)] -= count
+        deltas[new] += count
+    apply_deltas(deltas)
+
+
+def count_created(users):
+    apply_deltas(Counter(stat_key(user) for user in users))
+    for user in users:
+        user._stat_key = stat_key(user)
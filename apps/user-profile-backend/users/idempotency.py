@@ -0,0 +1,147 @@
+"""
+``Idempotency-Key`` support for write endpoints.
+
+A client that may retry a write (flaky network, timeouts) sends the same
+``Idempotency-Key`` header with every attempt. The first attempt runs normally,
+and its response is kept in the cache for ``IDEMPOTENCY_KEY_TTL`` seconds. Any
+later attempt with that key is answered from the cache (``Idempotent-Replayed:
+true``) and never reaches the handler, so there is no second write, audit
+row, outbox event or cache invalidation.
+
+- Keys are scoped per user and path, so one client can't replay another's.
+- A key reused with a different method, path or body is answered with 422
+  instead of the stored response.
+- Concurrent duplicates are serialized through a short ``cache.add`` lock
+  (``IDEMPOTENCY_LOCK_TIMEOUT``). A duplicate waits for the first attempt's
+  response, and gets a 409 if it is still running when the lock would expire.
+- 5xx responses are not stored, so retrying after a server error runs the
+  write again.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_TTL = getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24)
+IDEMPOTENCY_LOCK_TIMEOUT = getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 10)
+MAX_KEY_LENGTH = 255
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE"})
+# Response headers set by handlers that are worth replaying (Content-Type is renegotiated)
+REPLAYED_HEADERS = ("Location",)
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+class IdempotentRequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed; retry later."
+    default_code = "idempotency_request_in_progress"
+
+
+class _Replay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def idempotency_cache_key(user_id, path, key):
+    return f"idempotency:{user_id}:{path}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path()):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _replay(stored):
+    response = Response(stored["data"], status=stored["status"])
+    for header, value in stored["headers"].items():
+        response[header] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+class IdempotencyMixin:
+    """
+    For DRF views. Hooks into ``initial`` (after authentication and permission
+    checks) and ``finalize_response``. Add it before the generic view class.
+    """
+    idempotency_lock_poll_interval = 0.05
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._idempotency = None
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None or request.method in SAFE_METHODS:
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({IDEMPOTENCY_HEADER: [f"Must be 1 to {MAX_KEY_LENGTH} characters."]})
+
+        cache_key = idempotency_cache_key(getattr(request.user, "pk", None), request.path, key)
+        fingerprint = request_fingerprint(request)
+        self._check_stored(cache_key, fingerprint)
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + IDEMPOTENCY_LOCK_TIMEOUT
+        while not cache.add(f"{cache_key}:lock", token, IDEMPOTENCY_LOCK_TIMEOUT):
+            # A duplicate is running: wait for its response.
+            if time.monotonic() >= deadline:
+                raise IdempotentRequestInProgress()
+            time.sleep(self.idempotency_lock_poll_interval)
+            self._check_stored(cache_key, fingerprint)
+        # The first attempt may have finished between the check and the lock.
+        try:
+            self._check_stored(cache_key, fingerprint)
+        except Exception:
+            cache.delete(f"{cache_key}:lock")
+            raise
+        self._idempotency = (cache_key, fingerprint, token)
+
+    def _check_stored(self, cache_key, fingerprint):
+        stored = cache.get(cache_key)
+        if stored is None:
+            return
+        if stored["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReused()
+        raise _Replay(_replay(stored))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _Replay):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        state = getattr(self, "_idempotency", None)
+        if state is None:
+            return response
+        cache_key, fingerprint, token = state
+        self._idempotency = None
+        if response.status_code < 500:
+            data = response.data
+            cache.set(
+                cache_key,
+                {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": dict(data) if isinstance(data, dict) else data,
+                    "headers": {header: response[header] for header in REPLAYED_HEADERS if response.has_header(header)},
+                },
+                IDEMPOTENCY_KEY_TTL,
+            )
+        if cache.get(f"{cache_key}:lock") == token:
+            cache.delete(f"{cache_key}:lock")
+        return response
@@ -0,0 +1,58 @@
+"""
+Compares each advisor's stored profile snapshot (users/snapshots.py) with a
+fresh rendering of the row.
+
+    python manage.py check_profile_snapshots             # report; exit status 1 on drift
+    python manage.py check_profile_snapshots --repair    # re-render the drifted rows
+
+Rows are read in primary-key chunks. A snapshot is missing when empty (rows
+from before the column existed) and drifted when it differs from the
+rendering, e.g. after a raw SQL write or a change to UserProfileSerializer.
+``--repair`` re-renders the affected rows under row locks, and evicts their
+cached profiles.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from users.cache import invalidate_profile_caches
+from users.snapshots import SNAPSHOT_CHUNK_SIZE, refresh_snapshots, render_snapshot
+
+
+class Command(BaseCommand):
+    help = "Detect (and with --repair, fix) profile snapshots that don't match their rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repair", action="store_true", help="Re-render missing and drifted snapshots.")
+        parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK_SIZE, help="Rows checked per batch.")
+        parser.add_argument("--show", type=int, default=10, help="List up to this many drifted user ids.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        rows = User.objects.select_related("firm").order_by("pk")
+        checked, missing, drifted = 0, [], []
+        last_pk = 0
+        while True:
+            users = list(rows.filter(pk__gt=last_pk)[: options["chunk_size"]])
+            if not users:
+                break
+            last_pk = users[-1].pk
+            checked += len(users)
+            stale = []
+            for user in users:
+                if not user.profile_snapshot:
+                    missing.append(user.pk)
+                    stale.append(user.pk)
+                elif user.profile_snapshot != render_snapshot(user):
+                    drifted.append(user.pk)
+                    stale.append(user.pk)
+            if stale and options["repair"]:
+                refresh_snapshots(User.objects.filter(pk__in=stale))
+                invalidate_profile_caches(stale)
+
+        self.stdout.write(f"Checked {checked} profile snapshots: {len(missing)} missing, {len(drifted)} drifted.")
+        if drifted[: options["show"]]:
+            self.stdout.write(f"  drifted: {', '.join(map(str, drifted[: options['show']]))}")
+        if options["repair"]:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(missing) + len(drifted)} snapshots."))
+        elif missing or drifted:
+            raise CommandError("Profile snapshots are out of date; run with --repair.")
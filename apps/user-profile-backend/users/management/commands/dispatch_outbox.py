@@ -0,0 +1,72 @@
+"""
+Delivers outbox events (users/outbox.py) to the sinks in settings.OUTBOX_SINKS.
+
+    python manage.py dispatch_outbox                     # run until SIGTERM
+    python manage.py dispatch_outbox --once              # drain due events and exit
+    python manage.py dispatch_outbox --batch-size 1000 --report-interval 30
+
+Several dispatchers may run at once; per-user ordering is kept by the claim
+protocol. Throughput, failures, the backlog lag and the dead letters (events
+that failed ``OUTBOX_MAX_ATTEMPTS`` times; requeue them in the admin) are
+reported every ``--report-interval`` seconds and on exit.
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.outbox import OutboxDispatcher, backlog, dead_letters
+
+
+class Command(BaseCommand):
+    help = "Deliver transactional outbox events to the configured sinks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Events claimed per batch.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--report-interval", type=float, default=60.0, help="Seconds between metric lines.")
+        parser.add_argument("--once", action="store_true", help="Exit once no event is due.")
+
+    def handle(self, *args, **options):
+        overrides = {"batch_size": options["batch_size"]} if options["batch_size"] else {}
+        dispatcher = OutboxDispatcher.from_settings(**overrides)
+        if not dispatcher.sinks:
+            raise CommandError("No outbox sinks configured (settings.OUTBOX_SINKS).")
+
+        self.stopping = False
+        previous_handlers = {
+            signum: signal.signal(signum, self.request_stop) for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        names = ", ".join(type(sink).__name__ for sink in dispatcher.sinks)
+        self.stdout.write(f"Outbox dispatcher started (batch {dispatcher.batch_size}; sinks: {names}).")
+        started = reported = time.monotonic()
+        try:
+            while not self.stopping:
+                claimed = dispatcher.dispatch_batch()
+                if time.monotonic() - reported >= options["report_interval"]:
+                    self.report(dispatcher, started)
+                    reported = time.monotonic()
+                if claimed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        self.report(dispatcher, started)
+
+    def report(self, dispatcher, started):
+        stats = dispatcher.stats
+        elapsed = max(time.monotonic() - started, 1e-6)
+        pending, lag = backlog()
+        per_batch = stats["send_seconds"] / max(stats["batches"] + stats["failed_batches"], 1)
+        self.stdout.write(
+            f"  delivered {stats['delivered']} ({stats['delivered'] / elapsed:.0f} events/s), "
+            f"{stats['batches']} batches ({per_batch * 1000:.1f} ms send each), "
+            f"{stats['failed_batches']} failed, {stats['deferred']} deferred; "
+            f"backlog {pending} (oldest {lag:.1f}s), {dead_letters().count()} dead"
+        )
+
+    def request_stop(self, signum, frame):
+        self.stopping = True
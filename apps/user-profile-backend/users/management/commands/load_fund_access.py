@@ -0,0 +1,41 @@
+"""
+Bulk-loads advisor fund entitlements from a CSV feed (users/entitlements.py).
+
+    python manage.py load_fund_access grants.csv            # upsert grants
+    python manage.py load_fund_access grants.csv --replace  # also revoke grants missing from the feed
+
+The file needs ``advisor_id`` and ``fund_code`` columns. The whole file is
+loaded in one transaction under a single entitlement version.
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.entitlements import bulk_load
+
+
+class Command(BaseCommand):
+    help = "Load advisor -> FUND_CODE grants from a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with advisor_id,fund_code columns.")
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Revoke other active grants of the advisors present in the file.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8") as feed:
+            reader = csv.DictReader(feed)
+            missing = {"advisor_id", "fund_code"} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"Missing column(s): {', '.join(sorted(missing))}")
+            pairs = [(row["advisor_id"], row["fund_code"]) for row in reader if row["advisor_id"] and row["fund_code"]]
+
+        version = bulk_load(pairs, replace=options["replace"], batch_size=options["batch_size"])
+        advisors = len({advisor_id for advisor_id, _fund_code in pairs})
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {len(pairs)} grants for {advisors} advisors (entitlement version {version})."
+        ))
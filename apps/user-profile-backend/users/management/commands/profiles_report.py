@@ -0,0 +1,79 @@
+"""
+Aggregates the request profiles written by integra_core.profiling.ProfilingMiddleware.
+
+    python manage.py profiles_report                          # every URL name, top 15 functions each
+    python manage.py profiles_report --route user_profile --sort cumulative --limit 30
+    python manage.py profiles_report --since-hours 2 --min-duration-ms 200
+    python manage.py profiles_report --issue-token ops-alice  # X-Profile-Token header value
+
+Profiles are grouped by URL name. Each group's pstats are merged, so a function's
+time is summed over every sampled request of that route. The per-route header
+shows how many profiles it holds and their duration percentiles.
+"""
+import io
+import pstats
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from integra_core.profiling import TOKEN_HEADER, issue_token, profile_files
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class Command(BaseCommand):
+    help = "Report the hottest functions per URL name across stored request profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=None, help="Profile directory (default PROFILING_DIR).")
+        parser.add_argument("--route", action="append", help="Only this URL name (repeatable).")
+        parser.add_argument("--since-hours", type=float, default=None, help="Only profiles this recent.")
+        parser.add_argument("--min-duration-ms", type=float, default=0, help="Only requests at least this slow.")
+        parser.add_argument("--sort", choices=["tottime", "cumulative", "ncalls"], default="tottime")
+        parser.add_argument("--limit", type=int, default=15, help="Functions listed per route.")
+        parser.add_argument("--issue-token", metavar="ISSUER", help="Print a profiling token and exit.")
+
+    def handle(self, *args, **options):
+        if options["issue_token"]:
+            max_age = getattr(settings, "PROFILING_TOKEN_MAX_AGE", 60 * 60)
+            self.stdout.write(f"{TOKEN_HEADER}: {issue_token(options['issue_token'])}")
+            self.stderr.write(f"Valid for {max_age}s on any worker sharing this SECRET_KEY.")
+            return
+
+        directory = options["dir"] or getattr(settings, "PROFILING_DIR", settings.BASE_DIR / "profiles")
+        since = time.time() - options["since_hours"] * 3600 if options["since_hours"] is not None else None
+        routes = {}
+        for prof_path, metadata in profile_files(directory):
+            if options["route"] and metadata.get("route") not in options["route"]:
+                continue
+            if since is not None and metadata.get("created", 0) < since:
+                continue
+            if metadata.get("duration_ms", 0) < options["min_duration_ms"]:
+                continue
+            routes.setdefault(metadata.get("route", "unresolved"), []).append((prof_path, metadata))
+        if not routes:
+            raise CommandError(f"No matching profiles in {directory}.")
+
+        # Routes with the most total profiled time first
+        ordered = sorted(routes.items(), key=lambda item: -sum(m["duration_ms"] for _p, m in item[1]))
+        for route, entries in ordered:
+            durations = sorted(metadata["duration_ms"] for _path, metadata in entries)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{route}: {len(entries)} profiles, p50 {percentile(durations, 0.5):.1f} ms, "
+                f"p95 {percentile(durations, 0.95):.1f} ms, max {durations[-1]:.1f} ms"
+            ))
+            self.stdout.write(self.hottest(entries, options["sort"], options["limit"]))
+
+    def hottest(self, entries, sort, limit):
+        out = io.StringIO()
+        stats = pstats.Stats(str(entries[0][0]), stream=out)
+        for prof_path, _metadata in entries[1:]:
+            stats.add(str(prof_path))
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        # Drop pstats' preamble (file list and totals) down to the table.
+        lines = out.getvalue().splitlines()
+        start = next((i for i, line in enumerate(lines) if line.lstrip().startswith("ncalls")), 0)
+        return "\n".join(line for line in lines[start:] if line.strip()) + "\n"
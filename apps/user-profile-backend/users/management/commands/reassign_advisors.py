@@ -0,0 +1,70 @@
+"""
+Bulk firm/role reassignment, e.g. after a firm merger (users/bulk.py).
+
+    python manage.py reassign_advisors --from-firm "Old Partners" --to-firm "New Partners"
+    python manage.py reassign_advisors --from-firm 42 --set-role "Senior Advisor" --chunk-size 2000
+    python manage.py reassign_advisors --ids-file advisors.txt --to-firm "New Partners" --create-firm
+
+Firms are given by id or exact name. Use ``--dry-run`` to count the selection
+without writing anything.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from users.bulk import BULK_CHUNK_SIZE, reassign_advisors
+from users.models import Firm
+
+
+def resolve_firm(value, create=False):
+    if value.isdigit():
+        firm = Firm.objects.filter(pk=int(value)).first()
+    else:
+        firm = Firm.objects.filter(name=value).first()
+        if firm is None and create:
+            firm = Firm.objects.create(name=value)
+    if firm is None:
+        raise CommandError(f"Unknown firm: {value!r}")
+    return firm
+
+
+class Command(BaseCommand):
+    help = "Move advisors to another firm and/or set their role, in chunked updates."
+
+    def add_arguments(self, parser):
+        selection = parser.add_mutually_exclusive_group(required=True)
+        selection.add_argument("--from-firm", help="Select advisors of this firm (id or name).")
+        selection.add_argument("--ids-file", help="Select advisors by user id, one per line.")
+        parser.add_argument("--to-firm", help="Target firm (id or name).")
+        parser.add_argument("--create-firm", action="store_true", help="Create --to-firm by name if missing.")
+        parser.add_argument("--set-role", help="Role to assign.")
+        parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not options["to_firm"] and not options["set_role"]:
+            raise CommandError("Pass --to-firm and/or --set-role.")
+
+        advisors = get_user_model().objects.all()
+        if options["from_firm"]:
+            advisors = advisors.filter(firm=resolve_firm(options["from_firm"]))
+        else:
+            with open(options["ids_file"], encoding="utf-8") as ids:
+                advisors = advisors.filter(pk__in=[int(line) for line in ids if line.strip()])
+
+        if options["dry_run"]:
+            self.stdout.write(f"Would reassign {advisors.count()} advisors.")
+            return
+
+        firm = resolve_firm(options["to_firm"], create=options["create_firm"]) if options["to_firm"] else None
+        changed = reassign_advisors(
+            advisors,
+            firm=firm,
+            role=options["set_role"],
+            source="command",
+            chunk_size=options["chunk_size"],
+            progress=self.report,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Reassigned {changed} advisors."))
+
+    def report(self, done, total, elapsed):
+        self.stdout.write(f"  {done}/{total} ({done / max(elapsed, 1e-6):.0f} advisors/s)")
@@ -0,0 +1,21 @@
+"""
+Recomputes the FirmRoleStat summary from users_user (users/firm_stats.py).
+
+    python manage.py rebuild_firm_stats
+
+The summary is maintained incrementally; run this after raw SQL imports, or
+periodically to reconcile drift. It reports how many counts were off.
+"""
+from django.core.management.base import BaseCommand
+
+from users import firm_stats
+from users.models import FirmRoleStat
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-firm advisor count summary."
+
+    def handle(self, *args, **options):
+        drift = firm_stats.rebuild()
+        rows = FirmRoleStat.objects.count()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} firm stat rows ({drift} corrected)."))
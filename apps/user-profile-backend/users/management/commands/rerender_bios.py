@@ -0,0 +1,91 @@
+"""
+Re-renders ``User.bio_html`` for rows rendered by an older BIO_RENDERER_VERSION
+(users/bio.py), e.g. after the rendering rules changed.
+
+    python manage.py rerender_bios
+    python manage.py rerender_bios --workers 8 --chunk-size 2000
+    python manage.py rerender_bios --all        # every row, whatever its version
+
+Stale rows are read in primary-key chunks of ``(pk, bio)`` and rendered on a
+process pool (rendering is CPU-bound, and users/bio.py doesn't touch the
+database). Each chunk's results are written back by this process with one
+``bulk_update`` in a short transaction, together with those rows' profile
+snapshots (users/snapshots.py); rows whose bio changed while the chunk was
+rendering are skipped (their save already rendered the new bio).
+
+Reads render stale bios in memory and the next snapshot write stores them, so
+running this is optional: it keeps the reads after a rules change from paying
+for the rendering.
+"""
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.bio import BIO_RENDERER_VERSION, render_many
+from users.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = "Re-render advisor bios rendered by an older renderer version."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows rendered and written per batch.")
+        parser.add_argument("--workers", type=int, default=4, help="Rendering processes.")
+        parser.add_argument("--all", action="store_true", help="Re-render every row, not only stale ones.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        rows = User.objects.all()
+        if not options["all"]:
+            rows = rows.exclude(bio_renderer_version=BIO_RENDERER_VERSION)
+        rows = rows.order_by("pk").values_list("pk", "bio")
+        chunk_size, workers = options["chunk_size"], options["workers"]
+
+        self.stdout.write(f"Re-rendering bios (renderer v{BIO_RENDERER_VERSION}, {workers} workers).")
+        started = time.monotonic()
+        rendered = skipped = 0
+        last_pk = 0
+        in_flight = {}
+        # Spawned children only import users/bio.py: no Django setup, no inherited DB connections.
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            while True:
+                # Keep a bounded number of chunks in memory at once.
+                while last_pk is not None and len(in_flight) < workers * 2:
+                    chunk = list(rows.filter(pk__gt=last_pk)[:chunk_size])
+                    if not chunk:
+                        last_pk = None
+                        break
+                    last_pk = chunk[-1][0]
+                    in_flight[pool.submit(render_many, chunk)] = chunk
+                if not in_flight:
+                    break
+                finished, _pending = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk = in_flight.pop(future)
+                    written = self.write_chunk(dict(chunk), future.result())
+                    rendered += written
+                    skipped += len(chunk) - written
+                self.stdout.write(f"  {rendered} rendered, {skipped} skipped")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Re-rendered {rendered} bios in {elapsed:.1f}s ({skipped} skipped)."))
+
+    def write_chunk(self, sources, results):
+        """Stores the rendered HTML of rows whose bio is still the one rendered."""
+        User = get_user_model()
+        with transaction.atomic():
+            current = dict(
+                User.objects.select_for_update().filter(pk__in=sources).values_list("pk", "bio")
+            )
+            users = [
+                User(pk=pk, bio_html=html, bio_renderer_version=BIO_RENDERER_VERSION)
+                for pk, html in results
+                if pk in current and current[pk] == sources[pk]
+            ]
+            User.objects.bulk_update(users, ["bio_html", "bio_renderer_version"])
+            refresh_snapshots(User.objects.filter(pk__in=[user.pk for user in users]))
+        return len(users)
@@ -0,0 +1,77 @@
+"""
+Runs background task workers (users/tasks.py).
+
+    python manage.py run_workers --concurrency 4
+    python manage.py run_workers --mode process --concurrency 2
+    python manage.py run_workers --once          # drain due tasks and exit
+"""
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from users import tasks
+
+
+class Command(BaseCommand):
+    help = "Run background task workers backed by the BackgroundTask table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Tasks executed in parallel.")
+        parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--once", action="store_true", help="Exit once no task is due.")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        self.stopping = False
+        previous_handlers = {
+            signum: signal.signal(signum, self.request_stop) for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        if options["mode"] == "process":
+            # Children must open their own DB connections.
+            connections.close_all()
+            pool = ProcessPoolExecutor(concurrency, mp_context=multiprocessing.get_context("fork"))
+        else:
+            pool = ThreadPoolExecutor(concurrency, thread_name_prefix="task-worker")
+
+        self.stdout.write(f"Task workers started ({options['mode']} x{concurrency}).")
+        in_flight = set()
+        done = failed = 0
+        try:
+            while not self.stopping:
+                free = concurrency - len(in_flight)
+                claimed = tasks.claim(free) if free else []
+                close_old_connections()
+                for task_id in claimed:
+                    in_flight.add(pool.submit(tasks.run_task, task_id))
+
+                if not in_flight:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                finished, in_flight = wait(in_flight, timeout=options["poll_interval"], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    try:
+                        succeeded = future.result()
+                    except Exception as exc:  # e.g. lost DB connection; the task is reclaimed later
+                        self.stderr.write(f"Worker error: {exc!r}")
+                        succeeded = False
+                    if succeeded:
+                        done += 1
+                    else:
+                        failed += 1
+        finally:
+            pool.shutdown(wait=True)
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f"Task workers stopped: {done} succeeded, {failed} failed or rescheduled.")
+
+    def request_stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,148 @@
+"""
+Generates a synthetic, reproducible advisor dataset for scale testing.
+
+    python manage.py seed_advisors --count 1000000
+    python manage.py seed_advisors --count 50000 --firms 500 --seed 7 --prefix load
+
+The same ``--seed`` always produces the same rows. Firm sizes follow a Zipf
+distribution (a few large practices, a long tail of small ones). All rows share
+one precomputed password hash (``--password``, default "password123"), so no
+time goes into per-row hashing. Rows are inserted with multi-row
+``bulk_create`` batches, one transaction per batch that also stores the rows'
+profile snapshots (users/snapshots.py); FirmRoleStat is rebuilt once at the
+end instead of per batch.
+
+Do not run this against production data.
+"""
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from users import firm_stats
+from users.models import Firm
+from users.snapshots import refresh_snapshots, store_snapshots
+
+FIRST_NAMES = [
+    "Olivia", "Jack", "Charlotte", "Noah", "Amelia", "William", "Isla", "Oliver", "Mia", "Leo",
+    "Ava", "Henry", "Grace", "Thomas", "Chloe", "James", "Zoe", "Lucas", "Ruby", "Ethan",
+    "Wei", "Priya", "Mohammed", "Anh", "Sofia", "Arjun", "Mei", "Daniel", "Hannah", "Samuel",
+]
+LAST_NAMES = [
+    "Smith", "Jones", "Williams", "Brown", "Wilson", "Taylor", "Nguyen", "Johnson", "Martin", "White",
+    "Anderson", "Walker", "Thompson", "Harris", "Lee", "Ryan", "Robinson", "Kelly", "King", "Chen",
+    "Patel", "Singh", "Wang", "Tran", "Campbell", "Mitchell", "Clarke", "Young", "Scott", "Hughes",
+]
+FIRM_WORDS = [
+    "Harbour", "Summit", "Southern Cross", "Evergreen", "Bluegum", "Meridian", "Coastal", "Ironbark",
+    "Granite", "Wattle", "Horizon", "Northbridge", "Riverside", "Banksia", "Pinnacle", "Kestrel",
+]
+FIRM_SUFFIXES = ["Wealth", "Financial Planning", "Advisory", "Accountants", "Super Advisers", "Partners"]
+# (role, weight)
+ROLES = [
+    ("Financial Advisor", 55),
+    ("Senior Financial Advisor", 18),
+    ("SMSF Specialist", 10),
+    ("Associate Advisor", 9),
+    ("Paraplanner", 5),
+    ("Principal", 3),
+]
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic advisors (deterministic, bulk-inserted) for scale testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10_000, help="Advisors to create.")
+        parser.add_argument("--firms", type=int, default=None, help="Firms to spread them over (default count/200).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of firm sizes.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk_create.")
+        parser.add_argument("--prefix", default="seed", help="Username/email/advisor_id prefix.")
+        parser.add_argument("--password", default="password123")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        count, prefix = options["count"], options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(f"Advisors with prefix {prefix!r} already exist; choose another --prefix.")
+        if len(prefix) > 8:
+            raise CommandError("--prefix must be at most 8 characters (advisor_id is 20).")
+
+        rng = random.Random(options["seed"])
+        firms = self.create_firms(options["firms"] or max(count // 200, 1), prefix, rng)
+        firm_weights = list(itertools.accumulate(1 / rank ** options["zipf"] for rank in range(1, len(firms) + 1)))
+        roles, role_weights = zip(*ROLES)
+        role_weights = list(itertools.accumulate(role_weights))
+        password = make_password(options["password"])  # one hash shared by every row
+        now = timezone.now()
+
+        self.stdout.write(f"Seeding {count} advisors across {len(firms)} firms (seed {options['seed']}).")
+        started = time.perf_counter()
+        batch_size = options["batch_size"]
+        for start in range(0, count, batch_size):
+            batch_started = time.perf_counter()
+            batch = []
+            for n in range(start, min(start + batch_size, count)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                firm = rng.choices(firms, cum_weights=firm_weights)[0]
+                joined = now - timedelta(days=rng.randint(0, 3650))
+                logged_in = rng.random() < 0.85
+                batch.append(User(
+                    username=f"{prefix}-{n:08d}",
+                    email=f"{first}.{last}.{n}@{prefix}.example.com".lower(),
+                    password=password,
+                    first_name=first,
+                    last_name=last,
+                    advisor_id=f"{prefix.upper()}{n:09d}",
+                    firm=firm,
+                    firm_name=firm.name,
+                    role=rng.choices(roles, cum_weights=role_weights)[0],
+                    bio=f"{first} advises clients of {firm.name}." if rng.random() < 0.6 else "",
+                    is_active=rng.random() < 0.95,
+                    date_joined=joined,
+                    last_login=joined + timedelta(seconds=rng.randint(0, int((now - joined).total_seconds()))) if logged_in else None,
+                ))
+            for user in batch:
+                user.render_bio()  # bulk_create bypasses save()
+            with transaction.atomic():
+                User.objects.bulk_create(batch, batch_size=batch_size, track_stats=False)
+                if all(user.pk is not None for user in batch):
+                    store_snapshots(batch)
+                else:  # the backend doesn't return inserted ids
+                    refresh_snapshots(User.objects.filter(username__in=[user.username for user in batch]))
+            done = start + len(batch)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  {done}/{count} ({len(batch) / (time.perf_counter() - batch_started):.0f} rows/s batch, "
+                f"{done / elapsed:.0f} rows/s overall)"
+            )
+
+        firm_stats.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {count} advisors in {elapsed:.1f}s ({count / max(elapsed, 1e-6):.0f} rows/s)."
+        ))
+
+    def create_firms(self, count, prefix, rng):
+        firms = Firm.objects.bulk_create(
+            [
+                Firm(name=f"{rng.choice(FIRM_WORDS)} {rng.choice(FIRM_SUFFIXES)} ({prefix} {n:05d})")
+                for n in range(count)
+            ],
+            batch_size=1000,
+        )
+        if firms and firms[0].pk is None:  # backends that don't return ids from bulk inserts
+            names = [firm.name for firm in firms]
+            by_name = {}
+            for start in range(0, len(names), 1000):
+                by_name.update(Firm.objects.in_bulk(names[start:start + 1000], field_name="name"))
+            firms = [by_name[name] for name in names]
+        # Rank order = creation order, so the Zipf head is deterministic too.
+        return firms
@@ -0,0 +1,146 @@
+"""
+Measures worker cold start: per-module import cost and time-to-first-response.
+
+The probe runs in a fresh interpreter (``python -X importtime``) so the numbers
+reflect what a newly spawned gunicorn/uvicorn worker pays, not this process.
+
+    python manage.py startup_profile
+    python manage.py startup_profile --runtime-profile api --top 15
+    python manage.py startup_profile --json > startup.json   # for benchmarks
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Executed in the child interpreter: boot Django like a WSGI worker would and
+# serve one request, reporting timings as JSON on stdout.
+PROBE_SCRIPT = r"""
+import io, json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+booted = time.perf_counter()
+path, host = sys.argv[1], sys.argv[2]
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "",
+    "SERVER_NAME": host, "SERVER_PORT": "80", "HTTP_HOST": host,
+    "SERVER_PROTOCOL": "HTTP/1.1", "wsgi.version": (1, 0), "wsgi.url_scheme": "http",
+    "wsgi.input": io.BytesIO(b""), "wsgi.errors": sys.stderr,
+    "wsgi.multithread": False, "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+status = []
+body = b"".join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+finished = time.perf_counter()
+print(json.dumps({
+    "boot_ms": (booted - started) * 1000,
+    "first_response_ms": (finished - started) * 1000,
+    "status": status[0] if status else None,
+    "response_bytes": len(body),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parses ``-X importtime`` output into ``{module: (self_us, cumulative_us)}``.
+    Lines look like: ``import time:       529 |     112836 |   django.core.serializers``.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header row
+        modules[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def group_by_package(modules):
+    """Sums self time per top-level package (django, rest_framework, ...)."""
+    totals = defaultdict(int)
+    for name, (self_us, _cumulative_us) in modules.items():
+        totals[name.split(".")[0]] += self_us
+    return dict(totals)
+
+
+class Command(BaseCommand):
+    help = "Report per-module import cost and time-to-first-response for a cold worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runtime-profile",
+            choices=["full", "api"],
+            default=None,
+            help="Runtime profile to boot the probe with (defaults to the current one).",
+        )
+        parser.add_argument("--path", default="/api/user/profile/", help="Path of the first request.")
+        parser.add_argument("--top", type=int, default=20, help="Number of modules/packages to list.")
+        parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON.")
+
+    def handle(self, *args, **options):
+        runtime_profile = options["runtime_profile"] or settings.RUNTIME_PROFILE
+        env = dict(os.environ, DJANGO_RUNTIME_PROFILE=runtime_profile)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "integra_core.settings")
+        host = next((h for h in settings.ALLOWED_HOSTS if h and "*" not in h and not h.startswith(".")), "localhost")
+
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE_SCRIPT, options["path"], host],
+            cwd=str(settings.BASE_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        if proc.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{proc.stderr[-2000:]}")
+
+        timings = json.loads(proc.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(proc.stderr)
+        top = options["top"]
+        report = {
+            "runtime_profile": runtime_profile,
+            "path": options["path"],
+            "process_wall_ms": round(wall_ms, 1),
+            "boot_ms": round(timings["boot_ms"], 1),
+            "first_response_ms": round(timings["first_response_ms"], 1),
+            "status": timings["status"],
+            "modules_imported": len(modules),
+            "import_self_total_ms": round(sum(s for s, _ in modules.values()) / 1000, 1),
+            "top_modules": [
+                {"module": name, "self_ms": round(s / 1000, 2), "cumulative_ms": round(c / 1000, 2)}
+                for name, (s, c) in sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            ],
+            "top_packages": [
+                {"package": name, "self_ms": round(us / 1000, 2)}
+                for name, us in sorted(group_by_package(modules).items(), key=lambda item: item[1], reverse=True)[:top]
+            ],
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"Runtime profile: {report['runtime_profile']}  first request: GET {report['path']} -> {report['status']}"
+        )
+        self.stdout.write(
+            f"Process wall: {report['process_wall_ms']} ms | Django boot: {report['boot_ms']} ms | "
+            f"Time to first response: {report['first_response_ms']} ms"
+        )
+        self.stdout.write(
+            f"Modules imported: {report['modules_imported']} (self time {report['import_self_total_ms']} ms)"
+        )
+        self.stdout.write("\nTop packages by self import time:")
+        for row in report["top_packages"]:
+            self.stdout.write(f"  {row['self_ms']:>9.2f} ms  {row['package']}")
+        self.stdout.write("\nTop modules by cumulative import time:")
+        for row in report["top_modules"]:
+            self.stdout.write(f"  {row['cumulative_ms']:>9.2f} ms  {row['module']}")
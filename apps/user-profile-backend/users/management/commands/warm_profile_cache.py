@@ -0,0 +1,129 @@
+"""
+Pre-populates the profile cache after a deploy or cache flush, so the first
+burst of GET /api/user/profile/ requests doesn't all miss at once.
+
+    python manage.py warm_profile_cache                       # 10k most recently active advisors
+    python manage.py warm_profile_cache --limit 50000 --workers 8 --max-rate 5000
+    python manage.py warm_profile_cache --since-days 30 --limit 0
+
+Advisors are picked by ``last_login`` (most recent first), their stored profile
+snapshots (users/snapshots.py) read in chunks, and written with one ``cache.set_many``
+per chunk (a single pipelined round trip on Redis/Memcached backends). Chunks run
+on a thread pool; ``--max-rate`` caps the rows read per second across all
+workers so warming can't saturate the primary database.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from users.cache import PROFILE_CACHE_TIMEOUT, profile_cache_key
+from users.snapshots import load_snapshots, snapshot_entry
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class RateLimiter:
+    """Token bucket shared by the workers: at most ``rate`` units per second (0 = unlimited)."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._next_free = clock()
+
+    def acquire(self, units):
+        if not self.rate:
+            return
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._next_free)
+            self._next_free = start + units / self.rate
+        if start > now:
+            self.sleep(start - now)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes.
+    return peak / 1024 if peak < 1 << 32 else peak / (1024 * 1024)
+
+
+class Command(BaseCommand):
+    help = "Warm the profile cache for the most recently active advisors."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10_000, help="Advisors to warm (0 = all matching).")
+        parser.add_argument("--since-days", type=int, default=None, help="Only advisors who logged in within N days.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows loaded and cached per set_many.")
+        parser.add_argument("--workers", type=int, default=4, help="Chunks processed in parallel.")
+        parser.add_argument("--max-rate", type=float, default=2000, help="Max rows read per second (0 = unlimited).")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(is_active=True, last_login__isnull=False)
+        if options["since_days"] is not None:
+            users = users.filter(last_login__gte=timezone.now() - timedelta(days=options["since_days"]))
+        ids = users.order_by("-last_login").values_list("pk", flat=True)
+        if options["limit"]:
+            ids = ids[: options["limit"]]
+        ids = list(ids)
+
+        chunk_size = options["chunk_size"]
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        limiter = RateLimiter(options["max_rate"])
+        workers = options["workers"]
+
+        self.stdout.write(f"Warming {len(ids)} profiles in {len(chunks)} chunks ({workers} workers).")
+        started = time.monotonic()
+        warmed = 0
+        pending = iter(chunks)
+        in_flight = set()
+        with ThreadPoolExecutor(workers, thread_name_prefix="cache-warm") as pool:
+            while True:
+                # Keep a bounded number of chunks in memory at once.
+                for chunk in pending:
+                    in_flight.add(pool.submit(self.warm_chunk, chunk, limiter))
+                    if len(in_flight) >= workers * 2:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    warmed += future.result()
+                self.report(warmed, len(ids), started)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Warmed {warmed} profiles in {elapsed:.1f}s."))
+
+    def warm_chunk(self, ids, limiter):
+        limiter.acquire(len(ids))
+        try:
+            entries = {
+                profile_cache_key(pk): snapshot_entry(body) for pk, body in load_snapshots(ids).items()
+            }
+            cache.set_many(entries, timeout=PROFILE_CACHE_TIMEOUT)
+            return len(entries)
+        finally:
+            close_old_connections()
+
+    def report(self, warmed, total, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        line = f"  {warmed}/{total} ({warmed / elapsed:.0f} profiles/s"
+        rss = peak_rss_mb()
+        if rss is not None:
+            line += f", peak RSS {rss:.0f} MB"
+        self.stdout.write(line + ")")
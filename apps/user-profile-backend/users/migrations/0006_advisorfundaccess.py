@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_backgroundtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntitlementCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AdvisorFundAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('advisor_id', models.CharField(max_length=20, verbose_name='Advisor ID')),
+                ('fund_code', models.CharField(max_length=20, verbose_name='Fund Code')),
+                ('is_active', models.BooleanField(default=True)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'advisor fund access',
+                'verbose_name_plural': 'advisor fund access',
+                'indexes': [models.Index(fields=['version'], name='users_fundaccess_version')],
+                'constraints': [models.UniqueConstraint(fields=('advisor_id', 'fund_code'), name='users_fundaccess_advisor_fund')],
+            },
+        ),
+    ]
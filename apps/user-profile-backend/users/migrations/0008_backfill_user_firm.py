@@ -0,0 +1,57 @@
+"""
+Backfills User.firm from the legacy firm_name column.
+
+Runs outside a single transaction, in primary-key batches, so each batch only
+holds row locks briefly and a large table is never locked for the whole
+backfill. It is safe to re-run (only rows without a firm are touched), and new
+writes are linked by User.save() while it runs.
+"""
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def backfill_firms(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Firm = apps.get_model("users", "Firm")
+    db = schema_editor.connection.alias
+
+    firm_ids = dict(Firm.objects.using(db).values_list("name", "id"))
+    last_pk = 0
+    while True:
+        batch = list(
+            User.objects.using(db)
+            .filter(pk__gt=last_pk, firm__isnull=True)
+            .exclude(firm_name="")
+            .order_by("pk")
+            .values_list("pk", "firm_name")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        by_name = {}
+        for pk, firm_name in batch:
+            name = firm_name.strip()
+            if name:
+                by_name.setdefault(name, []).append(pk)
+
+        with transaction.atomic(using=db):
+            new_names = [name for name in by_name if name not in firm_ids]
+            if new_names:
+                Firm.objects.using(db).bulk_create([Firm(name=name) for name in new_names], ignore_conflicts=True)
+                firm_ids.update(Firm.objects.using(db).filter(name__in=new_names).values_list("name", "id"))
+            for name, pks in by_name.items():
+                User.objects.using(db).filter(pk__in=pks, firm__isnull=True).update(firm_id=firm_ids[name])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('users', '0007_firm'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_firms, migrations.RunPython.noop),
+    ]
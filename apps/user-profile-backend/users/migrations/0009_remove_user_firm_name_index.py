@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_backfill_user_firm'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='firm_name',
+            field=models.CharField(blank=True, max_length=150, verbose_name='Firm/Company Name (legacy)'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_stats(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    FirmRoleStat = apps.get_model("users", "FirmRoleStat")
+    db = schema_editor.connection.alias
+    rows = (
+        User.objects.using(db).filter(firm__isnull=False)
+        .values("firm_id", "role", "is_active").annotate(n=models.Count("pk")).order_by()
+    )
+    FirmRoleStat.objects.using(db).bulk_create(
+        [
+            FirmRoleStat(firm_id=row["firm_id"], role=row["role"], is_active=row["is_active"], count=row["n"])
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_remove_user_firm_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FirmRoleStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(max_length=100)),
+                ('is_active', models.BooleanField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('firm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='role_stats', to='users.firm')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('firm', 'role', 'is_active'), name='users_firmrolestat_key')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='bio_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='bio_renderer_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
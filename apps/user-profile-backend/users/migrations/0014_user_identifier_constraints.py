@@ -0,0 +1,62 @@
+"""
+Case-insensitive unique indexes on User.email and User.advisor_id, for login
+by email or advisor ID (users/backends.py).
+
+Existing rows that differ only in case would fail index creation halfway with
+an opaque integrity error. The pre-check finds them first and stops the
+migration with the offending values, so they can be merged or renamed before
+re-running it.
+"""
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Upper
+
+
+def check_duplicates(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    db = schema_editor.connection.alias
+    problems = []
+    for column, function in (("email", Lower), ("advisor_id", Upper)):
+        duplicates = (
+            User.objects.using(db)
+            .filter(**{f"{column}__isnull": False})
+            .values(folded=function(column))
+            .annotate(rows=Count("pk"))
+            .filter(rows__gt=1)
+            .values_list("folded", flat=True)
+        )
+        for folded in duplicates[:20]:
+            pks = list(
+                User.objects.using(db)
+                .annotate(folded=function(column))
+                .filter(folded=folded)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            problems.append(f"{column} {folded!r}: users {pks}")
+    if problems:
+        raise RuntimeError(
+            "Users share an email or advisor ID that differs only in case; resolve these "
+            "before migrating:\n  " + "\n  ".join(problems)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0013_user_bio_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='users_user_email_ci_key', violation_error_message='A user with this email address already exists.'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('advisor_id'), name='users_user_advisor_id_ci_key', violation_error_message='A user with this Advisor ID already exists.'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+"""
+Adds User.profile_snapshot (users/snapshots.py).
+
+Existing rows start empty: reads render and store their snapshot on first use,
+and ``manage.py check_profile_snapshots --repair`` fills them all ahead of time.
+(Rendering needs the current UserProfileSerializer, which a migration's
+historical models can't run.)
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_user_identifier_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_snapshot',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
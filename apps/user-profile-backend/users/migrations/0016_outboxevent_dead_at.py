@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_user_profile_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='dead_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,91 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import models, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower, Upper
+from django.utils import timezone
+
+from .bio import BIO_RENDERER_VERSION, render_bio
+
+class Firm(models.Model):
+    """
+    An advisory firm or accounting practice. Advisors reference it by integer FK
+    instead of repeating (and indexing) the name on every user row, so a rename
+    touches one row.
+    """
+    name = models.CharField(max_length=150, unique=True, verbose_name="Firm/Company Name")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class AdvisorQuerySet(models.QuerySet):
+    """
+    Keeps FirmRoleStat in step with bulk writes that bypass save()/delete()
+    signals (see users/firm_stats.py).
+    """
+
+    def _tracks_stats(self):
+        # Historical models in migrations run before the summary table exists.
+        return self.model._meta.apps is global_apps
+
+    def update(self, **kwargs):
+        from .firm_stats import STAT_FIELDS, track_bulk_update
+
+        if not self._tracks_stats() or not STAT_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            with track_bulk_update(self, kwargs):
+                return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, track_stats=True, **kwargs):
+        """``track_stats=False`` skips FirmRoleStat (call firm_stats.rebuild() afterwards)."""
+        from .firm_stats import count_created, recount_firms
+
+        if not track_stats or not self._tracks_stats():
+            return super().bulk_create(objs, *args, **kwargs)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+                # Which rows were inserted (or replaced) is unknown.
+                recount_firms({user.firm_id for user in created})
+            else:
+                count_created(created)
+        return created
+
+
+class AdvisorManager(UserManager.from_queryset(AdvisorQuerySet)):
+    def get_by_natural_key(self, username):
+        # Login serializes the profile (including the firm name) from this row.
+        return self.select_related("firm").get(**{self.model.USERNAME_FIELD: username})
+
+    def get_by_identifier(self, identifier):
+        """
+        The user logging in as ``identifier``: their username (exact), email
+        (case-insensitive) or advisor ID (case-insensitive). One query, served
+        by the username index and the ``Lower(email)`` / ``Upper(advisor_id)``
+        unique indexes. If the identifier matches different users in different
+        columns, the username match wins, then the email match.
+        """
+        matches = list(
+            self.select_related("firm")
+            .alias(email_ci=Lower("email"), advisor_id_ci=Upper("advisor_id"))
+            .filter(
+                Q(**{self.model.USERNAME_FIELD: identifier})
+                | Q(email_ci=Lower(Value(identifier)))
+                | Q(advisor_id_ci=Upper(Value(identifier)))
+            )[:3]
+        )
+        if not matches:
+            raise self.model.DoesNotExist(f"No user with identifier {identifier!r}")
+        folded = identifier.casefold()
+        return min(matches, key=lambda user: (user.get_username() != identifier, user.email.casefold() != folded))
+
 
 class User(AbstractUser):
     # Inherits fields like username, email (overridden below), password, first_name, last_name
@@ -21,11 +107,22 @@ class User(AbstractUser):
     )
     
     # The firm or accounting practice the advisor belongs to.
+    firm = models.ForeignKey(
+        Firm,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="advisors",
+        verbose_name="Firm",
+    )
+
+    # Deprecated: pre-normalization copy of the firm name, kept (unindexed) for
+    # code that still reads it during the rollout and mirrored from ``firm`` on
+    # save(). Read the name from ``firm`` instead; dropped in a later release.
     firm_name = models.CharField(
         max_length=150, 
         blank=True, 
-        db_index=True,
-        verbose_name="Firm/Company Name"
+        verbose_name="Firm/Company Name (legacy)"
     )
     
     # The role within the external firm (e.g., Senior SMSF Advisor).
@@ -38,6 +135,10 @@ class User(AbstractUser):
 
     # === Profile Display Fields ===
     bio = models.TextField(blank=True)
+    # ``bio`` rendered (limited Markdown, sanitized) on save by users/bio.py;
+    # rows behind BIO_RENDERER_VERSION are re-rendered with their snapshot or by rerender_bios.
+    bio_html = models.TextField(blank=True, editable=False)
+    bio_renderer_version = models.PositiveSmallIntegerField(default=0, editable=False)
     avatar_url = models.URLField(
         blank=True, 
         default="https://ui-avatars.com/api/?name=User", 
@@ -47,6 +148,272 @@ class User(AbstractUser):
     # Enforce email uniqueness for secure B2B identity (overrides default AbstractUser behavior)
     email = models.EmailField(unique=True) 
 
+    # Bumped by each profile write that changes something (portal PATCH, admin,
+    # bulk reassignment, firm renames); clients of the change stream
+    # (users/events.py) compare it to spot missed events.
+    profile_version = models.PositiveIntegerField(default=0, editable=False)
+
+    # The public profile JSON (UserProfileSerializer), re-rendered by every write
+    # so profile reads serve it without serializing (users/snapshots.py).
+    profile_snapshot = models.TextField(blank=True, editable=False)
+
+    objects = AdvisorManager()
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Back the case-insensitive login lookups (AdvisorManager.get_by_identifier)
+            # with indexes, and keep those lookups unambiguous.
+            models.UniqueConstraint(
+                Lower("email"), name="users_user_email_ci_key",
+                violation_error_message="A user with this email address already exists.",
+            ),
+            models.UniqueConstraint(
+                Upper("advisor_id"), name="users_user_advisor_id_ci_key",
+                violation_error_message="A user with this Advisor ID already exists.",
+            ),
+        ]
+
     def __str__(self):
         # Human-readable representation for Django Admin
         return f"{self.username} ({self.advisor_id or self.email})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot for incremental FirmRoleStat updates (users/firm_stats.py).
+        loaded = instance.__dict__
+        if "firm_id" in loaded and "role" in loaded and "is_active" in loaded:
+            instance._stat_key = (loaded["firm_id"], loaded["role"], loaded["is_active"])
+        return instance
+
+    @property
+    def firm_display_name(self):
+        return self.firm.name if self.firm_id else self.firm_name
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "firm_name" in update_fields or "firm" in update_fields:
+            self._sync_firm()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "firm", "firm_name"}
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "bio" in update_fields:
+            self.render_bio()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "bio_html", "bio_renderer_version"}
+
+        from .snapshots import SNAPSHOT_FIELDS, render_snapshot
+
+        update_fields = kwargs.get("update_fields")
+        snapshot = update_fields is None or not SNAPSHOT_FIELDS.isdisjoint(update_fields)
+        # A new row's snapshot includes its id: render it once the INSERT assigned one.
+        new_row = self.pk is None
+        if snapshot and not new_row:
+            self.profile_snapshot = render_snapshot(self)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "profile_snapshot"}
+        super().save(*args, **kwargs)
+        if snapshot and new_row:
+            self.profile_snapshot = render_snapshot(self)
+            type(self)._base_manager.filter(pk=self.pk).update(profile_snapshot=self.profile_snapshot)
+
+    def render_bio(self):
+        self.bio_html = render_bio(self.bio)
+        self.bio_renderer_version = BIO_RENDERER_VERSION
+
+    def _sync_firm(self):
+        """
+        ``firm`` is authoritative; the legacy column mirrors its name (after a
+        firm rename, once the ``users.sync_firm_advisors`` task has run). Rows
+        that only carry a name (legacy writers, pre-backfill data) get linked to
+        the matching Firm.
+        """
+        if self.firm_id is not None:
+            self.firm_name = self.firm.name
+        elif self.firm_name.strip():
+            self.firm, _created = Firm.objects.get_or_create(name=self.firm_name.strip())
+            self.firm_name = self.firm.name
+
+
+class FirmRoleStat(models.Model):
+    """
+    Materialized advisor counts per (firm, role, is_active).
+
+    Maintained incrementally by users/firm_stats.py from User saves, deletes and
+    AdvisorQuerySet bulk writes; ``manage.py rebuild_firm_stats`` recomputes it
+    from users_user. Advisors without a firm are not counted.
+    """
+    firm = models.ForeignKey(Firm, on_delete=models.CASCADE, related_name="role_stats")
+    role = models.CharField(max_length=100)
+    is_active = models.BooleanField()
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["firm", "role", "is_active"], name="users_firmrolestat_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.firm_id}/{self.role}/{'active' if self.is_active else 'inactive'}: {self.count}"
+
+
+class ProfileChange(models.Model):
+    """
+    Who changed what on an advisor profile.
+
+    Rows are written in batches by users.audit.ProfileAuditWriter, off the
+    request path. FKs carry no DB constraint so history survives user deletion
+    and a batch never fails because one user disappeared before the flush.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="profile_changes",
+    )
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    # {"field": [old_value, new_value], ...}
+    changes = models.JSONField()
+    # Where the edit came from (e.g. "portal", "admin")
+    source = models.CharField(max_length=20, default="portal")
+    # Captured when the change happened, not when the batch was flushed
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["user", "-created_at"], name="users_pchange_user_created")]
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.created_at:%Y-%m-%d %H:%M:%S}: {', '.join(self.changes)}"
+
+
+class BackgroundTask(models.Model):
+    """
+    Queue row for users.tasks (post-request side effects).
+
+    Workers (manage.py run_workers) claim PENDING rows whose run_at has passed.
+    Successful tasks are deleted to keep the queue table small; FAILED rows
+    stay for inspection.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # At most one PENDING task per key (e.g. "profile-cache:42")
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"], name="users_task_status_run_at")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=Q(status="pending"),
+                name="users_task_pending_dedupe_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name}#{self.pk} ({self.status})"
+
+
+class OutboxEvent(models.Model):
+    """
+    Profile change notification for downstream systems (CRM, compliance).
+
+    Written in the same transaction as the change it describes and delivered
+    later by ``manage.py dispatch_outbox`` (users/outbox.py), at least once and
+    in ``id`` order per user. Delivered rows are deleted; dead letters stay for
+    inspection.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    # e.g. "profile.updated"
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Not delivered before this time (retry backoff)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    # Lease of the dispatcher currently delivering the row
+    claimed_by = models.CharField(max_length=32, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    # Dead letter: set after OUTBOX_MAX_ATTEMPTS failed deliveries; never claimed again
+    dead_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "id"], name="users_outbox_user_id")]
+
+    def __str__(self):
+        return f"{self.topic}#{self.pk} (user {self.user_id})"
+
+
+class EntitlementCounter(models.Model):
+    """
+    Single-row change counter for fund entitlements (see users/entitlements.py).
+
+    Every entitlement write takes the next value inside its own transaction. The
+    row lock serializes writers, so versions become visible in commit order and
+    an in-memory index can catch up with ``version > last_seen``.
+    """
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"entitlements@{self.value}"
+
+
+class AdvisorFundAccess(models.Model):
+    """
+    Grants an advisor (by ``User.advisor_id``) access to one FUND_CODE.
+
+    Keyed by the advisor_id string rather than a FK so entitlement feeds can be
+    loaded before (or independently of) portal accounts. Revocations keep the
+    row with ``is_active=False`` and a new version, so incremental index
+    refreshes see them.
+    """
+    advisor_id = models.CharField(max_length=20, verbose_name="Advisor ID")
+    fund_code = models.CharField(max_length=20, verbose_name="Fund Code")
+    is_active = models.BooleanField(default=True)
+    # Counter value of the write that last touched this row
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "advisor fund access"
+        verbose_name_plural = "advisor fund access"
+        constraints = [
+            models.UniqueConstraint(fields=["advisor_id", "fund_code"], name="users_fundaccess_advisor_fund"),
+        ]
+        indexes = [models.Index(fields=["version"], name="users_fundaccess_version")]
+
+    def __str__(self):
+        return f"{self.advisor_id} -> {self.fund_code}{'' if self.is_active else ' (revoked)'}"
+
+    def save(self, *args, **kwargs):
+        from .entitlements import next_version
+
+        with transaction.atomic():
+            self.version = next_version()
+            super().save(*args, **kwargs)
@@ -0,0 +1,288 @@
+"""
+Transactional outbox for downstream systems (CRM, compliance).
+
+Profile writes add an OutboxEvent row inside their own transaction (``emit`` /
+``emit_many``), so an event exists if and only if the change committed, and the
+request never waits on a downstream call. ``manage.py dispatch_outbox`` runs an
+OutboxDispatcher that delivers the rows in batches to the configured sinks
+(``OUTBOX_SINKS``):
+
+- claiming: a batch of due rows is leased with ``SELECT ... FOR UPDATE SKIP
+  LOCKED``. On SQLite, which has no row locks, a guarded ``UPDATE`` is used
+  instead. A lease older than ``OUTBOX_VISIBILITY_TIMEOUT`` (a crashed
+  dispatcher) can be claimed again.
+- ordering per user: a claimed row is delivered only if no older row of the
+  same user is still undelivered outside this batch. Other rows go back
+  unclaimed, so several dispatchers can run at once.
+- at least once: rows are deleted only after every sink accepted the batch. A
+  failed batch is retried with backoff, and since its rows stay in the table
+  they hold back the same users' later events. Consumers should dedupe on the
+  event ``id``.
+- dead letters: events that failed before are retried one per batch, so an
+  event a sink always rejects can't fail the events batched with it. After
+  ``OUTBOX_MAX_ATTEMPTS`` failures it is marked dead (``dead_at``): kept for
+  inspection, never claimed, and no longer holding back its user's later
+  events. Requeue it from the admin once the cause is fixed.
+"""
+import json
+import logging
+import time
+import traceback
+import urllib.request
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Exists, F, Min, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+from .tasks import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+# =========================================================================
+# Writing (inside the caller's transaction)
+# =========================================================================
+
+def emit(user_id, topic, payload):
+    return OutboxEvent.objects.create(user_id=user_id, topic=topic, payload=payload)
+
+
+def emit_many(events):
+    """Adds ``(user_id, topic, payload)`` events with one INSERT."""
+    return OutboxEvent.objects.bulk_create(
+        OutboxEvent(user_id=user_id, topic=topic, payload=payload) for user_id, topic, payload in events
+    )
+
+
+# =========================================================================
+# Sinks
+# =========================================================================
+
+def serialize(event):
+    return {
+        "id": event.pk,
+        "topic": event.topic,
+        "user_id": event.user_id,
+        "created_at": event.created_at,
+        "attempt": event.attempts,
+        "payload": event.payload,
+    }
+
+
+class BaseSink:
+    """Receives batches of serialized events; raises to have the batch retried."""
+
+    def send(self, events):
+        raise NotImplementedError
+
+
+class FileSink(BaseSink):
+    """Appends one JSON line per event (local stand-in, log shipping)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def send(self, events):
+        lines = "".join(json.dumps(event, cls=DjangoJSONEncoder) + "\n" for event in events)
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.write(lines)
+            fh.flush()
+
+
+class HttpSink(BaseSink):
+    """POSTs each batch as ``{"events": [...]}``; any non-2xx answer fails the batch."""
+
+    def __init__(self, url, headers=None, timeout=10.0):
+        self.url = url
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+
+    def send(self, events):
+        body = json.dumps({"events": events}, cls=DjangoJSONEncoder).encode()
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method="POST")
+        # urlopen raises HTTPError for 4xx/5xx answers.
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class MemorySink(BaseSink):
+    """Keeps every delivered event in ``self.events`` (tests)."""
+
+    def __init__(self):
+        self.events = []
+
+    def send(self, events):
+        self.events.extend(events)
+
+
+def sinks_from_settings():
+    return [
+        import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+        for config in getattr(settings, "OUTBOX_SINKS", [])
+    ]
+
+
+# =========================================================================
+# Dispatching
+# =========================================================================
+
+class OutboxDispatcher:
+    def __init__(self, sinks, batch_size=500, visibility_timeout=60, max_attempts=10):
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.stats = {
+            "delivered": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "deferred": 0,  # claimed, but an older event of the user was still pending
+            "dead": 0,
+            "send_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        options = {
+            "batch_size": getattr(settings, "OUTBOX_BATCH_SIZE", 500),
+            "visibility_timeout": getattr(settings, "OUTBOX_VISIBILITY_TIMEOUT", 60),
+            "max_attempts": getattr(settings, "OUTBOX_MAX_ATTEMPTS", 10),
+            **overrides,
+        }
+        return cls(sinks_from_settings(), **options)
+
+    def claim(self):
+        """
+        Leases due rows; returns the lease token. A batch is up to
+        ``batch_size`` first attempts, or a single retry of a failed event.
+        """
+        token = uuid.uuid4().hex
+        now = timezone.now()
+        stale = now - timedelta(seconds=self.visibility_timeout)
+        # Users whose head event is backing off or leased are skipped, so their
+        # queue can't fill every batch and starve everyone else.
+        held_back = OutboxEvent.objects.filter(
+            Q(available_at__gt=now) | Q(claimed_by__isnull=False, locked_at__gte=stale),
+            user_id=OuterRef("user_id"),
+            pk__lt=OuterRef("pk"),
+            dead_at__isnull=True,
+        )
+        due = OutboxEvent.objects.filter(
+            Q(claimed_by__isnull=True) | Q(locked_at__lt=stale),
+            ~Exists(held_back),
+            available_at__lte=now,
+            dead_at__isnull=True,
+        ).order_by("id")
+
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                rows = due.select_for_update(skip_locked=True).values_list("id", "attempts")[:self.batch_size]
+                ids = self._batch(rows)
+                OutboxEvent.objects.filter(pk__in=ids).update(claimed_by=token, locked_at=now)
+        else:
+            # No row locks (SQLite): the guard makes a row lost to another dispatcher a no-op.
+            ids = self._batch(due.values_list("id", "attempts")[:self.batch_size])
+            OutboxEvent.objects.filter(
+                Q(claimed_by__isnull=True) | Q(locked_at__lt=stale), pk__in=ids
+            ).update(claimed_by=token, locked_at=now)
+        return token
+
+    @staticmethod
+    def _batch(rows):
+        """Ids to claim of the due ``(id, attempts)`` rows: a retry alone, else the leading first attempts."""
+        ids = []
+        for pk, attempts in rows:
+            if attempts:
+                return ids or [pk]
+            ids.append(pk)
+        return ids
+
+    def release_blocked(self, token):
+        """Unclaims rows whose user still has an older undelivered row elsewhere."""
+        older = OutboxEvent.objects.filter(
+            user_id=OuterRef("user_id"), pk__lt=OuterRef("pk"), dead_at__isnull=True
+        ).exclude(claimed_by=token)
+        released = (
+            OutboxEvent.objects.filter(claimed_by=token)
+            .filter(Exists(older))
+            .update(claimed_by=None, locked_at=None)
+        )
+        self.stats["deferred"] += released
+        return released
+
+    def dispatch_batch(self):
+        """
+        Claims and delivers one batch. Returns the number of events claimed,
+        whether delivered, failed or deferred; 0 means nothing was due.
+        """
+        try:
+            token = self.claim()
+            deferred = self.release_blocked(token)
+            events = list(OutboxEvent.objects.filter(claimed_by=token).order_by("id"))
+            if not events:
+                return deferred
+
+            started = time.perf_counter()
+            try:
+                payload = [serialize(event) for event in events]
+                for sink in self.sinks:
+                    sink.send(payload)
+            except Exception:
+                self.stats["failed_batches"] += 1
+                self.fail(token, events, traceback.format_exc())
+                return deferred + len(events)
+            finally:
+                self.stats["send_seconds"] += time.perf_counter() - started
+
+            # Only our lease: a row reclaimed after a timeout is left to its new owner.
+            OutboxEvent.objects.filter(claimed_by=token).delete()
+            self.stats["batches"] += 1
+            self.stats["delivered"] += len(events)
+            return deferred + len(events)
+        finally:
+            close_old_connections()
+
+    def fail(self, token, events, error):
+        attempts = max(event.attempts for event in events) + 1
+        delay = backoff_delay(attempts)
+        logger.warning("Outbox batch of %s events failed (attempt %s), retrying in %.0fs", len(events), attempts, delay)
+        now = timezone.now()
+        # Rows on their last attempt become dead letters.
+        dead = OutboxEvent.objects.filter(claimed_by=token, attempts__gte=self.max_attempts - 1).update(dead_at=now)
+        if dead:
+            self.stats["dead"] += dead
+            logger.error("%s outbox event(s) failed %s times; marked dead", dead, self.max_attempts)
+        OutboxEvent.objects.filter(claimed_by=token).update(
+            claimed_by=None,
+            locked_at=None,
+            attempts=F("attempts") + 1,
+            available_at=now + timedelta(seconds=delay),
+            last_error=error[-4000:],
+        )
+
+    def drain(self, max_batches=None):
+        """Dispatches batches until nothing is due (or ``max_batches``); returns events delivered."""
+        delivered, batches = self.stats["delivered"], 0
+        while max_batches is None or batches < max_batches:
+            batches += 1
+            if not self.dispatch_batch():
+                break
+        return self.stats["delivered"] - delivered
+
+
+def backlog():
+    """``(pending rows, age in seconds of the oldest one)``; the lag metric. Dead letters aren't pending."""
+    pending = OutboxEvent.objects.filter(dead_at__isnull=True)
+    oldest = pending.aggregate(oldest=Min("created_at"))["oldest"]
+    return pending.count(), (timezone.now() - oldest).total_seconds() if oldest else 0.0
+
+
+def dead_letters():
+    return OutboxEvent.objects.filter(dead_at__isnull=False)
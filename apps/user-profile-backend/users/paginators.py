@@ -0,0 +1,159 @@
+"""
+Paginators for admin changelists over large tables.
+
+``Paginator`` runs an exact ``COUNT(*)`` and slices with ``OFFSET``, and both
+grow with the table. ``LargeTablePaginator`` bounds them:
+
+- count: an unfiltered changelist uses the planner's row estimate
+  (``pg_class.reltuples``, ``sqlite_stat1``) or, when there is none, an exact
+  count cached for ``ADMIN_COUNT_CACHE_TIMEOUT``. A filtered changelist counts
+  at most ``ADMIN_COUNT_LIMIT`` rows (``COUNT`` over a ``LIMIT`` subquery);
+  beyond that ``count_is_bounded`` is set and the changelist shows "more than
+  N" (users/templates/admin/users/user/pagination.html). Small tables
+  (estimate below ``ADMIN_EXACT_COUNT_THRESHOLD``) are counted exactly.
+- pages: when the changelist is ordered by one unique column (the default for
+  advisors: ``username``), page N+1 is fetched with ``WHERE key > last key of
+  page N`` instead of an ``OFFSET``. The boundaries are cached as pages are
+  visited, and a page without a cached boundary falls back to ``OFFSET`` once.
+  Past a bounded count, any page whose boundary is cached can be opened, and
+  each full page adds a link to the next one.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.core.paginator import EmptyPage, Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+ADMIN_COUNT_LIMIT = getattr(settings, "ADMIN_COUNT_LIMIT", 10_000)
+ADMIN_EXACT_COUNT_THRESHOLD = getattr(settings, "ADMIN_EXACT_COUNT_THRESHOLD", 10_000)
+ADMIN_COUNT_CACHE_TIMEOUT = getattr(settings, "ADMIN_COUNT_CACHE_TIMEOUT", 60 * 5)
+
+
+def estimated_row_count(model, using="default"):
+    """Row estimate from the database's statistics, or None if it has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            elif connection.vendor == "sqlite":
+                # Populated by ANALYZE; the first number is the table's row count.
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            elif connection.vendor == "mysql":
+                cursor.execute(
+                    "SELECT table_rows FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = %s",
+                    [table],
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None  # PostgreSQL: -1 = never analyzed
+
+
+class LargeTablePaginator(Paginator):
+    # Set by ``count``: there are more than ADMIN_COUNT_LIMIT rows
+    count_is_bounded = False
+
+    def _query_digest(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return None
+        return hashlib.md5(f"{self.object_list.model._meta.label}:{self.per_page}:{sql}".encode()).hexdigest()
+
+    # --- Counting ---
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            # Filtered: bounded count, one row past the limit to tell "more than N".
+            count = queryset[:ADMIN_COUNT_LIMIT + 1].count()
+            self.count_is_bounded = count > ADMIN_COUNT_LIMIT
+            return min(count, ADMIN_COUNT_LIMIT)
+
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is not None and estimate >= ADMIN_EXACT_COUNT_THRESHOLD:
+            return estimate
+        if estimate is not None:
+            return queryset.count()
+
+        key = f"admin_count:{queryset.model._meta.label}"
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, ADMIN_COUNT_CACHE_TIMEOUT)
+        return count
+
+    # --- Keyset pages ---
+
+    @cached_property
+    def keyset(self):
+        """
+        ``(field name, descending)`` when ordered by a unique column, else None.
+        Columns after it never break a tie, so they are ignored (the admin
+        changelist orders by ``("username", "username")``).
+        """
+        ordering = self.object_list.query.order_by
+        if not ordering or not isinstance(ordering[0], str):
+            return None
+        name = ordering[0].lstrip("-")
+        opts = self.object_list.model._meta
+        try:
+            field = opts.pk if name == "pk" else opts.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not (field.unique and not field.null and field.concrete):
+            return None
+        return field.attname, ordering[0].startswith("-")
+
+    def _boundary_key(self, digest, number):
+        return f"admin_keyset:{digest}:{number}"
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past a bounded count, a page exists if the one before it was full.
+            digest = self._query_digest() if self.count_is_bounded and self.keyset else None
+            if digest is not None and int(number) > 1 and cache.get(self._boundary_key(digest, int(number))) is not None:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        digest = self._query_digest() if self.keyset else None
+        if digest is None:
+            return super().page(number)
+
+        name, descending = self.keyset
+        if number == 1:
+            objects = list(self.object_list[:self.per_page])
+        else:
+            boundary = cache.get(self._boundary_key(digest, number))
+            if boundary is None:
+                page = super().page(number)
+                objects = list(page.object_list)
+            else:
+                lookup = f"{name}__{'lt' if descending else 'gt'}"
+                objects = list(self.object_list.filter(**{lookup: boundary})[:self.per_page])
+
+        if len(objects) == self.per_page:
+            cache.set(
+                self._boundary_key(digest, number + 1),
+                getattr(objects[-1], name),
+                ADMIN_COUNT_CACHE_TIMEOUT,
+            )
+            if self.count_is_bounded and number >= self.num_pages:
+                self.__dict__["num_pages"] = number + 1  # link the next page
+        return self._get_page(objects, number, self)
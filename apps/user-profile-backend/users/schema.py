@@ -0,0 +1,32 @@
+"""
+Cached OpenAPI schema view.
+
+Schema generation walks every route and serializer; the result only changes on
+deploy, so it is rendered once per (format, version, lang) and served from the
+cache afterwards. Imported lazily from users/urls.py to keep drf_spectacular
+off the worker boot path.
+"""
+from drf_spectacular.views import SpectacularAPIView
+
+from .cache import CachedPayloadResponse, SCHEMA_CACHE_TIMEOUT, build_entry, get_or_build, schema_cache_key
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        renderer = request.accepted_renderer
+        key = schema_cache_key(renderer.format, version, request.GET.get("lang"))
+
+        def build():
+            response = super(CachedSpectacularAPIView, self)._get_schema_response(request)
+            body = renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+            return build_entry(response.data, body=body, body_format=renderer.format)
+
+        entry = get_or_build(key, build, SCHEMA_CACHE_TIMEOUT)
+
+        return CachedPayloadResponse(
+            entry,
+            key,
+            SCHEMA_CACHE_TIMEOUT,
+            headers={"Content-Disposition": f'inline; filename="{self._get_filename(request, version)}"'},
+        )
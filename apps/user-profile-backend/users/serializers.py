@@ -1,13 +1,56 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .bio import BIO_RENDERER_VERSION, render_bio
+from .models import FirmRoleStat
 
 User = get_user_model()
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    ``parse_fieldset`` validates a ``?fields=a,b`` parameter (a sparse
+    fieldset). Responses are trimmed from the cached full representation
+    (users/cache.py ``get_fieldset_entry``), so the serializer itself always
+    renders every field.
+    """
+
+    @classmethod
+    def parse_fieldset(cls, raw):
+        """
+        ``"last_name,first_name"`` -> ``("first_name", "last_name")``; None for
+        "all fields". Raises ValidationError for unknown or missing names.
+        """
+        if raw is None:
+            return None
+        requested = {name.strip() for name in raw.split(",") if name.strip()}
+        if not requested:
+            raise serializers.ValidationError({"fields": ["Select at least one field."]})
+        unknown = requested.difference(cls.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": [f"Unknown field(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(cls.Meta.fields)}."]}
+            )
+        return tuple(name for name in cls.Meta.fields if name in requested)
+
+
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     avatar_url = serializers.URLField(required=False, allow_blank=False)
     bio = serializers.CharField(required=False, allow_blank=True, max_length=1024)
     first_name = serializers.CharField(required=False, allow_blank=True, max_length=50)
     last_name = serializers.CharField(required=False, allow_blank=True, max_length=50)
+    # Compatibility: the JSON contract keeps a flat firm_name, now read from the Firm row.
+    firm_name = serializers.CharField(source="firm_display_name", read_only=True)
+    # Rendered on save (users/bio.py); safe to insert as HTML.
+    bio_html = serializers.SerializerMethodField()
+
+    def get_bio_html(self, obj):
+        if obj.bio_renderer_version != BIO_RENDERER_VERSION:
+            # Rendered by older rules: render in memory only. Reads never write;
+            # the row is brought up to date by rerender_bios or the next
+            # snapshot write (users/snapshots.py), which still sees it as stale.
+            return render_bio(obj.bio)
+        return obj.bio_html
 
     def validate_avatar_url(self, value):
         # Enforce http/https to avoid unsafe or malformed URLs.
@@ -30,13 +73,48 @@ class UserProfileSerializer(serializers.ModelSerializer):
         # Fields exposed to the frontend (must match the B2B Advisor JSON contract)
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name', 
-            'advisor_id', 'firm_name', 'role', 'bio', 'avatar_url',
+            'advisor_id', 'firm_name', 'role', 'bio', 'bio_html', 'avatar_url',
             'date_joined' 
         ]
         
         # Fields that cannot be modified via a PATCH request from the portal user
         read_only_fields = [
             'id', 'username', 'email', 'advisor_id', 
-            'firm_name', 'date_joined', 'role'
+            'firm_name', 'date_joined', 'role', 'bio_html'
         ]
         # Note: Advisor ID and Firm Name must be managed by Admin, not the user.
+
+
+class LoginSerializer(TokenObtainPairSerializer):
+    """
+    Token pair plus the profile payload, so the portal can render right after
+    login without a second round trip. The profile is serialized from the user
+    object authentication already loaded (no extra query).
+
+    Advisors log in with their username, email or advisor ID
+    (users/backends.py), sent as ``identifier`` or, for existing clients, as
+    ``username``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields[self.username_field].required = False
+        self.fields["identifier"] = serializers.CharField(write_only=True, required=False)
+
+    def validate(self, attrs):
+        identifier = attrs.pop("identifier", None) or attrs.get(self.username_field)
+        if not identifier:
+            raise serializers.ValidationError({"identifier": [self.fields["identifier"].error_messages["required"]]})
+        attrs[self.username_field] = identifier
+        data = super().validate(attrs)
+        data["profile"] = UserProfileSerializer(self.user, context=self.context).data
+        return data
+
+
+class FirmRoleStatSerializer(serializers.ModelSerializer):
+    firm_name = serializers.CharField(source="firm.name", read_only=True)
+
+    class Meta:
+        model = FirmRoleStat
+        fields = ['firm', 'firm_name', 'role', 'is_active', 'count']
+        read_only_fields = fields
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import firm_stats
+from .cache import invalidate_profile_cache, invalidate_profile_caches
+from .models import Firm
+from .tasks import enqueue
+
+User = get_user_model()
+
+
+# Any write to a User row (portal PATCH, admin edit, last_login bump) evicts
+# the cached profile payload.
+@receiver(post_save, sender=User, dispatch_uid="users.invalidate_profile_cache_on_save")
+@receiver(post_delete, sender=User, dispatch_uid="users.invalidate_profile_cache_on_delete")
+def invalidate_cached_profile(sender, instance, **kwargs):
+    invalidate_profile_cache(instance.pk)
+
+
+# Profiles embed the firm name, so a firm rename evicts its advisors' entries.
+# Their snapshots and legacy firm_name column are rewritten after commit by a
+# task, in short chunks (users/bulk.py): the rename itself locks no advisor rows.
+@receiver(post_save, sender=Firm, dispatch_uid="users.invalidate_profile_cache_on_firm_save")
+def invalidate_firm_profiles(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_profile_caches(instance.advisors.values_list("pk", flat=True))
+        enqueue("users.sync_firm_advisors", {"firm_id": instance.pk}, dedupe_key=f"firm-advisors:{instance.pk}")
+
+
+# FirmRoleStat deltas for per-row writes (bulk writes: AdvisorQuerySet).
+@receiver(pre_save, sender=User, dispatch_uid="users.firm_stats_pre_save")
+def capture_firm_stat_key(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        firm_stats.capture_previous_key(instance, update_fields)
+
+
+@receiver(post_save, sender=User, dispatch_uid="users.firm_stats_post_save")
+def update_firm_stats_on_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        firm_stats.user_saved(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=User, dispatch_uid="users.firm_stats_post_delete")
+def update_firm_stats_on_delete(sender, instance, **kwargs):
+    firm_stats.user_deleted(instance)
@@ -0,0 +1,149 @@
+"""
+Denormalized profile snapshots: each advisor's public ``UserProfileSerializer``
+representation, rendered to JSON once per write and stored on the row
+(``User.profile_snapshot``).
+
+A cold profile read serves those bytes as they are: no serializer, no firm
+join, and for the cache-refresh task and ``warm_profile_cache`` a
+single-column query instead of hydrating full model instances.
+
+Every write path re-renders the snapshot:
+
+- ``User.save()`` re-renders it whenever a field the serializer reads is saved
+  (portal PATCH, admin, ``create_user``).
+- Bulk writes re-render the rows they touched: firm/role reassignment
+  (users/bulk.py), ``rerender_bios`` and ``seed_advisors``.
+- A firm rename re-renders its advisors' snapshots in a task queued after
+  commit (``users.sync_firm_advisors``). Until a worker runs it, reads serve the
+  old firm name.
+
+Rendering a snapshot brings a bio rendered by an older BIO_RENDERER_VERSION up
+to date in memory, and the writers above store that ``bio_html`` together with
+the snapshot (the serializer itself only re-renders in memory and never
+writes). A stored snapshot never carries an older bio rendering than its row. Reads render (and store) a missing snapshot,
+or one on a row whose bio is out of date. Any other drift is found and fixed by
+``manage.py check_profile_snapshots --repair``; run it after changing what
+UserProfileSerializer outputs.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from rest_framework.renderers import JSONRenderer
+
+from .bio import BIO_RENDERER_VERSION
+from .cache import build_entry
+from .serializers import UserProfileSerializer
+
+SNAPSHOT_CHUNK_SIZE = 1000
+
+# Model fields UserProfileSerializer reads: saving any of them re-renders the snapshot.
+SNAPSHOT_FIELDS = frozenset({
+    "username", "email", "first_name", "last_name", "advisor_id", "firm", "firm_name", "role",
+    "bio", "bio_html", "bio_renderer_version", "avatar_url", "date_joined",
+})
+
+
+def render_snapshots(users):
+    """
+    The snapshots ``users`` should hold, in order. Never writes: stale bios are
+    re-rendered on the instances only, for the caller to store along with the
+    snapshots. One serializer renders the whole list, so the field set is built
+    once rather than per row.
+    """
+    for user in users:
+        if user.bio_renderer_version != BIO_RENDERER_VERSION:
+            user.render_bio()
+    serializer, renderer = UserProfileSerializer(), JSONRenderer()
+    return [renderer.render(serializer.to_representation(user)).decode() for user in users]
+
+
+def render_snapshot(user):
+    """The snapshot ``user`` should hold (see ``render_snapshots``)."""
+    return render_snapshots([user])[0]
+
+
+def is_current(user):
+    return bool(user.profile_snapshot) and user.bio_renderer_version == BIO_RENDERER_VERSION
+
+
+def snapshot_body(user):
+    """
+    The stored snapshot of ``user`` (a loaded instance, e.g. ``request.user``).
+    A missing or stale one is rendered and stored first, unless the row was
+    rewritten in the meantime.
+    """
+    if not is_current(user):
+        stale, user.profile_snapshot = user.profile_snapshot, render_snapshot(user)
+        type(user).objects.filter(pk=user.pk, bio=user.bio, profile_snapshot=stale).update(
+            profile_snapshot=user.profile_snapshot,
+            bio_html=user.bio_html,
+            bio_renderer_version=user.bio_renderer_version,
+        )
+    return user.profile_snapshot
+
+
+def snapshot_entry(body):
+    """A profile cache entry (users/cache.py) whose body is the snapshot's bytes."""
+    return build_entry(json.loads(body), body=body.encode(), body_format="json")
+
+
+def load_snapshots(user_ids):
+    """``{pk: snapshot}`` for ``user_ids``, rendering (and storing) the missing or stale ones."""
+    User = get_user_model()
+    rows = User.objects.filter(pk__in=user_ids).values_list("pk", "profile_snapshot", "bio_renderer_version")
+    snapshots = {pk: body for pk, body, version in rows if body and version == BIO_RENDERER_VERSION}
+    stale = [pk for pk in user_ids if pk not in snapshots]
+    if stale:
+        refresh_snapshots(User.objects.filter(pk__in=stale))
+        snapshots.update(User.objects.filter(pk__in=stale).values_list("pk", "profile_snapshot"))
+    return snapshots
+
+
+def store_snapshots(users):
+    """
+    Renders and writes the snapshots of ``users``, instances already holding
+    their saved values (and ``firm``). Bios rendered by an older version are
+    re-rendered and written in the same statement.
+
+    The write is one parameterized ``UPDATE`` run once per row
+    (``executemany``): ``bulk_update`` builds a ``CASE`` expression per row,
+    which costs more Python time than inserting the rows did.
+    """
+    User = get_user_model()
+    fields = ["profile_snapshot"]
+    if any(user.bio_renderer_version != BIO_RENDERER_VERSION for user in users):
+        fields += ["bio_html", "bio_renderer_version"]
+    for user, snapshot in zip(users, render_snapshots(users)):
+        user.profile_snapshot = snapshot
+
+    connection = connections[router.db_for_write(User)]
+    quote = connection.ops.quote_name
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        quote(User._meta.db_table),
+        ", ".join(f"{quote(User._meta.get_field(name).column)} = %s" for name in fields),
+        quote(User._meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [[getattr(user, name) for name in fields] + [user.pk] for user in users])
+
+
+def refresh_snapshots(queryset, chunk_size=SNAPSHOT_CHUNK_SIZE):
+    """
+    Re-renders the snapshot of every user in ``queryset``. Rows are read in
+    primary-key chunks under ``SELECT ... FOR UPDATE``, so a concurrent save
+    can't be overwritten by a rendering of the row it replaced. Returns the
+    number of rows written.
+    """
+    written, last_pk = 0, None
+    while True:
+        with transaction.atomic(using=queryset.db):
+            chunk = queryset.select_related("firm").select_for_update(of=("self",)).order_by("pk")
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            users = list(chunk[:chunk_size])
+            if not users:
+                return written
+            store_snapshots(users)
+        last_pk = users[-1].pk
+        written += len(users)
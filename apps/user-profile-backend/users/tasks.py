@@ -0,0 +1,192 @@
+"""
+Lightweight background tasks backed by the BackgroundTask table.
+
+Register a function with ``@task("name")`` and queue it with ``enqueue``.
+By default the queue row is inserted once the surrounding transaction commits,
+so a worker never runs a side effect for a rolled-back write. Workers are
+started with ``python manage.py run_workers``.
+
+With ``settings.TASKS_EAGER`` the function runs inline instead of being queued
+(intended for tests and local development).
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=None):
+    """Registers ``func`` under ``name``. Task functions take JSON-serializable kwargs."""
+
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts or getattr(settings, "TASKS_DEFAULT_MAX_ATTEMPTS", 5)
+        _registry[name] = func
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def enqueue(name, payload=None, *, dedupe_key=None, delay=0, on_commit=True):
+    """
+    Queues task ``name`` with ``payload`` (kwargs). A ``dedupe_key`` collapses
+    duplicates while a matching task is still pending.
+    """
+    payload = payload or {}
+    get_task(name)  # fail fast on typos
+
+    def _enqueue():
+        if getattr(settings, "TASKS_EAGER", False):
+            get_task(name)(**payload)
+            return
+        try:
+            with transaction.atomic():
+                BackgroundTask.objects.create(
+                    name=name,
+                    payload=payload,
+                    dedupe_key=dedupe_key,
+                    max_attempts=get_task(name).max_attempts,
+                    run_at=timezone.now() + timedelta(seconds=delay),
+                )
+        except IntegrityError:
+            if dedupe_key is None:
+                raise
+            # A pending task with the same key will pick up the latest state.
+
+    if on_commit:
+        transaction.on_commit(_enqueue)
+    else:
+        _enqueue()
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with full jitter, in seconds."""
+    base = getattr(settings, "TASKS_BACKOFF_BASE", 2.0)
+    cap = getattr(settings, "TASKS_BACKOFF_MAX", 600)
+    return random.uniform(0, min(cap, base * 2 ** max(attempts - 1, 0)))
+
+
+def claim(limit):
+    """
+    Marks up to ``limit`` due tasks as RUNNING and returns their ids. Tasks left
+    RUNNING longer than TASKS_VISIBILITY_TIMEOUT (a crashed worker) are reclaimed.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, "TASKS_VISIBILITY_TIMEOUT", 300))
+    due = BackgroundTask.objects.filter(
+        Q(status=BackgroundTask.Status.PENDING, run_at__lte=now)
+        | Q(status=BackgroundTask.Status.RUNNING, locked_at__lt=stale)
+    ).order_by("run_at", "id")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit])
+            BackgroundTask.objects.filter(pk__in=ids).update(
+                status=BackgroundTask.Status.RUNNING, locked_at=now, attempts=F("attempts") + 1
+            )
+        return ids
+
+    # No row locks (SQLite): claim row by row with a guarded UPDATE.
+    claimed = []
+    for task_id, status, locked_at in due.values_list("id", "status", "locked_at")[:limit]:
+        won = BackgroundTask.objects.filter(pk=task_id, status=status, locked_at=locked_at).update(
+            status=BackgroundTask.Status.RUNNING, locked_at=now, attempts=F("attempts") + 1
+        )
+        if won:
+            claimed.append(task_id)
+    return claimed
+
+
+def run_task(task_id):
+    """Executes one claimed task; used by both thread and process workers."""
+    try:
+        row = BackgroundTask.objects.get(pk=task_id)
+        try:
+            get_task(row.name)(**row.payload)
+        except Exception:
+            error = traceback.format_exc()
+            if row.attempts >= row.max_attempts:
+                row.status = BackgroundTask.Status.FAILED
+                logger.error("Task %s failed permanently after %s attempts", row, row.attempts)
+            else:
+                row.status = BackgroundTask.Status.PENDING
+                row.run_at = timezone.now() + timedelta(seconds=backoff_delay(row.attempts))
+                logger.warning("Task %s failed (attempt %s), retrying", row, row.attempts)
+            row.last_error = error[-4000:]
+            row.locked_at = None
+            try:
+                with transaction.atomic():
+                    row.save(update_fields=["status", "run_at", "last_error", "locked_at"])
+            except IntegrityError:
+                # The same dedupe_key was enqueued while this ran; that pending
+                # task supersedes the retry.
+                logger.info("Task %s superseded by a pending duplicate; retry dropped", row)
+                row.delete()
+            return False
+        row.delete()
+        return True
+    finally:
+        close_old_connections()
+
+
+# =========================================================================
+# Registered tasks
+# =========================================================================
+
+@task("users.refresh_profile_cache")
+def refresh_profile_cache(user_id):
+    """Re-populates the cached profile payload after an update."""
+    from .cache import PROFILE_CACHE_TIMEOUT, profile_cache_key
+    from .snapshots import load_snapshots, snapshot_entry
+
+    body = load_snapshots([user_id]).get(user_id)
+    if body is not None:
+        cache.set(profile_cache_key(user_id), snapshot_entry(body), timeout=PROFILE_CACHE_TIMEOUT)
+
+
+@task("users.sync_firm_advisors")
+def sync_firm_advisors_task(firm_id):
+    """Firm renames: the advisors' snapshots and legacy firm_name column (users/bulk.py)."""
+    from .bulk import sync_firm_advisors
+    from .models import Firm
+
+    firm = Firm.objects.filter(pk=firm_id).first()
+    if firm is not None:
+        logger.info("Firm %s renamed: %s advisors rewritten", firm_id, sync_firm_advisors(firm))
+
+
+@task("users.reassign_advisors")
+def reassign_advisors_task(user_ids, firm_id=None, role=None, changed_by_id=None):
+    """Large admin reassignment selections, run off the request (users/bulk.py)."""
+    from django.contrib.auth import get_user_model
+
+    from .bulk import reassign_advisors
+    from .models import Firm
+
+    def log_progress(done, total, elapsed):
+        logger.info("Reassigning advisors: %s/%s (%.0f/s)", done, total, done / max(elapsed, 1e-6))
+
+    reassign_advisors(
+        get_user_model().objects.filter(pk__in=user_ids),
+        firm=Firm.objects.get(pk=firm_id) if firm_id is not None else None,
+        role=role,
+        changed_by=get_user_model().objects.filter(pk=changed_by_id).first(),
+        source="admin-bulk",
+        progress=log_progress,
+    )
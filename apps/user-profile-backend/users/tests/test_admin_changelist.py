@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.admin import CustomUserAdmin
+from users.models import Firm
+from users.paginators import LargeTablePaginator
+
+
+User = get_user_model()
+
+
+class LargeTablePaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f"adv{n:03d}", email=f"adv{n:03d}@example.com") for n in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_up_pages_use_keyset_instead_of_offset(self):
+        paginator = LargeTablePaginator(User.objects.order_by("username"), 10)
+        first = paginator.page(1)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = paginator.page(2)
+
+        self.assertEqual([u.username for u in second], [f"adv{n:03d}" for n in range(10, 20)])
+        self.assertEqual(first.object_list[-1].username, "adv009")
+        [query] = queries.captured_queries
+        self.assertNotIn("OFFSET", query["sql"].upper())
+        self.assertIn("adv009", query["sql"])
+
+    def test_uncached_page_falls_back_to_offset(self):
+        paginator = LargeTablePaginator(User.objects.order_by("-pk"), 10)
+
+        page = paginator.page(3)
+
+        self.assertEqual(len(page), 5)
+
+    def test_non_unique_ordering_is_not_keyset(self):
+        self.assertIsNone(LargeTablePaginator(User.objects.order_by("last_name"), 10).keyset)
+        self.assertIsNone(LargeTablePaginator(User.objects.order_by("last_name", "pk"), 10).keyset)
+        self.assertEqual(LargeTablePaginator(User.objects.order_by("username", "pk"), 10).keyset, ("username", False))
+        self.assertEqual(LargeTablePaginator(User.objects.order_by("-username"), 10).keyset, ("username", True))
+
+    def test_filtered_count_is_bounded(self):
+        with mock.patch("users.paginators.ADMIN_COUNT_LIMIT", 7):
+            paginator = LargeTablePaginator(User.objects.filter(is_active=True).order_by("pk"), 5)
+            self.assertEqual(paginator.count, 7)
+            self.assertTrue(paginator.count_is_bounded)
+        with mock.patch("users.paginators.ADMIN_COUNT_LIMIT", 25):
+            paginator = LargeTablePaginator(User.objects.filter(is_active=True).order_by("pk"), 5)
+            self.assertEqual(paginator.count, 25)
+            self.assertFalse(paginator.count_is_bounded)
+
+    def test_keyset_pages_past_a_bounded_count(self):
+        with mock.patch("users.paginators.ADMIN_COUNT_LIMIT", 7):
+            paginator = LargeTablePaginator(User.objects.filter(is_active=True).order_by("username"), 5)
+            self.assertEqual(paginator.num_pages, 2)
+            with self.assertRaises(EmptyPage):
+                paginator.page(4)  # not reached yet: no boundary
+
+            for number in (1, 2, 3, 4):
+                page = paginator.page(number)
+            self.assertEqual([u.username for u in page], [f"adv{n:03d}" for n in range(15, 20)])
+            self.assertTrue(page.has_next())
+            self.assertEqual(len(paginator.page(5)), 5)
+
+    def test_unfiltered_count_uses_statistics_on_large_tables(self):
+        with mock.patch("users.paginators.estimated_row_count", return_value=2_000_000):
+            with self.assertNumQueries(0):
+                self.assertEqual(LargeTablePaginator(User.objects.order_by("pk"), 100).count, 2_000_000)
+
+    def test_unfiltered_count_without_statistics_is_cached(self):
+        with mock.patch("users.paginators.estimated_row_count", return_value=None):
+            self.assertEqual(LargeTablePaginator(User.objects.order_by("pk"), 10).count, 25)
+            with self.assertNumQueries(0):
+                self.assertEqual(LargeTablePaginator(User.objects.order_by("pk"), 10).count, 25)
+
+
+class AdvisorChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="root", email="root@example.com", password="pw")
+        cls.firm = Firm.objects.create(name="Acme")
+        User.objects.create_user(username="acme1", email="acme1@example.com", firm=cls.firm, bio="x" * 500)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_changelist_counts_once_and_defers_heavy_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:users_user_changelist"))
+
+        self.assertEqual(response.status_code, 200)
+        user_queries = [q["sql"] for q in queries if '"users_user"' in q["sql"] and "django_session" not in q["sql"]]
+        self.assertEqual(len([sql for sql in user_queries if "COUNT(" in sql.upper()]), 1)
+        listing = [sql for sql in user_queries if "ORDER BY" in sql.upper() and "COUNT(" not in sql.upper()]
+        self.assertTrue(listing)
+        self.assertNotIn('"users_user"."bio"', listing[-1])
+        self.assertNotIn('"users_user"."password"', listing[-1])
+
+    def test_filtered_changelist_pages_past_the_count_limit(self):
+        User.objects.bulk_create(
+            User(username=f"acme{n}", email=f"acme{n}@example.com", firm=self.firm) for n in range(2, 5)
+        )
+        url, params = reverse("admin:users_user_changelist"), {"firm__id__exact": self.firm.pk}
+        with mock.patch("users.paginators.ADMIN_COUNT_LIMIT", 2), mock.patch.object(CustomUserAdmin, "list_per_page", 1):
+            response = self.client.get(url, params)
+            self.assertContains(response, "more than 2 users")
+            for number in (2, 3, 4):
+                response = self.client.get(url, {**params, "p": number})
+                self.assertEqual([u.username for u in response.context["cl"].result_list], [f"acme{number}"])
+
+    def test_firm_filter(self):
+        response = self.client.get(reverse("admin:users_user_changelist"), {"firm__id__exact": self.firm.pk})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u.username for u in response.context["cl"].result_list], ["acme1"])
@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.audit import ProfileAuditWriter
+from users.models import ProfileChange
+
+
+User = get_user_model()
+
+
+class ProfileAuditWriterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="audited", email="audited@example.com")
+
+    def test_record_buffers_until_flush(self):
+        writer = ProfileAuditWriter(batch_size=10, flush_interval=0)
+        for i in range(25):
+            writer.record(self.user.pk, {"bio": [str(i), str(i + 1)]})
+
+        self.assertEqual(ProfileChange.objects.count(), 0)
+        self.assertEqual(writer.flush(), 25)
+        self.assertEqual(ProfileChange.objects.filter(user=self.user).count(), 25)
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(writer.stats["written"], 25)
+
+    def test_batch_size_wakes_flusher(self):
+        writer = ProfileAuditWriter(batch_size=3, flush_interval=0)
+        writer.record(self.user.pk, {"bio": ["a", "b"]})
+        self.assertFalse(writer._wakeup.is_set())
+
+        writer.record(self.user.pk, {"bio": ["b", "c"]})
+        writer.record(self.user.pk, {"bio": ["c", "d"]})
+        self.assertTrue(writer._wakeup.is_set())
+
+    def test_failed_flush_keeps_rows(self):
+        writer = ProfileAuditWriter(flush_interval=0)
+        writer.record(self.user.pk, {"bio": ["a", "b"]})
+
+        with mock.patch.object(ProfileChange.objects, "bulk_create", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                writer.flush()
+
+        self.assertEqual(writer.pending(), 1)
+        self.assertEqual(writer.flush(), 1)
+
+    def test_max_pending_is_a_hard_bound(self):
+        writer = ProfileAuditWriter(flush_interval=0, max_pending=2)
+        for i in range(3):
+            writer.record(self.user.pk, {"bio": [str(i), str(i + 1)]})
+
+        self.assertEqual(writer.pending(), 2)
+        self.assertEqual((writer.stats["dropped"], writer.stats["overflows"]), (1, 1))
+
+    def test_failed_flush_requeues_at_most_max_pending(self):
+        writer = ProfileAuditWriter(flush_interval=0, max_pending=3)
+        for i in range(3):
+            writer.record(self.user.pk, {"bio": [str(i), str(i + 1)]})
+
+        def outage(*args, **kwargs):
+            # PATCHes keep arriving while the write fails.
+            writer.record(self.user.pk, {"bio": ["x", "y"]})
+            writer.record(self.user.pk, {"bio": ["y", "z"]})
+            raise RuntimeError("db down")
+
+        with mock.patch.object(ProfileChange.objects, "bulk_create", side_effect=outage):
+            with self.assertRaises(RuntimeError):
+                writer.flush()
+
+        self.assertEqual(writer.pending(), 3)
+        self.assertEqual(writer.stats["dropped"], 2)
+        with self.assertLogs("users.audit", "WARNING") as logs:
+            writer._report_overflow()
+        self.assertIn("2 dropped", logs.output[0])
+
+    def test_overflow_spills_to_ndjson_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "audit.ndjson")
+            writer = ProfileAuditWriter(flush_interval=0, max_pending=1, ndjson_path=path)
+            writer.record(self.user.pk, {"bio": ["a", "b"]})
+            writer.record(self.user.pk, {"bio": ["b", "c"]})
+
+            with open(path, encoding="utf-8") as sink:
+                lines = [json.loads(line) for line in sink]
+
+        self.assertEqual(writer.pending(), 1)
+        self.assertEqual((writer.stats["spilled"], writer.stats["dropped"]), (1, 0))
+        self.assertEqual((lines[0]["changes"], lines[0]["spilled"]), ({"bio": ["b", "c"]}, True))
+
+    def test_ndjson_sink_mirrors_flushed_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "audit.ndjson")
+            writer = ProfileAuditWriter(flush_interval=0, ndjson_path=path)
+            writer.record(self.user.pk, {"first_name": ["Ada", "Grace"]}, changed_by_id=self.user.pk)
+            writer.flush()
+
+            with open(path, encoding="utf-8") as sink:
+                lines = [json.loads(line) for line in sink]
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["changes"], {"first_name": ["Ada", "Grace"]})
+        self.assertEqual(lines[0]["user_id"], self.user.pk)
+
+    def test_close_flushes_remaining_rows(self):
+        writer = ProfileAuditWriter(flush_interval=0)
+        writer.record(self.user.pk, {"bio": ["a", "b"]})
+        writer.close()
+
+        self.assertEqual(ProfileChange.objects.count(), 1)
+
+
+class ProfilePatchAuditTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="patcher", email="patcher@example.com", first_name="Ada", bio="Old bio"
+        )
+        cls.url = reverse("user_profile")
+
+    def setUp(self):
+        self.writer = ProfileAuditWriter(flush_interval=0)
+        patcher = mock.patch("users.views.profile_audit", self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def test_patch_records_only_changed_fields_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                self.url, {"first_name": "Grace", "bio": "Old bio"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.writer.pending(), 1)
+        self.writer.flush()
+        change = ProfileChange.objects.get(user=self.user)
+        self.assertEqual(change.changes, {"first_name": ["Ada", "Grace"]})
+        self.assertEqual(change.changed_by_id, self.user.pk)
+
+    def test_noop_patch_records_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.url, {"bio": "Old bio"}, format="json")
+
+        self.assertEqual(self.writer.pending(), 0)
+
+    def test_invalid_patch_records_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, {"avatar_url": "ftp://x"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.writer.pending(), 0)
@@ -0,0 +1,131 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users.audit import ProfileAuditWriter
+from users.bio import BIO_RENDERER_VERSION, render_bio
+from users.management.commands.rerender_bios import Command as RerenderBios
+from users.serializers import UserProfileSerializer
+
+
+User = get_user_model()
+
+
+class RenderBioTests(SimpleTestCase):
+    def test_blocks_and_inline_rules(self):
+        text = "Hi **there**, I'm *Ada*\nsecond line\n\n- SMSF\n- `super` _funds_"
+        self.assertEqual(
+            render_bio(text),
+            "<p>Hi <strong>there</strong>, I&#x27;m <em>Ada</em><br>second line</p>"
+            "<ul><li>SMSF</li><li><code>super</code> <em>funds</em></li></ul>",
+        )
+
+    def test_markup_is_escaped(self):
+        html = render_bio('<script>alert(1)</script> <img src=x onerror="alert(1)">')
+        self.assertNotIn("<script", html)
+        self.assertNotIn("<img", html)
+        self.assertIn("&lt;script&gt;", html)
+
+    def test_only_safe_links_are_rendered(self):
+        self.assertEqual(
+            render_bio("[site](https://example.com/?a=1&b=2)"),
+            '<p><a href="https://example.com/?a=1&amp;b=2" rel="nofollow noopener noreferrer">site</a></p>',
+        )
+        for target in ("javascript:alert(1)", "JaVaScRiPt:alert(1)", "data:text/html,x", "&#x6a;avascript:x"):
+            with self.subTest(target=target):
+                self.assertNotIn("<a", render_bio(f"[x]({target})"))
+        html = render_bio('[x](https://a.com/"onmouseover="alert)')
+        self.assertIn('href="https://a.com/&quot;onmouseover=&quot;alert"', html)
+
+    def test_link_targets_are_not_emphasized(self):
+        rel = 'rel="nofollow noopener noreferrer"'
+        self.assertEqual(
+            render_bio("[a](http://x.com/*y*/z) [d](https://ex.com/a**b**c) [u](https://ex.com/_x_/)"),
+            f'<p><a href="http://x.com/*y*/z" {rel}>a</a> <a href="https://ex.com/a**b**c" {rel}>d</a> '
+            f'<a href="https://ex.com/_x_/" {rel}>u</a></p>',
+        )
+        self.assertEqual(
+            render_bio("**see** [my *firm*](https://ex.com/*) *now*"),
+            f'<p><strong>see</strong> <a href="https://ex.com/*" {rel}>my <em>firm</em></a> <em>now</em></p>',
+        )
+
+    def test_code_spans_are_literal_and_underscores_in_words_are_kept(self):
+        self.assertEqual(render_bio("`**a**` snake_case_name"), "<p><code>**a**</code> snake_case_name</p>")
+        self.assertEqual(render_bio(""), "")
+
+
+class BioHtmlTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="bio", email="bio@example.com", bio="**Old**")
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("users.views.profile_audit", ProfileAuditWriter(flush_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def test_rendered_on_save(self):
+        self.assertEqual((self.user.bio_html, self.user.bio_renderer_version), ("<p><strong>Old</strong></p>", BIO_RENDERER_VERSION))
+        self.user.bio = "*New*"
+        self.user.save(update_fields=["bio"])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio_html, "<p><em>New</em></p>")
+
+    def test_patch_returns_rendered_bio_and_ignores_client_html(self):
+        response = self.client.patch(
+            reverse("user_profile"), {"bio": "Hello <b>world</b>", "bio_html": "<script>x</script>"}, format="json"
+        )
+        self.assertEqual(response.json()["bio_html"], "<p>Hello &lt;b&gt;world&lt;/b&gt;</p>")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio_html, "<p>Hello &lt;b&gt;world&lt;/b&gt;</p>")
+
+    def test_stale_rows_are_rendered_on_read_without_writing(self):
+        User.objects.filter(pk=self.user.pk).update(bio_html="<p>old rules</p>", bio_renderer_version=0)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(UserProfileSerializer(user).data["bio_html"], "<p><strong>Old</strong></p>")
+        self.assertEqual(user.bio_renderer_version, 0)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.bio_html, self.user.bio_renderer_version), ("<p>old rules</p>", 0))
+
+    def test_no_render_on_read_when_current(self):
+        with mock.patch("users.models.render_bio") as render:
+            UserProfileSerializer(User.objects.get(pk=self.user.pk)).data
+        render.assert_not_called()
+
+
+class RerenderBiosCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f"rr{i}", email=f"rr{i}@example.com", bio=f"**{i}**") for i in range(5)
+        ]
+
+    def test_backfills_stale_rows_on_a_process_pool(self):
+        User.objects.update(bio_html="", bio_renderer_version=0)
+        out = StringIO()
+        call_command("rerender_bios", "--chunk-size", "2", "--workers", "2", stdout=out)
+
+        self.assertIn("Re-rendered 5 bios", out.getvalue())
+        self.assertEqual(
+            list(User.objects.order_by("pk").values_list("bio_html", "bio_renderer_version")),
+            [(f"<p><strong>{i}</strong></p>", BIO_RENDERER_VERSION) for i in range(5)],
+        )
+
+    def test_rows_edited_during_the_run_are_skipped(self):
+        User.objects.update(bio_html="", bio_renderer_version=0)
+        user = self.users[0]
+        written = RerenderBios().write_chunk({user.pk: "**0**"}, [(user.pk, "<p>stale render</p>")])
+        self.assertEqual(written, 1)
+
+        User.objects.filter(pk=user.pk).update(bio="edited")
+        written = RerenderBios().write_chunk({user.pk: "**0**"}, [(user.pk, "<p>stale render</p>")])
+        self.assertEqual(written, 0)
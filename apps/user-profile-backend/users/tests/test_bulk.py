@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.bulk import reassign_advisors
+from users.cache import build_entry, profile_cache_key
+from users.models import BackgroundTask, Firm, FirmRoleStat, ProfileChange
+
+
+User = get_user_model()
+
+
+class BulkReassignTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.old = Firm.objects.create(name="Old Partners")
+        cls.new = Firm.objects.create(name="New Partners")
+        cls.movers = [
+            User.objects.create_user(username=f"m{n}", email=f"m{n}@example.com", firm=cls.old)
+            for n in range(5)
+        ]
+        cls.bystander = User.objects.create_user(username="stay", email="stay@example.com", firm=cls.new)
+
+    def setUp(self):
+        cache.clear()
+        for user in [*self.movers, self.bystander]:
+            cache.set(profile_cache_key(user.pk), build_entry({"id": user.pk}))
+
+    def test_chunked_reassign_updates_stats_audit_and_exact_cache_keys(self):
+        progress = []
+        with self.captureOnCommitCallbacks(execute=True):
+            changed = reassign_advisors(
+                User.objects.filter(firm=self.old), firm=self.new, role="Advisor II", chunk_size=2,
+                progress=lambda done, total, elapsed: progress.append((done, total)),
+            )
+
+        self.assertEqual(changed, 5)
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(User.objects.filter(firm=self.new, role="Advisor II").count(), 5)
+        self.assertEqual(set(User.objects.filter(firm=self.new).values_list("firm_name", flat=True)), {"New Partners"})
+        self.assertEqual(FirmRoleStat.objects.get(firm=self.new, role="Advisor II").count, 5)
+        self.assertFalse(FirmRoleStat.objects.filter(firm=self.old, count__gt=0).exists())
+        self.assertEqual(ProfileChange.objects.filter(source="bulk").count(), 5)
+        self.assertTrue(all(cache.get(profile_cache_key(user.pk)) is None for user in self.movers))
+        self.assertIsNotNone(cache.get(profile_cache_key(self.bystander.pk)))
+
+    def test_unchanged_rows_are_skipped(self):
+        self.assertEqual(reassign_advisors(User.objects.filter(pk=self.bystander.pk), firm=self.new), 0)
+        self.assertIsNotNone(cache.get(profile_cache_key(self.bystander.pk)))
+
+    def test_command_merges_firms(self):
+        out = StringIO()
+        call_command("reassign_advisors", "--from-firm", "Old Partners", "--to-firm", str(self.new.pk), stdout=out)
+
+        self.assertFalse(User.objects.filter(firm=self.old).exists())
+        self.assertIn("Reassigned 5 advisors", out.getvalue())
+
+
+class BulkReassignAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="root", email="root@example.com", password="pw")
+        cls.firm = Firm.objects.create(name="Acme")
+        cls.users = [User.objects.create_user(username=f"u{n}", email=f"u{n}@example.com") for n in range(3)]
+        cls.url = reverse("admin:users_user_changelist")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post_action(self, action, **fields):
+        return self.client.post(self.url, {
+            "action": action,
+            "_selected_action": [user.pk for user in self.users],
+            **fields,
+        })
+
+    def test_move_to_firm_action(self):
+        response = self.post_action("move_to_firm", firm=self.firm.pk)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(User.objects.filter(firm=self.firm).count(), 3)
+        self.assertEqual(ProfileChange.objects.filter(source="admin-bulk", changed_by=self.admin).count(), 3)
+
+    def test_set_role_requires_a_role(self):
+        self.post_action("set_role", role="  ")
+        self.assertFalse(User.objects.filter(role="").exists())
+        self.assertEqual(User.objects.filter(pk__in=[u.pk for u in self.users], role="Financial Advisor").count(), 3)
+
+    @override_settings(ADMIN_BULK_SYNC_LIMIT=2)
+    def test_large_selection_is_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_action("set_role", role="Principal")
+
+        task = BackgroundTask.objects.get(name="users.reassign_advisors")
+        self.assertEqual(task.payload["role"], "Principal")
+        self.assertEqual(len(task.payload["user_ids"]), 3)
+        self.assertFalse(User.objects.filter(role="Principal").exists())
@@ -0,0 +1,71 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from users.cache import build_entry, get_or_build, should_refresh_early
+
+
+class StampedeProtectionTests(SimpleTestCase):
+    key = "stampede:test"
+
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+        self.builds_lock = threading.Lock()
+
+    def builder(self, delay=0.05):
+        def build():
+            with self.builds_lock:
+                self.builds += 1
+            time.sleep(delay)  # stands in for the DB fetch + serialization
+            return build_entry({"value": self.builds})
+
+        return build
+
+    def test_concurrent_misses_build_once(self):
+        workers = 16
+        barrier = threading.Barrier(workers)
+        etags = []
+
+        def request():
+            barrier.wait()
+            etags.append(get_or_build(self.key, self.builder(), 60)["etag"])
+
+        threads = [threading.Thread(target=request) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(len(etags), workers)
+        self.assertEqual(len(set(etags)), 1)
+
+    def test_waits_for_builder_in_another_process(self):
+        # Another process holds the rebuild lock and fills the key shortly after.
+        cache.add(f"{self.key}:lock", "other-process", 10)
+        threading.Timer(0.1, lambda: cache.set(self.key, build_entry({"value": "theirs"}))).start()
+
+        entry = get_or_build(self.key, self.builder(), 60)
+
+        self.assertEqual(self.builds, 0)
+        self.assertEqual(entry["data"], {"value": "theirs"})
+
+    def test_hot_entry_refreshes_early_near_expiry(self):
+        entry = build_entry({"value": "old"})
+        entry["delta"] = 1.0
+        self.assertFalse(should_refresh_early(entry, timeout=3600))
+
+        entry["built_at"] -= 3599.5
+        with mock.patch("users.cache.random.random", return_value=0.5):
+            self.assertTrue(should_refresh_early(entry, timeout=3600))
+
+            cache.set(self.key, entry, 60)
+            refreshed = get_or_build(self.key, self.builder(delay=0), 3600)
+
+        self.assertEqual(self.builds, 1)
+        self.assertNotEqual(refreshed["etag"], entry["etag"])
+        self.assertEqual(cache.get(self.key)["etag"], refreshed["etag"])
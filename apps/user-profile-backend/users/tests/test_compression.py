@@ -0,0 +1,129 @@
+import gzip
+import json
+from unittest import mock, skipIf
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from integra_core.middleware import CompressionMiddleware, brotli, parse_accept_encoding
+
+
+User = get_user_model()
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200)
+class ProfileCompressionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="gzipuser",
+            email="gzipuser@example.com",
+            password="password123",
+            advisor_id="ADV6000",
+            bio="Helping SMSF trustees. " * 20,
+        )
+        cls.url = reverse("user_profile")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    def get_gzip(self):
+        return self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+
+    def test_large_profile_is_gzipped(self):
+        response = self.get_gzip()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        payload = json.loads(gzip.decompress(response.content))
+        self.assertEqual(payload["username"], self.user.username)
+
+    def test_cached_profile_reuses_compressed_variant(self):
+        first = self.get_gzip()
+        with mock.patch("integra_core.middleware.compress_bytes") as compress:
+            second = self.get_gzip()
+
+        compress.assert_not_called()
+        self.assertEqual(second.content, first.content)
+
+    def test_update_drops_compressed_variant(self):
+        self.get_gzip()
+        self.client.patch(self.url, {"first_name": "Grace"}, format="json")
+
+        payload = json.loads(gzip.decompress(self.get_gzip().content))
+        self.assertEqual(payload["first_name"], "Grace")
+
+    def test_no_compression_without_accept_encoding(self):
+        response = self.client.get(self.url)
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.data["username"], self.user.username)
+
+    @override_settings(COMPRESSION_MIN_SIZE=100_000)
+    def test_small_responses_are_not_compressed(self):
+        self.assertFalse(self.get_gzip().has_header("Content-Encoding"))
+
+    @skipIf(brotli is None, "brotli not installed")
+    def test_brotli_preferred_when_accepted(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(json.loads(brotli.decompress(response.content))["username"], self.user.username)
+
+    def test_html_is_not_compressed(self):
+        # BREACH: admin pages reflect request input next to advisor data.
+        request = RequestFactory().get("/admin/users/user/?q=x", HTTP_ACCEPT_ENCODING="gzip")
+        html = HttpResponse(b"<p>adv@example.com</p>" * 50, content_type="text/html; charset=utf-8")
+        response = CompressionMiddleware(lambda req: html)(request)
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_schema_is_cached_and_compressed(self):
+        self.client.force_authenticate(user=None)
+        schema_url = reverse("schema")
+        first = self.client.get(schema_url, HTTP_ACCEPT_ENCODING="gzip")
+        with mock.patch("drf_spectacular.views.SpectacularAPIView._get_schema_response") as generate:
+            second = self.client.get(schema_url, HTTP_ACCEPT_ENCODING="gzip")
+
+        generate.assert_not_called()
+        self.assertEqual(second["Content-Encoding"], "gzip")
+        self.assertEqual(second.content, first.content)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=10, COMPRESSION_CONTENT_TYPES=("application/json",))
+class CompressionMiddlewareUnitTests(SimpleTestCase):
+    def run_middleware(self, response, accept="gzip"):
+        request = RequestFactory().get("/api/export/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda req: response)(request)
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        chunks = [json.dumps({"row": i}).encode() + b"\n" for i in range(100)]
+        response = self.run_middleware(
+            StreamingHttpResponse(iter(chunks), content_type="application/json")
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(chunks))
+
+    def test_content_type_outside_allowlist_is_untouched(self):
+        response = self.run_middleware(HttpResponse(b"x" * 500, content_type="image/png"))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_refused_coding_is_not_used(self):
+        response = self.run_middleware(
+            HttpResponse(b"{}" * 500, content_type="application/json"), accept="gzip;q=0, identity"
+        )
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding("gzip, deflate, br;q=0.5, zstd;q=0"), {"gzip", "deflate", "br"})
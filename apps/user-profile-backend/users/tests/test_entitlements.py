@@ -0,0 +1,114 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from users import entitlements
+from users.entitlements import FundAccessIndex
+from users.models import AdvisorFundAccess
+
+
+class EntitlementWriteTests(TestCase):
+    def test_bulk_load_upserts_and_stamps_one_version(self):
+        first = entitlements.bulk_load([("ADV1", "F1"), ("ADV1", "F2"), ("ADV2", "F1")])
+        second = entitlements.bulk_load([("ADV1", "F1")])
+
+        self.assertEqual(AdvisorFundAccess.objects.count(), 3)
+        self.assertEqual(AdvisorFundAccess.objects.get(advisor_id="ADV1", fund_code="F1").version, second)
+        self.assertEqual(AdvisorFundAccess.objects.get(advisor_id="ADV1", fund_code="F2").version, first)
+        self.assertGreater(second, first)
+
+    def test_replace_revokes_grants_missing_from_the_feed(self):
+        entitlements.bulk_load([("ADV1", "F1"), ("ADV1", "F2"), ("ADV2", "F9")])
+        entitlements.bulk_load([("ADV1", "F1")], replace=True)
+
+        active = set(AdvisorFundAccess.objects.filter(is_active=True).values_list("advisor_id", "fund_code"))
+        self.assertEqual(active, {("ADV1", "F1"), ("ADV2", "F9")})
+
+    def test_model_save_takes_a_new_version(self):
+        grant = AdvisorFundAccess.objects.create(advisor_id="ADV1", fund_code="F1")
+        first = grant.version
+        grant.is_active = False
+        grant.save()
+
+        self.assertEqual(grant.version, first + 1)
+        self.assertEqual(entitlements.current_version(), grant.version)
+
+    def test_load_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as feed:
+            feed.write("advisor_id,fund_code\nADV1,F1\nADV1,F2\nADV2,F1\n")
+        self.addCleanup(os.remove, feed.name)
+
+        out = StringIO()
+        call_command("load_fund_access", feed.name, stdout=out)
+
+        self.assertEqual(AdvisorFundAccess.objects.filter(is_active=True).count(), 3)
+        self.assertIn("3 grants for 2 advisors", out.getvalue())
+
+
+class FundAccessIndexRefreshTests(TestCase):
+    def test_incremental_refresh_reads_only_new_changes(self):
+        entitlements.bulk_load([("ADV1", "F1"), ("ADV1", "F2"), ("ADV2", "F1")])
+        index = FundAccessIndex()
+        index.refresh()
+        self.assertTrue(index.can_access("ADV1", "F2"))
+
+        entitlements.revoke("ADV1", ["F2"])
+        entitlements.grant("ADV3", ["F7"])
+        with self.assertNumQueries(2):  # counter + changed rows
+            index.refresh()
+
+        self.assertFalse(index.can_access("ADV1", "F2"))
+        self.assertTrue(index.can_access("ADV1", "F1"))
+        self.assertTrue(index.can_access("ADV3", "F7"))
+        self.assertEqual(index.version, entitlements.current_version())
+
+        with self.assertNumQueries(1):  # unchanged: counter only
+            index.refresh()
+
+    def test_revoking_everything_drops_the_advisor(self):
+        entitlements.grant("ADV1", ["F1"])
+        index = FundAccessIndex()
+        index.refresh()
+
+        entitlements.revoke("ADV1")
+        index.refresh()
+
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.funds_for("ADV1"), ())
+
+
+class FundAccessIndexLookupTests(SimpleTestCase):
+    def setUp(self):
+        self.index = FundAccessIndex(dense_threshold=3)
+        self.index.load([
+            ("SPARSE", "F1", True),
+            ("DENSE", "F1", True),
+            ("DENSE", "F2", True),
+            ("DENSE", "F3", True),
+        ])
+
+    def test_sparse_advisors_use_sets_and_dense_ones_bitmaps(self):
+        advisors = self.index._state.advisors
+        self.assertIsInstance(advisors["SPARSE"], frozenset)
+        self.assertIsInstance(advisors["DENSE"], int)
+
+    def test_can_access(self):
+        self.assertTrue(self.index.can_access("SPARSE", "F1"))
+        self.assertFalse(self.index.can_access("SPARSE", "F2"))
+        self.assertTrue(self.index.can_access("DENSE", "F3"))
+        self.assertFalse(self.index.can_access("DENSE", "F4"))
+        self.assertFalse(self.index.can_access("UNKNOWN", "F1"))
+
+    def test_check_many(self):
+        self.assertEqual(self.index.check_many("DENSE", ["F1", "F4"]), {"F1": True, "F4": False})
+        self.assertEqual(self.index.check_many("SPARSE", ["F1", "F3"]), {"F1": True, "F3": False})
+        self.assertEqual(self.index.check_many("UNKNOWN", ["F1"]), {"F1": False})
+
+    def test_shrinking_below_threshold_switches_back_to_a_set(self):
+        self.index.apply([("DENSE", "F3", False)])
+
+        self.assertIsInstance(self.index._state.advisors["DENSE"], frozenset)
+        self.assertEqual(self.index.funds_for("DENSE"), ("F1", "F2"))
@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import Firm, FirmRoleStat
+
+
+User = get_user_model()
+
+
+def stats():
+    return {
+        (row.firm.name, row.role, row.is_active): row.count
+        for row in FirmRoleStat.objects.filter(count__gt=0).select_related("firm")
+    }
+
+
+class FirmStatMaintenanceTests(TestCase):
+    def setUp(self):
+        self.acme = Firm.objects.create(name="Acme")
+        self.zeta = Firm.objects.create(name="Zeta")
+
+    def create(self, username, firm, role="Advisor", **extra):
+        return User.objects.create_user(
+            username=username, email=f"{username}@example.com", firm=firm, role=role, **extra
+        )
+
+    def test_save_and_delete_apply_deltas(self):
+        first = self.create("a1", self.acme)
+        self.create("a2", self.acme)
+        self.assertEqual(stats(), {("Acme", "Advisor", True): 2})
+
+        first.role = "Principal"
+        first.save()
+        self.assertEqual(stats(), {("Acme", "Advisor", True): 1, ("Acme", "Principal", True): 1})
+
+        first = User.objects.get(pk=first.pk)
+        first.firm = self.zeta
+        first.is_active = False
+        first.save()
+        first.delete()
+        self.assertEqual(stats(), {("Acme", "Advisor", True): 1})
+
+    def test_unrelated_saves_do_not_touch_the_summary(self):
+        user = self.create("a1", self.acme)
+        with self.assertNumQueries(1):
+            user.save(update_fields=["last_login"])
+
+    def test_deferred_instance_looks_up_its_previous_key(self):
+        user = self.create("a1", self.acme)
+        deferred = User.objects.only("pk", "username").get(pk=user.pk)
+        deferred.role = "Principal"
+        deferred.save()
+
+        self.assertEqual(stats(), {("Acme", "Principal", True): 1})
+
+    def test_queryset_update_with_constants(self):
+        for n in range(3):
+            self.create(f"a{n}", self.acme)
+        self.create("z1", self.zeta)
+
+        User.objects.filter(username__in=["a0", "a1"]).update(is_active=False)
+        User.objects.filter(firm=self.zeta).update(firm=self.acme, role="Principal")
+
+        self.assertEqual(stats(), {
+            ("Acme", "Advisor", True): 1,
+            ("Acme", "Advisor", False): 2,
+            ("Acme", "Principal", True): 1,
+        })
+
+    def test_queryset_update_with_expressions_recounts(self):
+        self.create("a1", self.acme, role="Advisor")
+
+        User.objects.filter(firm=self.acme).update(role=Concat(F("role"), Value(" II")))
+
+        self.assertEqual(stats(), {("Acme", "Advisor II", True): 1})
+
+    def test_bulk_create_counts_new_rows(self):
+        User.objects.bulk_create([
+            User(username=f"b{n}", email=f"b{n}@example.com", firm=self.zeta, role="Advisor") for n in range(4)
+        ])
+
+        self.assertEqual(stats(), {("Zeta", "Advisor", True): 4})
+
+    def test_rebuild_command_corrects_drift(self):
+        self.create("a1", self.acme)
+        FirmRoleStat.objects.update(count=99)
+
+        out = StringIO()
+        call_command("rebuild_firm_stats", stdout=out)
+
+        self.assertEqual(stats(), {("Acme", "Advisor", True): 1})
+        self.assertIn("1 corrected", out.getvalue())
+
+
+class FirmStatsEndpointTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Firm.objects.create(name="Acme")
+        cls.staff = User.objects.create_user(username="staff", email="staff@example.com", is_staff=True)
+        for n in range(2):
+            User.objects.create_user(username=f"a{n}", email=f"a{n}@example.com", firm=cls.acme, role="Advisor")
+        cls.url = reverse("firm_stats")
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(user=User.objects.get(username="a0"))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reads_only_from_the_summary(self):
+        self.client.force_authenticate(user=self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"firm": self.acme.pk})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {"firm": self.acme.pk, "firm_name": "Acme", "role": "Advisor", "is_active": True, "count": 2},
+        ])
+        self.assertFalse([q for q in queries if User._meta.db_table in q["sql"]])
+
+    def test_rejects_invalid_firm_filter(self):
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(self.client.get(self.url, {"firm": "acme"}).status_code, status.HTTP_400_BAD_REQUEST)
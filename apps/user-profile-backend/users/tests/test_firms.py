@@ -0,0 +1,72 @@
+import importlib
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users import tasks
+from users.cache import profile_cache_key
+from users.models import Firm
+
+
+User = get_user_model()
+
+backfill = importlib.import_module("users.migrations.0008_backfill_user_firm")
+
+
+class FirmNormalizationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def create_user(self, username, **extra):
+        return User.objects.create_user(username=username, email=f"{username}@example.com", **extra)
+
+    def test_legacy_firm_name_links_a_shared_firm(self):
+        first = self.create_user("a1", firm_name="FinCorp")
+        second = self.create_user("a2", firm_name=" FinCorp ")
+
+        self.assertEqual(Firm.objects.count(), 1)
+        self.assertEqual(first.firm_id, second.firm_id)
+        self.assertEqual(second.firm_name, "FinCorp")
+
+    def test_firm_is_authoritative_for_the_legacy_column(self):
+        user = self.create_user("a1", firm_name="FinCorp")
+        user.firm = Firm.objects.create(name="NewCo")
+        user.save()
+
+        user.refresh_from_db()
+        self.assertEqual(user.firm_name, "NewCo")
+
+    def test_profile_reads_firm_name_from_firm_and_rename_evicts_cache(self):
+        user = self.create_user("a1", firm_name="FinCorp")
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(reverse("user_profile")).data["firm_name"], "FinCorp")
+
+        firm = user.firm
+        firm.name = "FinCorp Holdings"
+        with self.captureOnCommitCallbacks(execute=True):
+            firm.save()
+        self.assertIsNone(cache.get(profile_cache_key(user.pk)))
+
+        tasks.run_task(tasks.claim(1)[0])
+        user.refresh_from_db()
+        self.assertEqual(user.firm_name, "FinCorp Holdings")
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(reverse("user_profile")).data["firm_name"], "FinCorp Holdings")
+
+    def test_backfill_migration_links_existing_rows(self):
+        users = [self.create_user(f"b{i}", firm_name=name) for i, name in enumerate(["Acme", "Acme", "Zeta", ""])]
+        User.objects.update(firm=None)
+        Firm.objects.all().delete()
+
+        backfill.BATCH_SIZE = 2
+        self.addCleanup(setattr, backfill, "BATCH_SIZE", 2000)
+        backfill.backfill_firms(apps, SimpleNamespace(connection=connection))
+
+        firms = dict(User.objects.filter(pk__in=[u.pk for u in users]).values_list("username", "firm__name"))
+        self.assertEqual(firms, {"b0": "Acme", "b1": "Acme", "b2": "Zeta", "b3": None})
+        self.assertEqual(Firm.objects.count(), 2)
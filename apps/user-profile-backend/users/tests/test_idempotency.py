@@ -0,0 +1,99 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users import idempotency
+from users.audit import ProfileAuditWriter
+from users.models import OutboxEvent
+
+
+User = get_user_model()
+
+
+class IdempotencyKeyTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="idem", email="idem@example.com", password="password123", bio="Old")
+        cls.other = User.objects.create_user(username="idem2", email="idem2@example.com", password="password123")
+        cls.url = reverse("user_profile")
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("users.views.profile_audit", ProfileAuditWriter(flush_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def patch(self, payload, key="key-1"):
+        return self.client.patch(self.url, payload, format="json", headers={"Idempotency-Key": key})
+
+    def test_retry_is_replayed_without_touching_the_database(self):
+        first = self.patch({"bio": "New"})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            retry = self.patch({"bio": "New"})
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_version, 1)
+
+    def test_key_reused_for_a_different_body_is_rejected(self):
+        self.patch({"bio": "New"})
+        response = self.patch({"bio": "Other"})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, "New")
+
+    def test_keys_are_scoped_per_user(self):
+        self.patch({"bio": "Mine"})
+        self.client.force_authenticate(user=self.other)
+        response = self.patch({"bio": "Mine"})
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.bio, "Mine")
+
+    def test_client_errors_are_replayed_too(self):
+        first = self.patch({"avatar_url": "ftp://example.com/a.png"})
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        retry = self.patch({"avatar_url": "ftp://example.com/a.png"})
+        self.assertEqual((retry.status_code, retry["Idempotent-Replayed"]), (400, "true"))
+
+    def test_requests_without_a_key_are_untouched(self):
+        self.client.patch(self.url, {"bio": "A"}, format="json")
+        response = self.client.patch(self.url, {"bio": "B"}, format="json")
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(self.patch({"bio": "C"}, key="x" * 300).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_duplicate_waits_for_the_first_response(self):
+        key = idempotency.idempotency_cache_key(self.user.pk, self.url, "dup")
+        self.patch({"bio": "New"}, key="dup")
+        stored = cache.get(key)
+        # Replay the race: the first attempt holds the lock and stores its response a bit later.
+        cache.delete(key)
+        cache.add(f"{key}:lock", "other-worker", 10)
+        timer = threading.Timer(0.05, cache.set, args=(key, stored))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        with mock.patch("users.views.UserProfileView.idempotency_lock_poll_interval", 0.01):
+            response = self.patch({"bio": "New"}, key="dup")
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.assertEqual(response.json()["bio"], "New")
+
+    def test_duplicate_of_a_stuck_request_gets_409(self):
+        key = idempotency.idempotency_cache_key(self.user.pk, self.url, "stuck")
+        cache.add(f"{key}:lock", "other-worker", 10)
+        with mock.patch.object(idempotency, "IDEMPOTENCY_LOCK_TIMEOUT", 0.1), \
+                mock.patch("users.views.UserProfileView.idempotency_lock_poll_interval", 0.01):
+            response = self.patch({"bio": "New"}, key="stuck")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, "Old")
@@ -0,0 +1,83 @@
+import importlib
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.auth import aauthenticate, authenticate, get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+constraints = importlib.import_module("users.migrations.0014_user_identifier_constraints")
+
+
+class IdentifierLoginTests(APITestCase):
+    login_url = reverse("token_obtain_pair")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="jsmith", email="Jane.Smith@Example.com", advisor_id="ADV-100", password="password123"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_login_by_username_email_or_advisor_id(self):
+        for identifier in ("jsmith", "jane.smith@example.com", "JANE.SMITH@EXAMPLE.COM", "adv-100"):
+            with self.subTest(identifier=identifier):
+                response = self.client.post(self.login_url, {"identifier": identifier, "password": "password123"})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data["profile"]["id"], self.user.pk)
+
+    def test_username_field_still_accepted(self):
+        response = self.client.post(self.login_url, {"username": "ADV-100", "password": "password123"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_identifier(self):
+        response = self.client.post(self.login_url, {"password": "password123"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("identifier", response.data)
+
+    def test_lookup_is_one_query(self):
+        with self.assertNumQueries(1):
+            user = User.objects.get_by_identifier("JANE.smith@example.com")
+        self.assertEqual(user.firm_display_name, "")
+
+    def test_unknown_identifier_still_hashes_the_password(self):
+        with mock.patch.object(User, "set_password") as set_password:
+            self.assertIsNone(authenticate(username="nobody@example.com", password="password123"))
+        set_password.assert_called_once_with("password123")
+
+    def test_wrong_password_and_inactive_user(self):
+        self.assertIsNone(authenticate(username="jsmith", password="wrong"))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(authenticate(username="adv-100", password="password123"))
+
+    def test_username_match_wins_over_other_columns(self):
+        other = User.objects.create_user(username="adv-100", email="other@example.com", password="password123")
+        self.assertEqual(User.objects.get_by_identifier("adv-100"), other)
+        self.assertEqual(User.objects.get_by_identifier("ADV-100"), self.user)
+
+    def test_async_authenticate_resolves_identifiers(self):
+        user = async_to_sync(aauthenticate)(username="jane.smith@example.com", password="password123")
+        self.assertEqual(user, self.user)
+
+    def test_case_insensitive_uniqueness(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username="jane2", email="jane.smith@example.com")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username="jane3", email="jane3@example.com", advisor_id="adv-100")
+
+    def test_migration_precheck_reports_case_duplicates(self):
+        constraints.check_duplicates(apps, mock.Mock(connection=connection))
+
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX users_user_email_ci_key")
+        duplicate = User.objects.create_user(username="jane2", email="JANE.SMITH@example.com")
+        with self.assertRaisesMessage(RuntimeError, f"email 'jane.smith@example.com': users [{self.user.pk}, {duplicate.pk}]"):
+            constraints.check_duplicates(apps, mock.Mock(connection=connection))
@@ -0,0 +1,83 @@
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from integra_core.memory import MemoryTracker, memory_tracker
+
+
+User = get_user_model()
+
+
+def stop_tracing_if_started(test):
+    if not tracemalloc.is_tracing():
+        test.addCleanup(tracemalloc.stop)
+
+
+class MemoryTrackerTests(SimpleTestCase):
+    def setUp(self):
+        stop_tracing_if_started(self)
+        self.tracker = MemoryTracker(budgets={"big": 100_000, "small": 10_000_000})
+        self.tracker.start()
+
+    def test_records_peak_per_route_and_flags_budgets(self):
+        result, peak = self.tracker.measure(lambda: len(bytearray(500_000)))
+        self.assertEqual(result, 500_000)
+        self.assertGreaterEqual(peak, 500_000)
+        self.tracker.record("big", peak)
+        self.tracker.record("small", self.tracker.measure(lambda: None)[1])
+
+        report = self.tracker.report()
+        self.assertEqual(report["routes"]["big"]["requests"], 1)
+        self.assertEqual(list(report["over_budget"]), ["big"])
+
+    def test_concurrent_measurement_is_skipped(self):
+        with self.tracker._measuring:
+            self.assertEqual(self.tracker.measure(lambda: 1), (1, None))
+
+    def test_snapshots_report_growth(self):
+        self.tracker.take_snapshot()
+        kept = [bytes(1000) for _ in range(1000)]  # noqa: F841 (held across the snapshot)
+        snapshot = self.tracker.take_snapshot()
+        self.assertTrue(snapshot["top"])
+        self.assertTrue(any(__file__ in entry["location"] for entry in snapshot["growth"]))
+
+
+class MemoryDiagnosticsAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="ops", email="ops@example.com", is_staff=True)
+        cls.advisor = User.objects.create_user(username="adv", email="adv@example.com")
+
+    def setUp(self):
+        cache.clear()
+        stop_tracing_if_started(self)
+        memory_tracker.reset()
+        self.addCleanup(memory_tracker.reset)
+        overrides = self.settings(MEMORY_TRACKING=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=self.advisor)
+        response = self.client.get(reverse("memory_diagnostics"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_report_has_route_peaks_caches_and_structures(self):
+        self.client.force_authenticate(user=self.staff)
+        self.client.get(reverse("user_profile"))
+
+        response = self.client.get(reverse("memory_diagnostics"), {"snapshot": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.json()
+        self.assertTrue(report["tracing"])
+        self.assertEqual(report["routes"]["user_profile"]["requests"], 1)
+        self.assertGreater(report["routes"]["user_profile"]["peak_max_bytes"], 0)
+        self.assertTrue(report["snapshot"]["top"])
+        self.assertEqual(report["caches"]["default"]["by_prefix"]["user_profile"]["entries"], 1)
+        self.assertIn("fund_access", report["structures"])
+        self.assertGreater(report["rss_bytes"], 0)
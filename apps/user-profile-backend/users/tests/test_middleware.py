@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+User = get_user_model()
+
+
+@override_settings(CORS_ALLOWED_ORIGINS=["http://localhost:3000"])
+class RouteDispatchMiddlewareTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="mwuser",
+            email="mwuser@example.com",
+            password="password123",
+            advisor_id="ADV7000",
+        )
+        cls.url = reverse("user_profile")
+
+    def bearer(self):
+        token = AccessToken.for_user(self.user)
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}", "HTTP_ORIGIN": "http://localhost:3000"}
+
+    def test_bearer_api_request_skips_session_layers(self):
+        response = self.client.get(self.url, **self.bearer())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        request = response.wsgi_request
+        self.assertTrue(request.lean_middleware)
+        self.assertFalse(hasattr(request, "session"))
+        self.assertFalse(hasattr(request, "_messages"))
+
+    def test_request_without_bearer_runs_full_chain(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(response.wsgi_request.lean_middleware)
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+    def test_admin_keeps_full_chain_even_with_bearer(self):
+        response = self.client.get("/admin/login/", **self.bearer())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.wsgi_request.lean_middleware)
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+    def test_security_and_cors_headers_match_full_chain(self):
+        lean = self.client.get(self.url, **self.bearer())
+        full = self.client.get(self.url, HTTP_ORIGIN="http://localhost:3000")
+
+        for header in ("X-Frame-Options", "X-Content-Type-Options", "Referrer-Policy",
+                       "Cross-Origin-Opener-Policy", "Access-Control-Allow-Origin"):
+            with self.subTest(header=header):
+                self.assertEqual(lean.headers.get(header), full.headers.get(header))
+                self.assertIsNotNone(lean.headers.get(header))
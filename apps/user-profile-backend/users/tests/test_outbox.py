@@ -0,0 +1,243 @@
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users import outbox
+from users.audit import ProfileAuditWriter
+from users.bulk import reassign_advisors
+from users.models import Firm, OutboxEvent
+from users.outbox import FileSink, HttpSink, MemorySink, OutboxDispatcher
+
+
+User = get_user_model()
+
+
+class FailingSink:
+    def send(self, events):
+        raise ConnectionError("CRM unavailable")
+
+
+class OutboxWriteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="ob", email="ob@example.com", password="password123", bio="Old")
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("users.views.profile_audit", ProfileAuditWriter(flush_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def test_patch_writes_event_with_the_change(self):
+        response = self.client.patch(reverse("user_profile"), {"bio": "New"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.user_id, event.topic), (self.user.pk, "profile.updated"))
+        self.assertEqual(event.payload["changes"], {"bio": ["Old", "New"]})
+        self.assertEqual(event.payload["version"], 1)
+
+        self.client.patch(reverse("user_profile"), {"bio": "New"}, format="json")
+        self.assertEqual(OutboxEvent.objects.count(), 1)  # no-op update, no event
+
+    def test_bulk_reassignment_writes_events(self):
+        firm = Firm.objects.create(name="Merged")
+        reassign_advisors(User.objects.filter(pk=self.user.pk), firm=firm)
+        self.assertEqual(OutboxEvent.objects.get().payload["changes"], {"firm": [None, firm.pk]})
+
+
+class OutboxDispatcherTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", email="alice@example.com")
+        cls.bob = User.objects.create_user(username="bob", email="bob@example.com")
+
+    def setUp(self):
+        self.sink = MemorySink()
+        self.dispatcher = OutboxDispatcher([self.sink], batch_size=100, visibility_timeout=60)
+
+    def emit(self, user, n):
+        return outbox.emit(user.pk, "profile.updated", {"n": n})
+
+    def delivered(self):
+        return [(event["user_id"], event["payload"]["n"]) for event in self.sink.events]
+
+    def test_delivers_in_batches_and_deletes(self):
+        for n in range(5):
+            self.emit(self.alice if n % 2 else self.bob, n)
+        self.dispatcher.batch_size = 2
+
+        self.assertEqual(self.dispatcher.drain(), 5)
+        self.assertEqual([n for _user, n in self.delivered()], [0, 1, 2, 3, 4])
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(self.dispatcher.stats["batches"], 3)
+
+    def test_failed_batch_is_kept_and_retried_later(self):
+        self.emit(self.alice, 1)
+        self.dispatcher.sinks = [FailingSink()]
+
+        self.assertEqual(self.dispatcher.dispatch_batch(), 1)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIsNone(event.claimed_by)
+        self.assertIn("CRM unavailable", event.last_error)
+        self.assertEqual(self.dispatcher.stats["failed_batches"], 1)
+
+        self.dispatcher.sinks = [self.sink]
+        OutboxEvent.objects.update(available_at=timezone.now())  # backoff elapsed
+        self.assertEqual(self.dispatcher.drain(), 1)
+        self.assertEqual(self.sink.events[0]["attempt"], 1)
+
+    def test_rejected_event_is_isolated_then_dead_lettered(self):
+        class RejectingSink(MemorySink):
+            def send(self, events):
+                if any(event["payload"]["n"] == 2 for event in events):
+                    raise ValueError("400 Bad Request")
+                super().send(events)
+
+        self.dispatcher.sinks = [RejectingSink()]
+        self.sink = self.dispatcher.sinks[0]
+        self.dispatcher.max_attempts = 3
+        for n, user in enumerate([self.alice, self.bob, self.alice, self.bob], start=1):
+            self.emit(user, n)
+
+        for _ in range(4):
+            self.dispatcher.drain()
+            OutboxEvent.objects.update(available_at=timezone.now())  # backoff elapsed
+        # The first failure fails the batch; retries go one event at a time.
+        self.assertEqual(self.delivered(), [(self.alice.pk, 1), (self.alice.pk, 3), (self.bob.pk, 4)])
+        dead = OutboxEvent.objects.get()
+        self.assertEqual((dead.payload["n"], dead.attempts), (2, 3))
+        self.assertIsNotNone(dead.dead_at)
+        self.assertEqual(self.dispatcher.stats["dead"], 1)
+        self.assertEqual(outbox.backlog()[0], 0)
+
+        # Later events of the user aren't held back by the dead letter.
+        self.emit(self.bob, 5)
+        self.dispatcher.drain()
+        self.assertEqual(self.delivered()[-1], (self.bob.pk, 5))
+
+        # Requeued from the admin once the sink accepts it.
+        event_admin = admin.site._registry[OutboxEvent]
+        with mock.patch.object(event_admin, "message_user"):
+            event_admin.retry_now(None, outbox.dead_letters())
+        self.sink = MemorySink()
+        self.dispatcher.sinks = [self.sink]
+        self.assertEqual(self.dispatcher.drain(), 1)
+        self.assertEqual(self.delivered(), [(self.bob.pk, 2)])
+
+    def test_drain_continues_past_a_fully_deferred_batch(self):
+        head, tail = self.emit(self.alice, 1), self.emit(self.alice, 2)
+        self.emit(self.bob, 3)
+        OutboxEvent.objects.filter(pk=head.pk).update(claimed_by="other", locked_at=timezone.now())
+        claim, raced = self.dispatcher.claim, []
+
+        def claim_racing_the_other_dispatcher():
+            # The first lease only gets alice's tail, which has to be released.
+            if raced:
+                return claim()
+            raced.append(True)
+            OutboxEvent.objects.filter(pk=tail.pk).update(claimed_by="mine", locked_at=timezone.now())
+            return "mine"
+
+        with mock.patch.object(self.dispatcher, "claim", side_effect=claim_racing_the_other_dispatcher):
+            self.assertEqual(self.dispatcher.drain(), 1)
+        self.assertEqual(self.delivered(), [(self.bob.pk, 3)])
+
+    def test_backing_off_event_holds_back_that_user_only(self):
+        head = self.emit(self.alice, 1)
+        OutboxEvent.objects.filter(pk=head.pk).update(available_at=timezone.now() + timedelta(minutes=5))
+        self.emit(self.alice, 2)
+        self.emit(self.bob, 3)
+
+        self.dispatcher.drain()
+        self.assertEqual(self.delivered(), [(self.bob.pk, 3)])
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    def test_event_leased_by_another_dispatcher_holds_back_later_ones(self):
+        head = self.emit(self.alice, 1)
+        self.emit(self.alice, 2)
+        OutboxEvent.objects.filter(pk=head.pk).update(claimed_by="other", locked_at=timezone.now())
+
+        self.dispatcher.drain()
+        self.assertEqual(self.delivered(), [])
+
+        # The other dispatcher died: its lease expires and order is kept.
+        OutboxEvent.objects.filter(pk=head.pk).update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.dispatcher.drain()
+        self.assertEqual(self.delivered(), [(self.alice.pk, 1), (self.alice.pk, 2)])
+
+    def test_claim_race_releases_events_behind_foreign_ones(self):
+        head, tail = self.emit(self.alice, 1), self.emit(self.alice, 2)
+        OutboxEvent.objects.filter(pk=head.pk).update(claimed_by="other", locked_at=timezone.now())
+        OutboxEvent.objects.filter(pk=tail.pk).update(claimed_by="mine", locked_at=timezone.now())
+
+        self.assertEqual(self.dispatcher.release_blocked("mine"), 1)
+        self.assertIsNone(OutboxEvent.objects.get(pk=tail.pk).claimed_by)
+
+    def test_command_drains_and_reports(self):
+        self.emit(self.alice, 1)
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "outbox.ndjson"
+            sinks = [{"BACKEND": "users.outbox.FileSink", "OPTIONS": {"path": str(path)}}]
+            with override_settings(OUTBOX_SINKS=sinks):
+                call_command("dispatch_outbox", "--once", stdout=out)
+            lines = path.read_text().splitlines()
+        self.assertEqual(json.loads(lines[0])["payload"], {"n": 1})
+        self.assertIn("delivered 1", out.getvalue())
+        self.assertIn("backlog 0", out.getvalue())
+
+
+class _Receiver(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.received.append((self.headers.get("Authorization"), body))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class SinkTests(SimpleTestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), _Receiver)
+        self.server.received, self.server.status = [], 204
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hooks"
+
+    def test_http_sink_posts_the_batch(self):
+        HttpSink(self.url, headers={"Authorization": "Token t"}).send([{"id": 1}, {"id": 2}])
+        self.assertEqual(self.server.received, [("Token t", {"events": [{"id": 1}, {"id": 2}]})])
+
+    def test_http_sink_raises_on_error_status(self):
+        self.server.status = 503
+        with self.assertRaises(OSError):
+            HttpSink(self.url).send([{"id": 1}])
+
+    def test_file_sink_appends_ndjson(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = FileSink(Path(tmp) / "events.ndjson")
+            sink.send([{"id": 1}])
+            sink.send([{"id": 2}])
+            self.assertEqual(sink.path.read_text(), '{"id": 1}\n{"id": 2}\n')
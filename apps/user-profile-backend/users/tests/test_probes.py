@@ -0,0 +1,105 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.db import OperationalError
+from django.test import TestCase
+
+from integra_core import probes
+
+
+def django_app(*args):
+    raise AssertionError("probe requests must not reach Django")
+
+
+class ProbeTestCase(TestCase):
+    def setUp(self):
+        self.checker = probes.ReadinessChecker(cache_seconds=60)
+        patcher = mock.patch.object(probes, "_readiness", self.checker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wsgi(self, path, method="GET", app=django_app):
+        started = {}
+
+        def start_response(status, headers):
+            started.update(status=status, headers=dict(headers))
+
+        body = b"".join(probes.ProbeWSGIMiddleware(app)({"PATH_INFO": path, "REQUEST_METHOD": method}, start_response))
+        return started["status"], started["headers"], body
+
+    def asgi(self, path, method="GET"):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": path, "method": method}
+        async_to_sync(probes.ProbeASGIMiddleware(django_app))(scope, None, send)
+        start, body = sent
+        return start["status"], body["body"]
+
+
+class ProbeTests(ProbeTestCase):
+    def test_healthz_never_touches_the_database(self):
+        with self.assertNumQueries(0):
+            status, headers, body = self.wsgi("/healthz")
+        self.assertEqual((status, json.loads(body)), ("200 OK", {"status": "ok"}))
+        self.assertEqual(headers["Cache-Control"], "no-store")
+
+    def test_readyz_reports_each_check(self):
+        status, _headers, body = self.wsgi("/readyz")
+        payload = json.loads(body)
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(payload["status"], "ready")
+        self.assertEqual(set(payload["checks"]), {"database", "migrations", "cache"})
+        self.assertTrue(all(check["ok"] for check in payload["checks"].values()))
+
+    def test_readyz_result_is_cached(self):
+        self.wsgi("/readyz")
+        with self.assertNumQueries(0):
+            status, _headers, _body = self.wsgi("/readyz")
+        self.assertEqual(status, "200 OK")
+
+    def test_database_failure_is_unavailable(self):
+        with mock.patch.object(self.checker, "check_database", side_effect=OperationalError("gone")):
+            status, _headers, body = self.wsgi("/readyz")
+        checks = json.loads(body)["checks"]
+        self.assertEqual(status, "503 Service Unavailable")
+        self.assertEqual(checks["database"]["error"], "OperationalError: gone")
+        self.assertTrue(checks["cache"]["ok"])
+
+    def test_pending_migrations_are_unavailable(self):
+        migration = mock.Mock(app_label="users")
+        migration.name = "0099_next"
+        executor = mock.Mock()
+        executor.migration_plan.return_value = [(migration, False)]
+        with mock.patch("django.db.migrations.executor.MigrationExecutor", return_value=executor):
+            status, _headers, body = self.wsgi("/readyz")
+        self.assertEqual(status, "503 Service Unavailable")
+        self.assertEqual(json.loads(body)["checks"]["migrations"]["pending"], ["users.0099_next"])
+        self.assertFalse(self.checker._migrated)
+
+    def test_other_paths_and_methods_reach_django(self):
+        app = mock.Mock(return_value=[b"django"])
+        wrapped = probes.ProbeWSGIMiddleware(app)
+        self.assertEqual(wrapped({"PATH_INFO": "/healthz/", "REQUEST_METHOD": "GET"}, None), [b"django"])
+        wrapped({"PATH_INFO": "/readyz", "REQUEST_METHOD": "POST"}, None)
+        self.assertEqual(app.call_count, 2)
+
+    def test_head_has_no_body(self):
+        status, headers, body = self.wsgi("/healthz", method="HEAD")
+        self.assertEqual((status, body), ("200 OK", b""))
+        self.assertEqual(headers["Content-Length"], str(len(probes._HEALTHY)))
+
+
+class ProbeASGITests(ProbeTestCase):
+    def test_healthz(self):
+        self.assertEqual(self.asgi("/healthz"), (200, probes._HEALTHY))
+
+    def test_readyz_uses_the_cached_result(self):
+        self.checker._result = (False, {"database": {"ok": False}})
+        self.checker._checked_at = probes.time.monotonic()
+        status, body = self.asgi("/readyz")
+        self.assertEqual(status, 503)
+        self.assertEqual(json.loads(body)["status"], "unavailable")
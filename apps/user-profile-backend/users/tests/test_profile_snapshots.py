@@ -0,0 +1,160 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users import snapshots, tasks
+from users.bio import BIO_RENDERER_VERSION
+from users.bulk import reassign_advisors
+from users.models import Firm
+from users.serializers import UserProfileSerializer
+from users.tasks import refresh_profile_cache
+
+User = get_user_model()
+
+
+class ProfileSnapshotTests(APITestCase):
+    url = reverse("user_profile")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.firm = Firm.objects.create(name="FinCorp")
+        cls.user = User.objects.create_user(
+            username="snap", email="snap@example.com", firm=cls.firm, bio="**Hi**", advisor_id="ADV-1"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.user.refresh_from_db()
+
+    def snapshot(self, user=None):
+        return json.loads(User.objects.values_list("profile_snapshot", flat=True).get(pk=(user or self.user).pk))
+
+    def test_created_rows_store_their_public_profile(self):
+        self.assertEqual(self.snapshot(), dict(UserProfileSerializer(self.user).data))
+        self.assertEqual(self.snapshot()["id"], self.user.pk)
+
+    def test_cold_get_serves_the_snapshot_without_serializing(self):
+        self.client.force_authenticate(user=self.user)
+        with mock.patch.object(UserProfileSerializer, "to_representation") as to_representation:
+            response = self.client.get(self.url)
+        to_representation.assert_not_called()
+        self.assertEqual(response.content, self.user.profile_snapshot.encode())
+        self.assertEqual(response.data["bio_html"], "<p><strong>Hi</strong></p>")
+
+    def test_missing_snapshot_is_rendered_and_stored_on_read(self):
+        User.objects.filter(pk=self.user.pk).update(profile_snapshot="")
+        self.user.refresh_from_db()
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["username"], "snap")
+        self.assertEqual(self.snapshot()["username"], "snap")
+
+    def test_patch_re_renders_the_snapshot(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.patch(self.url, {"first_name": "Grace", "bio": "New"}, format="json")
+
+        snapshot = self.snapshot()
+        self.assertEqual((snapshot["first_name"], snapshot["bio_html"]), ("Grace", "<p>New</p>"))
+        self.assertEqual(self.client.get(self.url).data["first_name"], "Grace")
+
+    def bump_bio_renderer(self):
+        """The next BIO_RENDERER_VERSION, which renders every bio as <p>NEW</p>."""
+        for target in ("users.models", "users.serializers", "users.snapshots"):
+            patcher = mock.patch(f"{target}.BIO_RENDERER_VERSION", BIO_RENDERER_VERSION + 1)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for target in ("users.models", "users.serializers"):
+            patcher = mock.patch(f"{target}.render_bio", return_value="<p>NEW</p>")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_renderer_bump_after_a_read_outside_the_snapshot_path(self):
+        self.bump_bio_renderer()
+        # Serialized outside the snapshot path first (e.g. the login profile).
+        self.assertEqual(UserProfileSerializer(self.user).data["bio_html"], "<p>NEW</p>")
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio_renderer_version, BIO_RENDERER_VERSION)
+        self.assertEqual(json.loads(snapshots.snapshot_body(self.user))["bio_html"], "<p>NEW</p>")
+        User.objects.filter(pk=self.user.pk).update(profile_snapshot="")
+        self.assertEqual(json.loads(snapshots.load_snapshots([self.user.pk])[self.user.pk])["bio_html"], "<p>NEW</p>")
+
+    def test_renderer_bump_on_read_stores_bio_and_snapshot_together(self):
+        self.bump_bio_renderer()
+
+        self.assertEqual(json.loads(snapshots.snapshot_body(self.user))["bio_html"], "<p>NEW</p>")
+        row = User.objects.values("bio_html", "bio_renderer_version", "profile_snapshot").get(pk=self.user.pk)
+        self.assertEqual((row["bio_html"], row["bio_renderer_version"]), ("<p>NEW</p>", BIO_RENDERER_VERSION + 1))
+        self.assertEqual(json.loads(row["profile_snapshot"])["bio_html"], "<p>NEW</p>")
+
+    def test_saving_other_fields_skips_rendering(self):
+        with mock.patch("users.snapshots.render_snapshot") as render:
+            self.user.save(update_fields=["last_login"])
+        render.assert_not_called()
+
+    def test_firm_rename_and_reassignment_re_render(self):
+        self.firm.name = "FinCorp Holdings"
+        with mock.patch("users.snapshots.render_snapshot") as render, self.captureOnCommitCallbacks(execute=True):
+            self.firm.save()
+        render.assert_not_called()
+
+        tasks.run_task(tasks.claim(1)[0])
+        self.assertEqual(self.snapshot()["firm_name"], "FinCorp Holdings")
+
+        reassign_advisors(User.objects.filter(pk=self.user.pk), firm=Firm.objects.create(name="NewCo"), role="Principal")
+        self.assertEqual((self.snapshot()["firm_name"], self.snapshot()["role"]), ("NewCo", "Principal"))
+
+    def test_batch_renders_with_one_serializer(self):
+        users = [self.user] + [
+            User.objects.create_user(username=f"b{n}", email=f"b{n}@example.com", bio=f"*{n}*") for n in range(3)
+        ]
+        User.objects.update(profile_snapshot="")
+        users = list(User.objects.select_related("firm").order_by("pk"))
+
+        with mock.patch("users.snapshots.UserProfileSerializer", wraps=UserProfileSerializer) as serializer:
+            snapshots.store_snapshots(users)
+        serializer.assert_called_once_with()
+        for user in users:
+            self.assertEqual(self.snapshot(user), dict(UserProfileSerializer(user).data))
+
+    def test_refresh_task_caches_the_snapshot(self):
+        with self.assertNumQueries(1):
+            refresh_profile_cache(self.user.pk)
+        self.assertEqual(cache.get(f"user_profile:{self.user.pk}")["body"], self.user.profile_snapshot.encode())
+
+
+class CheckProfileSnapshotsTests(APITestCase):
+    def test_detects_and_repairs_drift(self):
+        users = [User.objects.create_user(username=f"c{n}", email=f"c{n}@example.com") for n in range(3)]
+        User.objects.filter(pk=users[0].pk).update(profile_snapshot="")
+        User.objects.filter(pk=users[1].pk).update(first_name="Raw SQL")
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "--repair"):
+            call_command("check_profile_snapshots", "--chunk-size", "2", stdout=out)
+        self.assertIn("3 profile snapshots: 1 missing, 1 drifted", out.getvalue())
+        self.assertIn(f"drifted: {users[1].pk}", out.getvalue())
+
+        call_command("check_profile_snapshots", "--repair", stdout=StringIO())
+        snapshot = User.objects.values_list("profile_snapshot", flat=True).get(pk=users[1].pk)
+        self.assertEqual(json.loads(snapshot)["first_name"], "Raw SQL")
+
+        out = StringIO()
+        call_command("check_profile_snapshots", stdout=out)
+        self.assertIn("0 missing, 0 drifted", out.getvalue())
+
+    def test_check_without_repair_does_not_write(self):
+        user = User.objects.create_user(username="old", email="old@example.com", bio="hi")
+        User.objects.filter(pk=user.pk).update(bio_html="<p>old rules</p>", bio_renderer_version=0, profile_snapshot="{}")
+
+        with self.assertRaises(CommandError):
+            call_command("check_profile_snapshots", stdout=StringIO())
+        self.assertEqual(User.objects.values_list("bio_renderer_version", flat=True).get(pk=user.pk), 0)
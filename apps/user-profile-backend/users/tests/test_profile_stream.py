@@ -0,0 +1,234 @@
+import asyncio
+import io
+import json
+import logging
+import threading
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from integra_core.logs import JsonFormatter, QueueHandler
+from users import events, tasks
+from users.audit import ProfileAuditWriter
+from users.bulk import reassign_advisors
+from users.models import Firm, OutboxEvent
+from users.events import HEARTBEAT, ProfileEventHub, StreamLimitExceeded, format_event
+
+User = get_user_model()
+
+
+def parse(chunk):
+    """``{"event": ..., "id": ..., "data": {...}}`` of one SSE message."""
+    message = {}
+    for line in chunk.decode().strip().splitlines():
+        name, _, value = line.partition(": ")
+        message[name] = json.loads(value) if name == "data" else value
+    return message
+
+
+class ProfileEventHubTests(SimpleTestCase):
+    async def test_publish_from_another_thread_reaches_the_stream(self):
+        hub = ProfileEventHub()
+        stream = hub.stream(7)
+        first = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)  # let the stream subscribe
+        self.assertEqual(hub.stream_count, 1)
+
+        publisher = threading.Thread(target=hub.publish, args=(7, {"type": "profile.updated", "version": 3}))
+        publisher.start()
+        publisher.join()
+        hub.publish(8, {"type": "profile.updated", "version": 1})  # someone else's
+
+        message = parse(await asyncio.wait_for(first, 1))
+        self.assertEqual(message["event"], "profile.updated")
+        self.assertEqual(message["id"], "3")
+        await stream.aclose()
+        self.assertEqual(hub.stream_count, 0)
+
+    async def test_full_queue_collapses_into_one_resync(self):
+        hub = ProfileEventHub(queue_size=2)
+        subscription = hub.subscribe(1)
+        for version in range(1, 5):
+            hub.deliver(1, {"type": "profile.updated", "version": version})
+        await asyncio.sleep(0)
+
+        # 1 and 2 filled the queue; 3 found it full and replaced the backlog.
+        queued = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+        self.assertEqual([event["type"] for event in queued], ["resync", "profile.updated"])
+        self.assertEqual(queued[-1]["version"], 4)
+        self.assertEqual(hub.stats["resyncs"], 1)
+
+    async def test_idle_stream_sends_heartbeats(self):
+        hub = ProfileEventHub(heartbeat_interval=0.01)
+        stream = hub.stream(1)
+        self.assertEqual(await asyncio.wait_for(anext(stream), 1), HEARTBEAT)
+        await stream.aclose()
+
+    async def test_stream_limits(self):
+        hub = ProfileEventHub(max_streams=3, max_streams_per_user=2)
+        hub.subscribe(1)
+        hub.subscribe(1)
+        self.assertFalse(hub.has_capacity(1))
+        with self.assertRaises(StreamLimitExceeded):
+            hub.subscribe(1)
+        hub.subscribe(2)
+        with self.assertRaises(StreamLimitExceeded):
+            hub.subscribe(3)
+
+    def test_format_event(self):
+        self.assertEqual(
+            format_event({"type": "profile.updated", "version": 2, "fields": {"bio": "x"}}),
+            b'id: 2\nevent: profile.updated\ndata: {"type":"profile.updated","version":2,"fields":{"bio":"x"}}\n\n',
+        )
+        self.assertEqual(format_event({"type": "resync"}), b'event: resync\ndata: {"type":"resync"}\n\n')
+
+
+class ProfileStreamViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="streamer", email="streamer@example.com", password="password123", profile_version=4
+        )
+        cls.token = str(RefreshToken.for_user(cls.user).access_token)
+        cls.url = reverse("user_profile_stream")
+
+    def setUp(self):
+        hub = ProfileEventHub(heartbeat_interval=5)
+        patcher = mock.patch.object(events, "profile_events", hub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        view_patcher = mock.patch("users.views.profile_events", hub)
+        view_patcher.start()
+        self.addCleanup(view_patcher.stop)
+        self.hub = hub
+
+    async def test_requires_a_valid_token(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get(self.url, {"access_token": "not-a-token"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_streams_ready_then_changes(self):
+        response = await self.async_client.get(self.url, headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = aiter(response.streaming_content)
+
+        ready = parse(await anext(content))
+        self.assertEqual((ready["event"], ready["data"]["version"]), ("ready", 4))
+
+        events.publish_profile_change(self.user.pk, 5, {"bio": "New bio"})
+        changed = parse(await asyncio.wait_for(anext(content), 1))
+        self.assertEqual(changed["id"], "5")
+        self.assertEqual(changed["data"]["fields"], {"bio": "New bio"})
+        await content.aclose()
+
+    async def test_query_token_and_reconnect_after_missed_events(self):
+        response = await self.async_client.get(
+            self.url, {"access_token": self.token}, headers={"Last-Event-ID": "2"}
+        )
+        content = aiter(response.streaming_content)
+        self.assertEqual(parse(await anext(content))["event"], "ready")
+        self.assertEqual(parse(await anext(content))["event"], "resync")
+        await content.aclose()
+
+    async def test_full_worker_answers_503(self):
+        self.hub.max_streams = 0
+        response = await self.async_client.get(self.url, headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "30")
+
+    async def test_query_token_never_reaches_the_logs(self):
+        stream = io.StringIO()
+        handler = QueueHandler(stream=stream)
+        handler.setFormatter(JsonFormatter())
+        self.addCleanup(handler.close)
+        logger = logging.getLogger("django.request")
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        tampered = str(RefreshToken.for_user(self.user).access_token) + "x"
+        response = await self.async_client.get(self.url, {"access_token": tampered})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.hub.max_streams = 0
+        response = await self.async_client.get(self.url, {"access_token": self.token})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        handler.stop()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([line["status_code"] for line in lines], [401, 503])
+        self.assertEqual(lines[0]["request"], f"GET {self.url}")
+        self.assertNotIn("access_token", stream.getvalue())
+        self.assertNotIn(self.token.split(".")[-1], stream.getvalue())
+
+
+class ProfileUpdatePublishesTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="publisher", email="publisher@example.com", password="password123", bio="Old"
+        )
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("users.views.profile_audit", ProfileAuditWriter(flush_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def test_patch_bumps_version_and_publishes_after_commit(self):
+        with mock.patch("users.views.publish_profile_change") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(reverse("user_profile"), {"bio": "New", "first_name": ""}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_version, 1)
+        publish.assert_called_once_with(self.user.pk, 1, {"bio": "New", "bio_html": "<p>New</p>"})
+
+    def test_noop_patch_publishes_nothing(self):
+        with mock.patch("users.views.publish_profile_change") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(reverse("user_profile"), {"bio": "Old"}, format="json")
+        publish.assert_not_called()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_version, 0)
+
+    def test_admin_edit_bumps_version_and_publishes_after_commit(self):
+        staff = User.objects.create_superuser(username="ops", email="ops@example.com", password="x")
+        request = RequestFactory().post("/")
+        request.user = staff
+        self.user.role, self.user.last_login = "Principal", self.user.date_joined
+        form = mock.Mock(changed_data=["role", "last_login"], initial={"role": "", "last_login": None})
+
+        with mock.patch("users.admin.publish_profile_change") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                admin.site._registry[User].save_model(request, self.user, form, change=True)
+        publish.assert_called_once_with(self.user.pk, 1, {"role": "Principal"})
+        event = OutboxEvent.objects.get(user=self.user)
+        self.assertEqual(event.payload["version"], 1)
+        self.assertEqual(event.payload["changes"], {"role": ["", "Principal"]})
+
+    def test_bulk_reassign_and_firm_rename_bump_version_and_publish(self):
+        firm = Firm.objects.create(name="NewCo")
+        with mock.patch("users.events.publish_profile_change") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                reassign_advisors(User.objects.filter(pk=self.user.pk), firm=firm, role="Principal")
+            publish.assert_called_once_with(self.user.pk, 1, {"firm_name": "NewCo", "role": "Principal"})
+
+            firm.name = "NewCo Holdings"
+            with self.captureOnCommitCallbacks(execute=True):
+                firm.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.run_task(tasks.claim(1)[0])
+            publish.assert_called_with(self.user.pk, 2, {"firm_name": "NewCo Holdings"})
+
+        payloads = [event.payload for event in OutboxEvent.objects.filter(user=self.user).order_by("pk")]
+        self.assertEqual([payload["version"] for payload in payloads], [1, 2])
+        self.assertEqual(payloads[1]["changes"], {"firm_name": ["NewCo", "NewCo Holdings"]})
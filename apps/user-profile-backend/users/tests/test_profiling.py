@@ -0,0 +1,94 @@
+import cProfile
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from integra_core import profiling
+
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="profiled", email="profiled@example.com")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        overrides = self.settings(PROFILING_DIR=self.dir, PROFILING_SAMPLE_RATE=0, PROFILING_MAX_FILES=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.bearer = f"Bearer {AccessToken.for_user(self.user)}"
+
+    def get(self, **headers):
+        return self.client.get(reverse("user_profile"), HTTP_AUTHORIZATION=self.bearer, **headers)
+
+    def test_signed_token_profiles_the_request(self):
+        response = self.get(HTTP_X_PROFILE_TOKEN=profiling.issue_token("ops"), HTTP_X_REQUEST_ID="req-1")
+
+        self.assertEqual(response.status_code, 200)
+        [(prof_path, metadata)] = profiling.profile_files(self.dir)
+        self.assertEqual(response["X-Profile-Id"], prof_path.stem)
+        self.assertEqual(
+            (metadata["route"], metadata["status"], metadata["trigger"], metadata["request_id"], metadata["user_id"]),
+            ("user_profile", 200, "token:ops", "req-1", self.user.pk),
+        )
+
+    def test_unsigned_or_missing_token_is_not_profiled(self):
+        self.get(HTTP_X_PROFILE_TOKEN="forged")
+        self.get()
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_sampling_and_rotation(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1.0):
+            self.client = self.client_class()
+            for n in range(3):
+                response = self.get(HTTP_X_REQUEST_ID=f"req-{n}")
+                self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual([m["request_id"] for _p, m in profiling.profile_files(self.dir)], ["req-1", "req-2"])
+        self.assertEqual(len(list(self.dir.glob("*.prof"))), 2)
+
+    def test_busy_profiler_lets_the_request_through(self):
+        with profiling._profiling:
+            response = self.get(HTTP_X_PROFILE_TOKEN=profiling.issue_token("ops"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+
+
+class ProfilesReportTests(SimpleTestCase):
+    def test_report_groups_by_route(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for n, route in enumerate(["user_profile", "user_profile", "firm_stats"]):
+                profiler = cProfile.Profile()
+                profiler.runcall(sorted, range(1000))
+                profiler.dump_stats(Path(tmp) / f"2026{n}-{route}.prof")
+                (Path(tmp) / f"2026{n}-{route}.json").write_text(
+                    json.dumps({"route": route, "created": n, "duration_ms": 10.0 * (n + 1)})
+                )
+
+            out = StringIO()
+            call_command("profiles_report", "--dir", tmp, "--route", "user_profile", stdout=out)
+            self.assertIn("user_profile: 2 profiles", out.getvalue())
+            self.assertNotIn("firm_stats", out.getvalue())
+            self.assertIn("{built-in method builtins.sorted}", out.getvalue())
+
+            with self.assertRaises(CommandError):
+                call_command("profiles_report", "--dir", tmp, "--min-duration-ms", "100", stdout=StringIO())
+
+    def test_issue_token(self):
+        out = StringIO()
+        call_command("profiles_report", "--issue-token", "ops", stdout=out, stderr=StringIO())
+        token = out.getvalue().strip().split(": ", 1)[1]
+        self.assertEqual(profiling.check_token(token, max_age=60), "ops")
@@ -0,0 +1,127 @@
+import io
+import json
+import logging
+import queue
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from integra_core.logs import BatchingQueueListener, JsonFormatter, QueueHandler, RequestContextFilter
+
+
+User = get_user_model()
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class RequestLogMiddlewareTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="logged", email="logged@example.com")
+
+    def setUp(self):
+        self.handler = RecordingHandler()
+        logger = logging.getLogger("integra.access")
+        logger.addHandler(self.handler)
+        self.addCleanup(logger.removeHandler, self.handler)
+
+    def test_access_record_carries_request_id_user_and_timing(self):
+        token = AccessToken.for_user(self.user)
+        response = self.client.get(
+            reverse("user_profile"), HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_REQUEST_ID="lb-42"
+        )
+
+        self.assertEqual(response["X-Request-ID"], "lb-42")
+        record = self.handler.records[-1]
+        self.assertEqual(
+            (record.request_id, record.user_id, record.route, record.status), ("lb-42", self.user.pk, "user_profile", 200)
+        )
+        self.assertGreater(record.duration_ms, 0)
+
+    def test_django_request_records_carry_the_request_id(self):
+        # Logged by Django's handler after the middleware chain has returned.
+        handler = RecordingHandler()
+        handler.addFilter(RequestContextFilter())
+        logger = logging.getLogger("django.request")
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        self.client.get(reverse("user_profile"), HTTP_X_REQUEST_ID="lb-401")
+        [record] = handler.records
+        self.assertEqual((record.status_code, record.request_id), (401, "lb-401"))
+
+    def test_malformed_request_id_is_replaced(self):
+        response = self.client.get(reverse("user_profile"), HTTP_X_REQUEST_ID="bad id\n")
+        self.assertRegex(response["X-Request-ID"], r"^[0-9a-f]{32}$")
+        self.assertIsNone(self.handler.records[-1].user_id)
+
+
+class QueueHandlerTests(SimpleTestCase):
+    def make_handler(self, **kwargs):
+        stream = io.StringIO()
+        handler = QueueHandler(stream=stream, **kwargs)
+        handler.setFormatter(JsonFormatter())
+        self.addCleanup(handler.close)
+        logger = logging.getLogger(f"test.queue.{id(handler)}")
+        logger.propagate = False
+        logger.addHandler(handler)
+        return handler, logger, stream
+
+    def lines(self, stream):
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_records_are_written_as_json_by_the_writer_thread(self):
+        handler, logger, stream = self.make_handler()
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            logger.exception("failed for %s", "ada", extra={"advisor_id": "ADV1"})
+        handler.stop()
+
+        [line] = self.lines(stream)
+        self.assertEqual((line["level"], line["message"], line["advisor_id"]), ("ERROR", "failed for ada", "ADV1"))
+        self.assertIn("ValueError: bad", line["exc_info"])
+        self.assertIsNone(line["request_id"])
+
+    def test_full_queue_drops_and_reports_instead_of_blocking(self):
+        handler, logger, stream = self.make_handler(maxsize=2)
+        release = threading.Event()
+        # Hold the writer so the queue fills up.
+        original = handler.target.handle_batch
+        handler.target.handle_batch = lambda records: (release.wait(5), original(records))
+        handler.start()
+        handler.queue.put(logging.makeLogRecord({"msg": "first", "levelno": logging.INFO}))
+
+        for n in range(10):
+            logger.warning("record %s", n)
+        self.assertGreater(handler.dropped, 0)
+        release.set()
+        handler.stop()
+
+        lines = self.lines(stream)
+        report = [line for line in lines if line["message"].startswith("log records dropped")]
+        self.assertEqual(report[0]["dropped"], handler.dropped)
+        self.assertEqual(len(lines), 1 + 10 - handler.dropped + 1)
+
+    def test_listener_writes_batches(self):
+        writes = []
+        target = RecordingHandler()
+        target.handle_batch = writes.append
+        q = queue.Queue()
+        for n in range(5):
+            q.put(logging.makeLogRecord({"msg": str(n), "levelno": logging.INFO}))
+        listener = BatchingQueueListener(q, target, batch_size=2)
+        listener.start()
+        listener.stop()
+        self.assertEqual([len(batch) for batch in writes], [2, 2, 1])
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from users.models import Firm, FirmRoleStat
+
+
+User = get_user_model()
+
+
+class SeedAdvisorsTests(TestCase):
+    def seed(self, *args):
+        out = StringIO()
+        call_command("seed_advisors", "--count", "40", "--firms", "4", "--batch-size", "15", *args, stdout=out)
+        return out.getvalue()
+
+    def snapshot(self):
+        return list(User.objects.order_by("username").values_list("username", "firm__name", "role", "is_active"))
+
+    def test_seeding_is_deterministic(self):
+        self.seed("--seed", "7")
+        first = self.snapshot()
+        User.objects.all().delete()
+        Firm.objects.all().delete()
+
+        self.seed("--seed", "7")
+
+        self.assertEqual(len(first), 40)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_rows_share_one_hash_and_stats_are_rebuilt(self):
+        output = self.seed()
+
+        self.assertEqual(User.objects.values("password").distinct().count(), 1)
+        self.assertTrue(User.objects.first().check_password("password123"))
+        self.assertEqual(sum(FirmRoleStat.objects.values_list("count", flat=True)), 40)
+        self.assertIn("Seeded 40 advisors", output)
+
+    def test_rows_get_profile_snapshots(self):
+        self.seed()
+
+        out = StringIO()
+        call_command("check_profile_snapshots", stdout=out)
+        self.assertIn("Checked 40 profile snapshots: 0 missing, 0 drifted", out.getvalue())
+
+    def test_firm_sizes_are_skewed(self):
+        self.seed("--zipf", "2")
+
+        largest = max(User.objects.filter(firm=firm).count() for firm in Firm.objects.all())
+        self.assertGreater(largest, 40 / 4)
+
+    def test_refuses_to_reuse_a_prefix(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.cache import profile_cache_key
+
+
+User = get_user_model()
+
+
+class LoginBootstrapTests(APITestCase):
+    login_url = reverse("token_obtain_pair")
+    bootstrap_url = reverse("session_bootstrap")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="bootuser",
+            email="bootuser@example.com",
+            password="password123",
+            first_name="Ada",
+            advisor_id="ADV5000",
+            firm_name="FinCorp",
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_login_returns_tokens_and_profile_in_one_query(self):
+        with self.assertNumQueries(1):  # the credential lookup only
+            response = self.client.post(
+                self.login_url, {"username": "bootuser", "password": "password123"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.data)
+        self.assertIn("refresh", response.data)
+        self.assertEqual(response.data["profile"]["username"], "bootuser")
+        self.assertEqual(response.data["profile"]["advisor_id"], "ADV5000")
+
+    def test_login_seeds_profile_cache(self):
+        response = self.client.post(
+            self.login_url, {"username": "bootuser", "password": "password123"}, format="json"
+        )
+
+        entry = cache.get(profile_cache_key(self.user.pk))
+        self.assertEqual(entry["data"], response.data["profile"])
+
+    def test_failed_login_has_no_profile(self):
+        response = self.client.post(
+            self.login_url, {"username": "bootuser", "password": "wrong"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn("profile", response.data)
+
+    def test_bootstrap_requires_authentication(self):
+        response = self.client.get(self.bootstrap_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bootstrap_returns_profile_with_bearer_token(self):
+        login = self.client.post(
+            self.login_url, {"username": "bootuser", "password": "password123"}, format="json"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+        response = self.client.get(self.bootstrap_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["profile"], login.data["profile"])
+
+    def test_bootstrap_is_read_only(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(self.bootstrap_url, {"first_name": "X"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.audit import ProfileAuditWriter
+from users.cache import profile_cache_key
+
+
+User = get_user_model()
+
+
+class SparseFieldsetAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="sparse", email="sparse@example.com", password="password123",
+            first_name="Ada", last_name="Lovelace", bio="A long bio", firm_name="Analytical",
+        )
+        cls.url = reverse("user_profile")
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("users.views.profile_audit", ProfileAuditWriter(flush_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def test_get_returns_only_requested_fields_in_contract_order(self):
+        response = self.client.get(self.url, {"fields": "avatar_url,first_name, last_name"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.json()), ["first_name", "last_name", "avatar_url"])
+
+    def test_unknown_or_empty_fieldset_is_rejected(self):
+        response = self.client.get(self.url, {"fields": "first_name,password"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Unknown field(s): password", response.json()["fields"][0])
+        self.assertEqual(self.client.get(self.url, {"fields": ","}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_narrow_and_full_variants_are_cached_side_by_side(self):
+        full = self.client.get(self.url).json()
+        narrow = self.client.get(self.url, {"fields": "first_name"}).json()
+        self.assertEqual(narrow, {"first_name": "Ada"})
+
+        entry = cache.get(profile_cache_key(self.user.pk))
+        self.assertEqual(entry["data"], full)  # not replaced by the narrow variant
+        self.assertEqual(self.client.get(self.url).json(), full)
+
+    def test_profile_write_orphans_the_narrow_variant(self):
+        self.client.get(self.url, {"fields": "first_name"})
+        self.user.first_name = "Grace"
+        self.user.save()
+        self.assertEqual(self.client.get(self.url, {"fields": "first_name"}).json(), {"first_name": "Grace"})
+
+    def test_patch_validates_everything_but_answers_sparsely(self):
+        response = self.client.patch(f"{self.url}?fields=first_name", {"first_name": "Grace", "bio": "x" * 2000}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("bio", response.json())
+
+        response = self.client.patch(f"{self.url}?fields=first_name", {"first_name": "Grace", "bio": "New"}, format="json")
+        self.assertEqual(response.json(), {"first_name": "Grace"})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, "New")
+
+    def test_bootstrap_honours_fields(self):
+        response = self.client.get(reverse("session_bootstrap"), {"fields": "last_name"})
+        self.assertEqual(response.json(), {"profile": {"last_name": "Lovelace"}})
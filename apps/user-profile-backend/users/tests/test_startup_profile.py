@@ -0,0 +1,43 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from users.management.commands.startup_profile import group_by_package, parse_importtime
+
+
+IMPORTTIME_SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   django.utils.version
+import time:       529 |       649 | django
+import time:       300 |        300 |     rest_framework.compat
+import time:        80 |        380 |   rest_framework
+"""
+
+
+class StartupProfileParsingTests(SimpleTestCase):
+    def test_parse_importtime_skips_header_and_reads_columns(self):
+        modules = parse_importtime(IMPORTTIME_SAMPLE)
+
+        self.assertEqual(len(modules), 4)
+        self.assertEqual(modules["django"], (529, 649))
+        self.assertEqual(modules["rest_framework.compat"], (300, 300))
+
+    def test_group_by_package_sums_self_time(self):
+        totals = group_by_package(parse_importtime(IMPORTTIME_SAMPLE))
+
+        self.assertEqual(totals, {"django": 649, "rest_framework": 380})
+
+
+class StartupProfileCommandTests(SimpleTestCase):
+    def test_api_profile_probe_reports_first_response(self):
+        out = StringIO()
+        call_command("startup_profile", "--runtime-profile", "api", "--json", "--top", "1000", stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report["runtime_profile"], "api")
+        self.assertTrue(report["status"].startswith("401"))  # unauthenticated profile GET
+        self.assertGreater(report["first_response_ms"], 0)
+        # drf_spectacular is never imported on API-only workers.
+        self.assertNotIn("drf_spectacular", {row["package"] for row in report["top_packages"]})
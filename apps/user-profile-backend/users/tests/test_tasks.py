@@ -0,0 +1,140 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from users import tasks
+from users.audit import ProfileAuditWriter
+from users.cache import profile_cache_key
+from users.models import BackgroundTask
+from users.tests.utils import InlineExecutor
+
+
+User = get_user_model()
+
+calls = []
+
+
+@tasks.task("tests.record", max_attempts=2)
+def record_call(value):
+    calls.append(value)
+
+
+@tasks.task("tests.explode", max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            tasks.enqueue("tests.record", {"value": 1})
+            self.assertFalse(BackgroundTask.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(BackgroundTask.objects.get().payload, {"value": 1})
+
+    def test_dedupe_key_collapses_pending_duplicates(self):
+        for value in range(3):
+            tasks.enqueue("tests.record", {"value": value}, dedupe_key="same", on_commit=False)
+
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(KeyError):
+            tasks.enqueue("tests.missing", on_commit=False)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        tasks.enqueue("tests.record", {"value": "now"}, on_commit=False)
+
+        self.assertEqual(calls, ["now"])
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_successful_task_is_deleted(self):
+        tasks.enqueue("tests.record", {"value": 7}, on_commit=False)
+        [task_id] = tasks.claim(10)
+
+        self.assertTrue(tasks.run_task(task_id))
+        self.assertEqual(calls, [7])
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        tasks.enqueue("tests.explode", on_commit=False)
+
+        [task_id] = tasks.claim(10)
+        self.assertFalse(tasks.run_task(task_id))
+        row = BackgroundTask.objects.get()
+        self.assertEqual(row.status, BackgroundTask.Status.PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertIn("boom", row.last_error)
+
+        BackgroundTask.objects.update(run_at=timezone.now())
+        [task_id] = tasks.claim(10)
+        tasks.run_task(task_id)
+        self.assertEqual(BackgroundTask.objects.get().status, BackgroundTask.Status.FAILED)
+
+    def test_failed_retry_yields_to_a_pending_duplicate(self):
+        tasks.enqueue("tests.explode", dedupe_key="same", on_commit=False)
+        [task_id] = tasks.claim(10)
+        # Enqueued again while the first one runs (e.g. a PATCH during a failing refresh).
+        tasks.enqueue("tests.explode", dedupe_key="same", on_commit=False)
+
+        self.assertFalse(tasks.run_task(task_id))
+        row = BackgroundTask.objects.get()
+        self.assertNotEqual(row.pk, task_id)
+        self.assertEqual((row.status, row.attempts), (BackgroundTask.Status.PENDING, 0))
+
+    def test_claim_skips_future_and_reclaims_stale_tasks(self):
+        tasks.enqueue("tests.record", {"value": 1}, delay=60, on_commit=False)
+        self.assertEqual(tasks.claim(10), [])
+
+        BackgroundTask.objects.update(
+            status=BackgroundTask.Status.RUNNING, locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(len(tasks.claim(10)), 1)
+
+    def test_run_workers_once_drains_due_tasks(self):
+        for value in range(5):
+            tasks.enqueue("tests.record", {"value": value}, on_commit=False)
+
+        out = StringIO()
+        with mock.patch("users.management.commands.run_workers.ThreadPoolExecutor", InlineExecutor):
+            call_command("run_workers", "--once", "--concurrency", "2", stdout=out)
+
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertIn("5 succeeded", out.getvalue())
+
+
+class ProfileUpdateTaskTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="tasked", email="tasked@example.com")
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("users.views.profile_audit", ProfileAuditWriter(flush_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def test_patch_queues_cache_refresh_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse("user_profile"), {"first_name": "Grace"}, format="json")
+
+        task = BackgroundTask.objects.get(name="users.refresh_profile_cache")
+        self.assertEqual(task.payload, {"user_id": self.user.pk})
+
+        tasks.run_task(tasks.claim(1)[0])
+        self.assertEqual(cache.get(profile_cache_key(self.user.pk))["data"]["first_name"], "Grace")
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from users.cache import profile_cache_key
+from users.management.commands.warm_profile_cache import RateLimiter
+from users.tests.utils import InlineExecutor
+
+
+User = get_user_model()
+
+
+class WarmProfileCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.users = [
+            User.objects.create_user(
+                username=f"warm{i}", email=f"warm{i}@example.com", last_login=now - timedelta(days=i)
+            )
+            for i in range(5)
+        ]
+        cls.never_logged_in = User.objects.create_user(username="cold", email="cold@example.com")
+
+    def setUp(self):
+        cache.clear()
+
+    def warm(self, *args):
+        out = StringIO()
+        with mock.patch(
+            "users.management.commands.warm_profile_cache.ThreadPoolExecutor", InlineExecutor
+        ):
+            call_command("warm_profile_cache", *args, "--max-rate", "0", stdout=out)
+        return out.getvalue()
+
+    def test_warms_most_recently_active_advisors_in_chunks(self):
+        output = self.warm("--limit", "3", "--chunk-size", "2")
+
+        warmed = [user for user in self.users if cache.get(profile_cache_key(user.pk)) is not None]
+        self.assertEqual(warmed, self.users[:3])
+        self.assertIsNone(cache.get(profile_cache_key(self.never_logged_in.pk)))
+        self.assertEqual(cache.get(profile_cache_key(self.users[0].pk))["data"]["username"], "warm0")
+        self.assertIn("Warmed 3 profiles", output)
+        self.assertIn("2 chunks", output)
+
+    def test_since_days_filters_out_stale_logins(self):
+        self.warm("--since-days", "2", "--limit", "0")
+
+        self.assertIsNotNone(cache.get(profile_cache_key(self.users[1].pk)))
+        self.assertIsNone(cache.get(profile_cache_key(self.users[3].pk)))
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_spaces_out_acquisitions(self):
+        sleeps = []
+        limiter = RateLimiter(100, clock=lambda: 0.0, sleep=sleeps.append)
+
+        limiter.acquire(50)
+        limiter.acquire(50)
+        limiter.acquire(100)
+
+        self.assertEqual(sleeps, [0.5, 1.0])
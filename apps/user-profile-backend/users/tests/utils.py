@@ -0,0 +1,26 @@
+"""Helpers shared by several test modules."""
+from concurrent.futures import Future
+
+
+class InlineExecutor:
+    """
+    Drop-in for ThreadPoolExecutor that runs submitted work immediately
+    (worker threads can't share the test DB).
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -1,9 +1,33 @@
+from django.apps import apps
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.views import TokenRefreshView
 
 # Import the custom views from the current application
-from .views import UserProfileView 
+from .views import (
+    FirmStatsView, LoginView, MemoryDiagnosticsView, ProfileStreamView, SessionBootstrapView, UserProfileView,
+)
+
+
+def lazy_view(dotted_path, **initkwargs):
+    """
+    Defers importing a class-based view until its first request.
+
+    drf_spectacular pulls in most of its generator machinery on import; wrapping
+    the docs views keeps that cost off worker boot and off nodes that never
+    serve the schema.
+    """
+    resolved = []
+
+    @csrf_exempt
+    def view(request, *args, **kwargs):
+        if not resolved:
+            resolved.append(import_string(dotted_path).as_view(**initkwargs))
+        return resolved[0](request, *args, **kwargs)
+
+    return view
+
 
 urlpatterns = [
     # ========================================================================
@@ -13,10 +37,11 @@ urlpatterns = [
     # ========================================================================
     
     # POST /api/auth/login/
-    # Takes credentials (username, password) and returns access and refresh tokens.
+    # Takes credentials (username, password) and returns access and refresh tokens
+    # plus the advisor profile (saves the portal a second round trip).
     path(
         'auth/login/', 
-        TokenObtainPairView.as_view(), 
+        LoginView.as_view(), 
         name='token_obtain_pair'
     ),
     
@@ -41,6 +66,38 @@ urlpatterns = [
         name='user_profile'
     ),
 
+    # GET /api/user/profile/stream/
+    # Server-sent events: pushes the advisor's profile changes (serve under ASGI).
+    path(
+        'user/profile/stream/', 
+        ProfileStreamView.as_view(), 
+        name='user_profile_stream'
+    ),
+
+    # GET /api/bootstrap/
+    # Session bootstrap for an already-authenticated client (profile in one call).
+    path(
+        'bootstrap/', 
+        SessionBootstrapView.as_view(), 
+        name='session_bootstrap'
+    ),
+
+    # GET /api/firms/stats/
+    # Advisor counts per firm / role / active flag for management dashboards (staff only).
+    path(
+        'firms/stats/', 
+        FirmStatsView.as_view(), 
+        name='firm_stats'
+    ),
+
+    # GET /api/diagnostics/memory/
+    # Worker memory report: per-endpoint allocation peaks, top allocators, cache sizes (staff only).
+    path(
+        'diagnostics/memory/', 
+        MemoryDiagnosticsView.as_view(), 
+        name='memory_diagnostics'
+    ),
+
     # ========================================================================
     # 3. API Documentation Routes (Swagger / OpenAPI)
     # These routes are consumed by the frontend team for reference and debugging.
@@ -51,23 +108,28 @@ urlpatterns = [
     # Serves the machine-readable OpenAPI schema definition (JSON/YAML).
     path(
         'schema/', 
-        SpectacularAPIView.as_view(), 
+        lazy_view('users.schema.CachedSpectacularAPIView'), 
         name='schema'
     ),
-    
-    # GET /api/schema/swagger-ui/
-    # Serves the interactive Swagger UI interface.
-    path(
-        'schema/swagger-ui/', 
-        SpectacularSwaggerView.as_view(url_name='schema'), 
-        name='swagger-ui'
-    ),
+]
+
+# The docs UIs render templates shipped by the drf_spectacular app, so they are
+# only routed when the app is installed (i.e. not under the API-only profile).
+if apps.is_installed('drf_spectacular'):
+    urlpatterns += [
+        # GET /api/schema/swagger-ui/
+        # Serves the interactive Swagger UI interface.
+        path(
+            'schema/swagger-ui/', 
+            lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), 
+            name='swagger-ui'
+        ),
 
-    # Optional: Redoc Interface
-    # GET /api/schema/redoc/
-    # path(
-    #     'schema/redoc/', 
-    #     SpectacularRedocView.as_view(url_name='schema'), 
-    #     name='redoc'
-    # ),
-]
\ No newline at end of file
+        # Optional: Redoc Interface
+        # GET /api/schema/redoc/
+        # path(
+        #     'schema/redoc/', 
+        #     lazy_view('drf_spectacular.views.SpectacularRedocView', url_name='schema'), 
+        #     name='redoc'
+        # ),
+    ]
\ No newline at end of file
@@ -1,62 +1,275 @@
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, ValidationError
 from rest_framework.response import Response
-from .serializers import UserProfileSerializer
-from django.db import transaction  # Recommended for ensuring atomicity during update
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.views import TokenObtainPairView
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from . import outbox
+from .audit import profile_audit
+from .cache import (
+    CachedPayloadResponse, PROFILE_CACHE_TIMEOUT, build_entry, get_fieldset_entry, get_or_build, profile_cache_key,
+)
+from .diagnostics import memory_report
+from .events import profile_events, publish_profile_change
+from .idempotency import IdempotencyMixin
+from .models import FirmRoleStat
+from .serializers import FirmRoleStatSerializer, LoginSerializer, UserProfileSerializer
+from .snapshots import snapshot_body, snapshot_entry
+from .tasks import enqueue
 
-# Note: If real caching is implemented, you would import the client here, e.g.:
-# from django.core.cache import cache 
-
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(IdempotencyMixin, generics.RetrieveUpdateAPIView):
     """
-    Handles GET /api/user/profile/ (Retrieve) 
+    Handles GET /api/user/profile/ (Retrieve)
     and PATCH /api/user/profile/ (Partial Update).
-    
+
     Business Logic: Allows an authenticated Advisor to view/modify their own profile details.
-    
-    Scaling Note: This class is pre-wired to implement a Cache-Aside strategy 
-    for scalability (e.g., using Redis) to handle read-heavy traffic.
+
+    Scaling Note: Reads use a Cache-Aside strategy (users/cache.py). The cached entry
+    keeps the rendered JSON body, and compressed variants are cached next to it.
+    A miss serves the profile snapshot stored on the user row (users/snapshots.py)
+    without running the serializer.
+    ``?fields=first_name,last_name`` returns a sparse fieldset, cached as its own
+    variant of the entry.
+
+    Retried PATCHes carrying the same ``Idempotency-Key`` header are answered from
+    the first attempt's stored response (users/idempotency.py).
     """
     serializer_class = UserProfileSerializer
     # Security: Only users with a valid JWT token can access this view.
     permission_classes = [permissions.IsAuthenticated]
 
-    # --- GET (Retrieve) Logic: Demonstrates Cache-Aside Read ---
     def get_object(self):
         """
-        Retrieves the user profile object, implementing the Cache-Aside read flow.
-        """
-        user = self.request.user
-        # user_id_key = f'user_profile:{user.id}' # Future cache key
-        
-        # 1) Try read user profile from cache (e.g., Redis)
-        # cached_data = cache.get(user_id_key) 
-        # if cached_data:
-        #     return cached_data # Cache Hit: Return cached data immediately
-        
-        # 2) Cache Miss: Hit the primary database
-        profile_object = user # DRF efficiently retrieves the user object here.
-        
-        # 3) Populate cache: Set the data back into the cache with a TTL (e.g., 5m)
-        # cache.set(user_id_key, profile_object, timeout=60*5)
-        
-        return profile_object
-
-    # --- PATCH (Update) Logic: Demonstrates Cache Invalidation ---
+        The profile is always the authenticated user's own record.
+        """
+        return self.request.user
+
+    def get_fieldset(self):
+        """
+        Fields selected with ``?fields=a,b`` (a sparse fieldset), or None for all
+        of them. Unknown names are a 400.
+        """
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = self.get_serializer_class().parse_fieldset(self.request.query_params.get('fields'))
+        return self._fieldset
+
+    def get_profile_entry(self):
+        """
+        Returns the cached profile entry of the current user, populating it on a miss.
+
+        Concurrent misses for the same user build the entry once (users/cache.py).
+        With ``?fields=`` the entry is the cached variant holding just those fields.
+        """
+        fields = self.get_fieldset()
+        user = self.get_object()
+        user_id_key = profile_cache_key(user.pk)
+
+        # Cache Miss: the stored snapshot of the already-authenticated user is the body
+        entry = get_or_build(user_id_key, lambda: snapshot_entry(snapshot_body(user)), PROFILE_CACHE_TIMEOUT)
+        if fields is not None:
+            user_id_key, entry = get_fieldset_entry(user_id_key, entry, fields, PROFILE_CACHE_TIMEOUT)
+        return user_id_key, entry
+
+    # --- GET (Retrieve) Logic: Cache-Aside Read ---
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serves the profile from cache, populating it on a miss.
+        """
+        user_id_key, entry = self.get_profile_entry()
+        return CachedPayloadResponse(entry, user_id_key, PROFILE_CACHE_TIMEOUT)
+
+    # --- PATCH (Update) Logic ---
     def update(self, request, *args, **kwargs):
         """
-        Updates the user profile and ensures cache consistency (Cache Invalidation).
+        Updates the user profile atomically.
+
+        Cache invalidation runs from the User post_save signal (users/signals.py),
+        once immediately and again after commit, so admin edits are covered too.
         """
-        
-        # Best Practice: Use transaction.atomic to ensure DB write succeeds entirely or fails entirely.
-        # with transaction.atomic():
-        
-        # 1. Execute the standard update process (Write to DB)
-        response = super().update(request, *args, **kwargs)
+        fields = self.get_fieldset()
+        with transaction.atomic():
+            response = super().update(request, *args, **kwargs)
+        if fields is not None:
+            # Input is validated against every field; only the response is sparse.
+            response.data = {name: response.data[name] for name in fields}
+        return response
+
+    def perform_update(self, serializer):
+        """
+        Saves the change and queues an audit record of the fields that actually
+        changed. The record is buffered after commit (users/audit.py), so the
+        PATCH never waits on an audit insert; the cache refresh is a background task.
+        A change also bumps ``profile_version``, adds an outbox event in the same
+        transaction (users/outbox.py) and is pushed to the user's open change
+        streams after commit (users/events.py).
+        """
+        instance = serializer.instance
+        before = {field: getattr(instance, field) for field in serializer.validated_data}
+        if any(before[field] != value for field, value in serializer.validated_data.items()):
+            # Bumped in the same UPDATE; read back for the change event below.
+            serializer.save(profile_version=F("profile_version") + 1)
+            instance.refresh_from_db(fields=["profile_version"])
+        else:
+            super().perform_update(serializer)
+
+        changes = {
+            field: [old, getattr(instance, field)]
+            for field, old in before.items()
+            if old != getattr(instance, field)
+        }
+        if changes:
+            user_id, changed_by_id = instance.pk, self.request.user.pk
+            # Downstream systems (CRM, compliance): committed together with the change,
+            # delivered by `manage.py dispatch_outbox` (users/outbox.py).
+            outbox.emit(user_id, "profile.updated", {
+                "version": instance.profile_version,
+                "changes": changes,
+                "changed_by": changed_by_id,
+                "source": "portal",
+            })
+            transaction.on_commit(
+                lambda: profile_audit.record(user_id, changes, changed_by_id=changed_by_id, source="portal")
+            )
+            # Other side effects run on a worker (users/tasks.py), queued after commit.
+            enqueue(
+                "users.refresh_profile_cache",
+                {"user_id": user_id},
+                dedupe_key=f"profile-cache:{user_id}",
+            )
+            # Open change streams of this user (other tabs, dashboards) get the new values.
+            version, fields = instance.profile_version, {field: new for field, (_old, new) in changes.items()}
+            if "bio" in fields:
+                fields["bio_html"] = instance.bio_html
+            transaction.on_commit(lambda: publish_profile_change(user_id, version, fields))
+
+
+class ProfileStreamView(View):
+    """
+    Handles GET /api/user/profile/stream/ (server-sent events; serve under ASGI).
+
+    Pushes a ``profile.updated`` event (new ``profile_version`` + the changed
+    fields and their values) whenever the authenticated advisor's profile
+    changes (users/events.py), so open tabs and dashboards stop polling
+    GET /api/user/profile/. The stream starts with a ``ready`` event carrying
+    the current version, and a ``resync`` event means "refetch the profile".
+
+    EventSource can't send headers, so the access token may also be passed as
+    ``?access_token=``.
+    """
+    http_method_names = ['get']
+    authentication = JWTAuthentication()
+
+    def authenticate(self, request):
+        header = self.authentication.get_header(request)
+        raw_token = self.authentication.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            raw_token = request.GET.get('access_token')
+        if not raw_token:
+            raise NotAuthenticated()
+        return self.authentication.get_user(self.authentication.get_validated_token(raw_token))
 
-        # 2. Cache Invalidation: Only if the database write was successful (HTTP 200 OK)
+    async def get(self, request):
+        try:
+            user = await sync_to_async(self.authenticate)(request)
+        except (NotAuthenticated, AuthenticationFailed) as exc:
+            response = JsonResponse({'detail': str(exc.default_detail)}, status=status.HTTP_401_UNAUTHORIZED)
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+            return response
+
+        if not profile_events.has_capacity(user.pk):
+            response = JsonResponse({'detail': 'Too many open streams.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '30'
+            return response
+
+        last_event_id = request.headers.get('Last-Event-ID')
+
+        async def preamble():
+            version = await (
+                type(user).objects.filter(pk=user.pk).values_list('profile_version', flat=True).aget()
+            )
+            events = [{'type': 'ready', 'user_id': user.pk, 'version': version}]
+            if last_event_id is not None and last_event_id != str(version):
+                # Reconnected after missing events: the client should refetch.
+                events.append({'type': 'resync', 'user_id': user.pk})
+            return events
+
+        response = StreamingHttpResponse(profile_events.stream(user.pk, preamble), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+        return response
+
+
+class LoginView(TokenObtainPairView):
+    """
+    Handles POST /api/auth/login/.
+
+    Returns the JWT pair and the advisor profile in one response, and seeds the
+    profile cache so the portal's next GET /api/user/profile/ is a cache hit.
+    """
+    serializer_class = LoginSerializer
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
         if response.status_code == status.HTTP_200_OK:
-            # user_id_key = f'user_profile:{self.request.user.id}'
-            # cache.delete(user_id_key)  # Evict the stale data from the cache.
-            pass # Current Mini Project scope: placeholder for cache invalidation.
-        
-        return response
\ No newline at end of file
+            profile = response.data["profile"]
+            cache.set(profile_cache_key(profile["id"]), build_entry(profile), timeout=PROFILE_CACHE_TIMEOUT)
+        return response
+
+
+class SessionBootstrapView(UserProfileView):
+    """
+    Handles GET /api/bootstrap/.
+
+    Everything the portal needs to render for an already-authenticated session,
+    in one request (currently the profile; served from the profile cache).
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    def retrieve(self, request, *args, **kwargs):
+        _user_id_key, entry = self.get_profile_entry()
+        return Response({"profile": entry["data"]})
+
+
+class FirmStatsView(generics.ListAPIView):
+    """
+    Handles GET /api/firms/stats/ (staff only).
+
+    Advisor counts per firm, role and active flag, read from the FirmRoleStat
+    summary (never from users_user). Filter with ?firm=<id>.
+    """
+    serializer_class = FirmRoleStatSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = (
+            FirmRoleStat.objects.filter(count__gt=0)
+            .select_related('firm')
+            .order_by('firm__name', 'role', '-is_active')
+        )
+        firm = self.request.query_params.get('firm')
+        if firm is not None:
+            if not firm.isdigit():
+                raise ValidationError({'firm': ['A valid firm id is required.']})
+            queryset = queryset.filter(firm_id=int(firm))
+        return queryset
+
+
+class MemoryDiagnosticsView(APIView):
+    """
+    Handles GET /api/diagnostics/memory/ (staff only).
+
+    Memory report of the worker that answers: RSS, per-endpoint allocation
+    peaks against MEMORY_BUDGETS and the latest top-allocator snapshot (with
+    MEMORY_TRACKING on), cache contents and in-process structure sizes.
+    ?snapshot=1 takes a fresh snapshot first.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(memory_report(snapshot=request.query_params.get("snapshot") == "1"))
@@ -9,15 +9,16 @@ export async function login({ username, password }) {
     password: (password || '').trim()
   };
 
+  // The login response also carries the profile, so callers can skip GET /user/profile/.
   const { data } = await api.post('/auth/login/', payload);
-  const { access, refresh } = data || {};
+  const { access, refresh, profile } = data || {};
 
   if (!access || !refresh) {
     throw new Error('登录响应缺少令牌');
   }
 
   persistTokens({ access, refresh });
-  return { access, refresh };
+  return { access, refresh, profile: profile || null };
 }
 
 export function persistTokens({ access, refresh }) {
@@ -1,10 +1,39 @@
 import api from './api';
+import { getAccessToken } from './auth';
+
+// Profile handed over by login; consumed by the next bootstrapSession() call.
+let primedProfile = null;
+
+export function primeProfile(profile) {
+  primedProfile = profile || null;
+}
 
 export async function getProfile() {
   const { data } = await api.get('/user/profile/');
   return data;
 }
 
+// Profile for the first page load: the one login handed over, else a single
+// request for an already-authenticated session (e.g. page reload).
+export async function bootstrapSession() {
+  if (primedProfile) {
+    const data = primedProfile;
+    primedProfile = null;
+    return data;
+  }
+  const { data } = await api.get('/bootstrap/');
+  return data.profile;
+}
+
+const UPDATE_ATTEMPTS = 3;
+
+function newIdempotencyKey() {
+  if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 export async function updateProfile(updates) {
   const payload = {
     first_name: updates.first_name || '',
@@ -12,6 +41,30 @@ export async function updateProfile(updates) {
     bio: updates.bio || '',
     avatar_url: updates.avatar_url || ''
   };
-  const { data } = await api.patch('/user/profile/', payload);
-  return data;
+  // Retries after network failures reuse the key, so the server applies the
+  // update once and replays its response for the duplicates.
+  const headers = { 'Idempotency-Key': newIdempotencyKey() };
+  for (let attempt = 1; ; attempt += 1) {
+    try {
+      const { data } = await api.patch('/user/profile/', payload, { headers });
+      return data;
+    } catch (error) {
+      if (error.response || attempt >= UPDATE_ATTEMPTS) throw error;
+      await new Promise(resolve => setTimeout(resolve, 300 * attempt));
+    }
+  }
+}
+
+// Live profile changes from other tabs/devices (server-sent events).
+// onChange(event) gets { type: 'profile.updated', version, fields } or
+// { type: 'resync' } (refetch the profile). Returns a function that closes the stream.
+export function subscribeProfileChanges(onChange) {
+  const token = getAccessToken();
+  if (!token || typeof EventSource === 'undefined') return () => {};
+  // EventSource can't send an Authorization header.
+  const url = `${api.defaults.baseURL}/user/profile/stream/?access_token=${encodeURIComponent(token)}`;
+  const source = new EventSource(url);
+  source.addEventListener('profile.updated', message => onChange(JSON.parse(message.data)));
+  source.addEventListener('resync', message => onChange(JSON.parse(message.data)));
+  return () => source.close();
 }
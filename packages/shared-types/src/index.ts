@@ -24,3 +24,15 @@ export interface UserProfileUpdatePayload {
   bio?: string;
   avatar_url?: string;
 }
+
+// POST /api/auth/login/ — token pair plus the profile (one round trip).
+export interface LoginResponse {
+  access: string;
+  refresh: string;
+  profile: UserProfile;
+}
+
+// GET /api/bootstrap/ — for an already-authenticated session.
+export interface SessionBootstrapResponse {
+  profile: UserProfile;
+}